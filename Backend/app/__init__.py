@@ -1,9 +1,18 @@
 # app/__init__.py
+import logging
+import os
 from flask import Flask
 from flask_cors import CORS
 
 def create_app():
+    logging.basicConfig(
+        level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+        format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+    )
     app = Flask(__name__)
+
+    from app.serialization.json_provider import JSONProvider
+    app.json = JSONProvider(app)
     
     # Configure CORS
     CORS(app, resources={
@@ -16,9 +25,17 @@ def create_app():
     # Register all blueprints
     from app.routes.course_routes import course_bp
     from app.routes.activity_routes import activity_bp
+    from app.routes.cache_routes import cache_bp
+    from app.routes.metrics_routes import metrics_bp
+    from app.routes.report_routes import report_bp
+    from app.routes.job_routes import job_bp
     
     app.register_blueprint(course_bp)
     app.register_blueprint(activity_bp)
+    app.register_blueprint(cache_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(report_bp)
+    app.register_blueprint(job_bp)
 
     @app.after_request
     def after_request(response):
@@ -29,4 +46,14 @@ def create_app():
         response.headers.add('Access-Control-Allow-Methods', 'GET,POST')
         return response
 
+    # Registered after the CORS hook so it runs before it: a profiled request's
+    # replacement response still gets the CORS headers.
+    from app.instrumentation import middleware
+    middleware.init_app(app)
+
+    # Registered last so it runs first: the compression time is part of the
+    # request's Server-Timing.
+    from app.serialization import compression
+    compression.init_app(app)
+
     return app
\ No newline at end of file
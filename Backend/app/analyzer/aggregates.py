@@ -0,0 +1,364 @@
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from app.analyzer import sketches
+
+
+def _sum_by(codes, values, size):
+    """Group-sum of values by integer codes in [0, size), keeping integer sums exact."""
+    sums = np.bincount(codes, weights=values, minlength=size)
+    if np.issubdtype(values.dtype, np.integer):
+        return sums.astype(np.int64)
+    return sums
+
+
+def _scatter(offsets, values, size):
+    """Place per-group values at their offsets in a zero-filled array of the given size."""
+    values = np.asarray(values)
+    out = np.zeros(size, dtype=values.dtype if values.size else np.int64)
+    keep = (offsets >= 0) & (offsets < size)
+    out[offsets[keep]] = values[keep]
+    return out
+
+
+def _count_distinct_by(codes, size):
+    """Number of distinct values per group from sorted, de-duplicated (group, value) keys."""
+    return np.bincount(codes, minlength=size).astype(np.int64)
+
+
+def _distinct_by(group_of, key_groups, key_values, n_values, size):
+    """Distinct values per group after mapping each key's group through group_of."""
+    keys = np.unique(group_of[key_groups] * n_values + key_values)
+    return _count_distinct_by(keys // n_values, size)
+
+
+def _day_weeks(start_date, total_days):
+    return (np.arange(total_days) + start_date.weekday()) // 7
+
+
+def _day_months(start_date, total_days):
+    dates = np.datetime64(start_date, 'D') + np.arange(total_days)
+    return dates.astype('datetime64[M]').astype(np.int64) % 12
+
+
+def _day_slices(first_day, total_days, days):
+    """Row order and per-day bounds that group rows by their day's offset from first_day."""
+    day_idx = (np.asarray(days, dtype='datetime64[D]') - np.datetime64(first_day, 'D')).astype(np.int64)
+    order = np.argsort(day_idx, kind='stable')
+    return order, np.searchsorted(day_idx[order], np.arange(total_days + 1))
+
+
+class DayActivity:
+    """One day of a course's page views, kept in a form that merges with other days.
+
+    Holds per-hour views and activity counts plus the distinct (hour, user) pairs, so
+    distinct users over any set of days can be recomputed exactly without the raw rows.
+    The pairs may be replaced by a HyperLogLog sketch of (hour, register, rho) entries
+    when only approximate distinct counts are needed; see app/analyzer/sketches.py.
+    """
+
+    def __init__(self, hour_views, hour_activity, pair_hours=None, pair_users=None, sketch=None):
+        self.hour_views = hour_views
+        self.hour_activity = hour_activity
+        self.pair_hours = pair_hours
+        self.pair_users = pair_users
+        self._sketch = sketch
+        if pair_users is not None:
+            self.unique_users = len(np.unique(pair_users))
+        else:
+            _, registers, rho = sketch
+            self.unique_users = int(sketches.count_by(np.zeros(len(registers), dtype=np.int64), 1, registers, rho)[0])
+
+    @property
+    def exact(self):
+        return self.pair_users is not None
+
+    @property
+    def sketch(self):
+        """(hours, registers, rho) with at most one entry per (hour, register); built from the pairs on first use."""
+        if self._sketch is None:
+            registers, rho = sketches.entries(self.pair_users)
+            keys, rho = sketches.max_per_key(self.pair_hours.astype(np.int64) * sketches.HLL_REGISTERS + registers, rho)
+            self._sketch = ((keys // sketches.HLL_REGISTERS).astype(np.int8),
+                            (keys % sketches.HLL_REGISTERS).astype(np.int16), rho)
+        return self._sketch
+
+    @classmethod
+    def split_by_day(cls, first_day, last_day, days, hours, users, views, activity):
+        """DayActivity for every day in [first_day, last_day], including days without rows.
+
+        Expects one row per distinct (day, hour, user), e.g. from a GROUP BY on those columns.
+        """
+        total_days = (last_day - first_day).days + 1
+        order, bounds = _day_slices(first_day, total_days, days)
+
+        result = {}
+        for offset in range(total_days):
+            rows = order[bounds[offset]:bounds[offset + 1]]
+            day_hours = hours[rows]
+            result[first_day + timedelta(days=offset)] = cls(
+                _sum_by(day_hours, views[rows], 24),
+                _sum_by(day_hours, activity[rows], 24),
+                day_hours.astype(np.int8),
+                users[rows]
+            )
+        return result
+
+    @classmethod
+    def from_rollups(cls, first_day, last_day, cells, pairs=None, sketch_entries=None):
+        """DayActivity for every day in [first_day, last_day] from stored rollups.
+
+        cells: (days, hours, views, activity) with one row per active (day, hour)
+        pairs: (days, hours, users) with one row per distinct (day, hour, user)
+        sketch_entries: (days, hours, registers, rho) with one row per (day, hour, register),
+        used in place of pairs for approximate distinct counts
+        """
+        total_days = (last_day - first_day).days + 1
+        cell_days, cell_hours, cell_views, cell_activity = cells
+        cell_order, cell_bounds = _day_slices(first_day, total_days, cell_days)
+        if pairs is not None:
+            user_days, user_columns = pairs[0], pairs[1:]
+        else:
+            user_days, user_columns = sketch_entries[0], sketch_entries[1:]
+        user_order, user_bounds = _day_slices(first_day, total_days, user_days)
+
+        result = {}
+        for offset in range(total_days):
+            cell_rows = cell_order[cell_bounds[offset]:cell_bounds[offset + 1]]
+            user_rows = user_order[user_bounds[offset]:user_bounds[offset + 1]]
+            hour_views = _scatter(cell_hours[cell_rows], cell_views[cell_rows], 24)
+            hour_activity = _scatter(cell_hours[cell_rows], cell_activity[cell_rows], 24)
+            if pairs is not None:
+                hours, users = user_columns
+                activity = cls(hour_views, hour_activity, hours[user_rows].astype(np.int8), users[user_rows])
+            else:
+                hours, registers, rho = user_columns
+                activity = cls(hour_views, hour_activity, sketch=(
+                    hours[user_rows].astype(np.int8), registers[user_rows].astype(np.int16), rho[user_rows]
+                ))
+            result[first_day + timedelta(days=offset)] = activity
+        return result
+
+
+class CourseAggregates:
+    """Per-day and per-hour activity for one course and date range.
+
+    Every view of the course summary (overview, daily, weekly, monthly, hourly and the
+    text report) is derived from these arrays, so the raw rows are only scanned once.
+    Day arrays are indexed by offset from start_date and cover the whole range,
+    including days without activity; hour arrays are indexed by hour of day; week
+    arrays by Monday-to-Sunday week counted from the week of start_date; month
+    arrays by calendar month (0 = January). exact is False when the distinct user
+    counts are HyperLogLog estimates rather than exact counts.
+    """
+
+    def __init__(self, start_date, end_date, day_views, day_activity, day_users,
+                 hour_views, hour_activity, hour_users, hour_days, total_users,
+                 week_users, month_users, exact=True):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.day_views = day_views
+        self.day_activity = day_activity
+        self.day_users = day_users
+        self.hour_views = hour_views
+        self.hour_activity = hour_activity
+        self.hour_users = hour_users
+        self.hour_days = hour_days
+        self.total_users = total_users
+        self.week_users = week_users
+        self.month_users = month_users
+        self.exact = exact
+
+    @property
+    def total_days(self):
+        return (self.end_date - self.start_date).days + 1
+
+    @property
+    def dates(self):
+        """datetime64[D] for every day of the range."""
+        return np.datetime64(self.start_date, 'D') + np.arange(self.total_days)
+
+    @property
+    def total_weeks(self):
+        return (self.total_days - 1 + self.start_date.weekday()) // 7 + 1
+
+    @property
+    def day_weeks(self):
+        """Week index of every day of the range."""
+        return _day_weeks(self.start_date, self.total_days)
+
+    @property
+    def day_months(self):
+        """Calendar month index (0 = January) of every day of the range."""
+        return _day_months(self.start_date, self.total_days)
+
+    @property
+    def total_views(self):
+        return self.day_views.sum()
+
+    @property
+    def active_days(self):
+        return int(np.count_nonzero(self.day_activity))
+
+    @classmethod
+    def from_frame(cls, df, start_date, end_date):
+        """Build the aggregates in one pass over rows with datetime, hour, id and views columns.
+
+        Distinct counts from raw rows are always exact.
+        """
+        total_days = (end_date - start_date).days + 1
+
+        day_idx = (df['datetime'].to_numpy().astype('datetime64[D]')
+                   - np.datetime64(start_date, 'D')).astype(np.int64)
+        hour = df['hour'].to_numpy().astype(np.int64)
+        views = df['views'].to_numpy()
+        user_codes, users = pd.factorize(df['id'])
+        n_users = max(len(users), 1)
+
+        # Every distinct (day, hour, user) triple, sorted; the distinct counts
+        # per day, per hour and per (hour, day) all fall out of this one key.
+        cell = day_idx * 24 + hour
+        triples = np.unique(cell * n_users + user_codes)
+        triple_cell = triples // n_users
+        triple_user = triples % n_users
+
+        day_user = np.unique((triple_cell // 24) * n_users + triple_user)
+        hour_user = np.unique((triple_cell % 24) * n_users + triple_user)
+        active_cells = np.unique(triple_cell)
+
+        total_weeks = (total_days - 1 + start_date.weekday()) // 7 + 1
+        day_user_day, day_user_user = day_user // n_users, day_user % n_users
+
+        return cls(
+            start_date=start_date,
+            end_date=end_date,
+            day_views=_sum_by(day_idx, views, total_days),
+            day_activity=np.bincount(day_idx, minlength=total_days).astype(np.int64),
+            day_users=_count_distinct_by(day_user_day, total_days),
+            hour_views=_sum_by(hour, views, 24),
+            hour_activity=np.bincount(hour, minlength=24).astype(np.int64),
+            hour_users=_count_distinct_by(hour_user // n_users, 24),
+            hour_days=_count_distinct_by(active_cells % 24, 24),
+            total_users=len(users),
+            week_users=_distinct_by(_day_weeks(start_date, total_days), day_user_day, day_user_user,
+                                    n_users, total_weeks),
+            month_users=_distinct_by(_day_months(start_date, total_days), day_user_day, day_user_user,
+                                     n_users, 12),
+        )
+
+    @classmethod
+    def from_totals(cls, start_date, end_date, daily_rows, hourly_rows, total_users,
+                    weekly_rows=(), monthly_rows=()):
+        """Build the aggregates from rows already grouped by the database.
+
+        daily_rows: (day, views, activity_count, unique_users)
+        hourly_rows: (hour, views, activity_count, unique_users, unique_days)
+        weekly_rows: (week index, unique_users)
+        monthly_rows: (month 1-12, unique_users)
+        """
+        total_days = (end_date - start_date).days + 1
+        total_weeks = (total_days - 1 + start_date.weekday()) // 7 + 1
+        days, day_views, day_activity, day_users = list(zip(*daily_rows)) or [()] * 4
+        hours, hour_views, hour_activity, hour_users, hour_days = list(zip(*hourly_rows)) or [()] * 5
+        weeks, week_users = list(zip(*weekly_rows)) or [()] * 2
+        months, month_users = list(zip(*monthly_rows)) or [()] * 2
+
+        day_idx = (np.array(days, dtype='datetime64[D]') - np.datetime64(start_date, 'D')).astype(np.int64)
+        hour_idx = np.array(hours, dtype=np.int64)
+
+        return cls(
+            start_date=start_date,
+            end_date=end_date,
+            day_views=_scatter(day_idx, day_views, total_days),
+            day_activity=_scatter(day_idx, np.array(day_activity, dtype=np.int64), total_days),
+            day_users=_scatter(day_idx, np.array(day_users, dtype=np.int64), total_days),
+            hour_views=_scatter(hour_idx, hour_views, 24),
+            hour_activity=_scatter(hour_idx, np.array(hour_activity, dtype=np.int64), 24),
+            hour_users=_scatter(hour_idx, np.array(hour_users, dtype=np.int64), 24),
+            hour_days=_scatter(hour_idx, np.array(hour_days, dtype=np.int64), 24),
+            total_users=int(total_users or 0),
+            week_users=_scatter(np.array(weeks, dtype=np.int64), np.array(week_users, dtype=np.int64), total_weeks),
+            month_users=_scatter(np.array(months, dtype=np.int64) - 1, np.array(month_users, dtype=np.int64), 12),
+        )
+
+    @classmethod
+    def from_days(cls, start_date, end_date, days, exact=True):
+        """Assemble the aggregates for a range from a {date: DayActivity} mapping covering it.
+
+        With exact=False the distinct counts over hours, weeks, months and the whole
+        range come from merging the days' HyperLogLog sketches instead of their user
+        pairs; days held as sketches only are always merged that way.
+        """
+        total_days = (end_date - start_date).days + 1
+        activities = [days[start_date + timedelta(days=offset)] for offset in range(total_days)]
+        exact = exact and all(a.exact for a in activities)
+
+        hour_views = np.sum([a.hour_views for a in activities], axis=0)
+        hour_activity = np.sum([a.hour_activity for a in activities], axis=0)
+        week_of_day = _day_weeks(start_date, total_days)
+        month_of_day = _day_months(start_date, total_days)
+        total_weeks = int(week_of_day[-1]) + 1
+
+        if exact:
+            pair_days = np.repeat(np.arange(total_days), [len(a.pair_users) for a in activities])
+            pair_hours = np.concatenate([a.pair_hours for a in activities]).astype(np.int64)
+            user_codes, users = pd.factorize(np.concatenate([a.pair_users for a in activities]))
+            n_users = max(len(users), 1)
+            hour_user = np.unique(pair_hours * n_users + user_codes)
+            day_user = np.unique(pair_days * n_users + user_codes)
+            day_user_day, day_user_user = day_user // n_users, day_user % n_users
+
+            hour_users = _count_distinct_by(hour_user // n_users, 24)
+            week_users = _distinct_by(week_of_day, day_user_day, day_user_user, n_users, total_weeks)
+            month_users = _distinct_by(month_of_day, day_user_day, day_user_user, n_users, 12)
+            total_users = len(users)
+        else:
+            entries = [a.sketch for a in activities]
+            entry_days = np.repeat(np.arange(total_days), [len(entry[1]) for entry in entries])
+            entry_hours = np.concatenate([entry[0] for entry in entries]).astype(np.int64)
+            registers = np.concatenate([entry[1] for entry in entries]).astype(np.int64)
+            rho = np.concatenate([entry[2] for entry in entries]).astype(np.uint8)
+
+            hour_users = sketches.count_by(entry_hours, 24, registers, rho)
+            week_users = sketches.count_by(week_of_day[entry_days], total_weeks, registers, rho)
+            month_users = sketches.count_by(month_of_day[entry_days], 12, registers, rho)
+            total_users = int(sketches.count_by(np.zeros(len(registers), dtype=np.int64), 1, registers, rho)[0])
+
+        return cls(
+            start_date=start_date,
+            end_date=end_date,
+            day_views=np.array([a.hour_views.sum() for a in activities], dtype=hour_views.dtype),
+            day_activity=np.array([a.hour_activity.sum() for a in activities], dtype=np.int64),
+            day_users=np.array([a.unique_users for a in activities], dtype=np.int64),
+            hour_views=hour_views,
+            hour_activity=hour_activity.astype(np.int64),
+            hour_users=hour_users,
+            hour_days=np.sum([a.hour_activity > 0 for a in activities], axis=0).astype(np.int64),
+            total_users=total_users,
+            week_users=week_users,
+            month_users=month_users,
+            exact=exact,
+        )
+
+    def daily_frame(self):
+        """One row per active day: date, total_views, activity_count, avg_views, unique_users."""
+        active = self.day_activity > 0
+        views = self.day_views[active]
+        activity = self.day_activity[active]
+        return pd.DataFrame({
+            'date': self.dates[active].astype('datetime64[ns]'),
+            'total_views': views,
+            'activity_count': activity,
+            'avg_views': views / activity,
+            'unique_users': self.day_users[active],
+        })
+
+    def hourly_frame(self):
+        """One row per active hour: hour, views, id (unique users), date (unique days)."""
+        active = self.hour_activity > 0
+        return pd.DataFrame({
+            'hour': np.arange(24)[active],
+            'views': self.hour_views[active],
+            'id': self.hour_users[active],
+            'date': self.hour_days[active],
+        })
@@ -1,69 +1,177 @@
+import calendar
+import logging
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
+from app.analyzer.aggregates import CourseAggregates
+from app.instrumentation.spans import span
+
+logger = logging.getLogger(__name__)
+
+# 24-entry lookup tables indexed by hour of day (0-23).
+HOUR_LABELS = [
+    "12 AM" if hour == 0
+    else f"{hour} AM" if hour < 12
+    else "12 PM" if hour == 12
+    else f"{hour-12} PM"
+    for hour in range(24)
+]
+
+PERIODS = ["Morning", "Afternoon", "Evening", "Night"]
+
+MONTH_NAMES = list(calendar.month_name)[1:]
+WEEKDAY_NAMES = list(calendar.day_name)
+
+HOUR_PERIOD_INDEX = np.array([
+    0 if 5 <= hour <= 11
+    else 1 if 12 <= hour <= 16
+    else 2 if 17 <= hour <= 21
+    else 3
+    for hour in range(24)
+])
+
+
+def week_numbers(dates, first_monday):
+    """1-based Monday-to-Sunday week of each date, counted from first_monday."""
+    days = (np.asarray(dates, dtype='datetime64[D]') - np.datetime64(first_monday, 'D')).astype(int)
+    return days // 7 + 1
+
+
+def week_date_ranges(week_numbers, first_monday):
+    """[start, end] date strings for each 1-based week number."""
+    week_starts = np.datetime64(first_monday, 'D') + (np.asarray(week_numbers, dtype=int) - 1) * 7
+    starts = np.datetime_as_string(week_starts, unit='D')
+    ends = np.datetime_as_string(week_starts + 6, unit='D')
+    return [[start, end] for start, end in zip(starts.tolist(), ends.tolist())]
+
+
+def format_hourly_stats(hourly_stats, total_days):
+    """Build hourly_data/period_summary from per-hour views, unique users (id) and unique days (date)."""
+    total_views = int(hourly_stats['views'].sum())
+
+    hours = hourly_stats['hour'].to_numpy()
+    views = hourly_stats['views'].astype(int).tolist()
+    period_idx = HOUR_PERIOD_INDEX[hours]
+
+    # Python round() on the 24 scalars keeps the values identical to the
+    # previous per-row implementation; np.round can differ in the last digit.
+    formatted_data = [{
+        'hour': hour,
+        'formatted_hour': HOUR_LABELS[hour],
+        'period': PERIODS[period],
+        'views': hour_views,
+        'unique_users': users,
+        'unique_days': days,
+        'avg_daily_views': float(round(hour_views / total_days, 2)),
+        'percentage': float(round((hour_views / total_views * 100), 2))
+    } for hour, period, hour_views, users, days in zip(
+        hours.astype(int).tolist(),
+        period_idx.tolist(),
+        views,
+        hourly_stats['id'].astype(int).tolist(),
+        hourly_stats['date'].astype(int).tolist()
+    )]
+
+    period_views = np.bincount(period_idx, weights=views, minlength=len(PERIODS)).astype(int)
+    period_users = np.zeros(len(PERIODS), dtype=int)
+    np.maximum.at(period_users, period_idx, hourly_stats['id'].to_numpy())
+
+    period_summary = [{
+        'period': PERIODS[period],
+        'views': int(period_views[period]),
+        'unique_users': int(period_users[period]),
+        'percentage': float(round((int(period_views[period]) / total_views * 100), 2))
+    } for period in np.unique(period_idx).tolist()]
+
+    return {
+        'hourly_data': sorted(formatted_data, key=lambda x: x['views'], reverse=True),
+        'period_summary': period_summary
+    }
+
 
 class CourseSummaryAnalyzer:
     def __init__(self, all_student_data, course_start_date: str, course_end_date: str):
         self.start_date = datetime.strptime(course_start_date, '%Y-%m-%d').date()
         self.end_date = datetime.strptime(course_end_date, '%Y-%m-%d').date()
-        self.all_student_data = self._load_data(all_student_data)
+        with span('analyze.load'):
+            self.all_student_data = self._load_data(all_student_data)
+        with span('analyze.aggregate'):
+            self.aggregates = CourseAggregates.from_frame(self.all_student_data, self.start_date, self.end_date)
+
+    @classmethod
+    def from_aggregates(cls, aggregates):
+        """Analyzer over aggregates computed elsewhere (e.g. GROUP BY queries), without raw rows."""
+        if not aggregates.active_days:
+            raise ValueError(f"No data found between {aggregates.start_date} and {aggregates.end_date}")
+
+        analyzer = cls.__new__(cls)
+        analyzer.start_date = aggregates.start_date
+        analyzer.end_date = aggregates.end_date
+        analyzer.all_student_data = None
+        analyzer.aggregates = aggregates
+        return analyzer
+
+    @classmethod
+    def from_rollups(cls, store, course_id, start_date, end_date, exact=True):
+        """Analyzer over a RollupStore's per-day/per-hour rollups; cost grows with days, not rows."""
+        with span('rollups.load'):
+            days = store.load_days(course_id, start_date, end_date, exact=exact)
+        with span('analyze.aggregate'):
+            aggregates = CourseAggregates.from_days(start_date, end_date, days, exact=exact)
+        return cls.from_aggregates(aggregates)
         
     def _load_data(self, original_data) -> pd.DataFrame:
-        flattened_data = []
-        for student_data in original_data:
-            flattened_data.extend(student_data)
-
-        df = pd.DataFrame(flattened_data)
-        print("\nDate conversion debug:")
-        print(f"Sample date before conversion: {df['date'].iloc[0] if not df.empty else 'No data'}")
-
-        df['datetime'] = pd.to_datetime(df['date']) 
-        print(f"Sample date after conversion: {df['datetime'].iloc[0] if not df.empty else 'No data'}")
+        """Rows inside the date range plus derived calendar columns.
+
+        Accepts columns ({'id', 'datetime', 'views'} arrays or a DataFrame with them),
+        or the older per-student lists of {'id', 'date', 'views'} dicts.
+        """
+        if isinstance(original_data, (dict, pd.DataFrame)):
+            df = pd.DataFrame({
+                'id': original_data['id'],
+                'datetime': original_data['datetime'],
+                'views': original_data['views']
+            }, copy=False)
+        else:
+            flattened_data = []
+            for student_data in original_data:
+                flattened_data.extend(student_data)
+
+            df = pd.DataFrame(flattened_data, columns=['id', 'date', 'views'])
+            df['datetime'] = pd.to_datetime(df['date'])
+            df = df.drop(columns='date')
 
         start_datetime = pd.to_datetime(self.start_date)
         end_datetime = pd.to_datetime(self.end_date) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
 
         mask = (df['datetime'] >= start_datetime) & (df['datetime'] <= end_datetime)
-        df = df[mask].copy()
+        if not mask.all():
+            df = df[mask].copy()
 
         if df.empty:
             raise ValueError(f"No data found between {self.start_date} and {self.end_date}")
-        
-        df['date'] = df['datetime'].dt.date
-        print("\nAfter date extraction:")
-        high_traffic = df[df['views'] >= 200]
-        print(high_traffic[['date', 'datetime', 'views']].to_string())
-
-        df['hour'] = df['datetime'].dt.hour
-        df['month'] = df['datetime'].dt.month
-        df['month_name'] = df['datetime'].dt.strftime('%B')
-        df['day'] = df['datetime'].dt.day
-        df['weekday'] = df['datetime'].dt.strftime('%A')
-
-        print(f"\nData loaded successfully:")
-        print(f"Date range: {df['date'].min()} to {df['date'].max()}")
-        print(f"Total records: {len(df)}")
-        print(f"DataFrame columns: {df.columns.tolist()}")
-        print(f"DataFrame dtypes:\n{df.dtypes}")
+
+        # Integer and categorical columns instead of per-row Python dates and strings.
+        datetimes = df['datetime'].dt
+        df['date'] = datetimes.normalize()
+
+        df['hour'] = datetimes.hour.astype(np.int8)
+        df['month'] = datetimes.month.astype(np.int8)
+        df['month_name'] = pd.Categorical.from_codes(df['month'] - 1, categories=MONTH_NAMES)
+        df['day'] = datetimes.day.astype(np.int8)
+        df['weekday'] = pd.Categorical.from_codes(datetimes.weekday, categories=WEEKDAY_NAMES)
+
+        logger.debug("Loaded %d page view rows between %s and %s", len(df), self.start_date, self.end_date)
 
         return df
     
     def analyze_daily_patterns(self):
         """Analyze top and bottom days by page views including days with zero activity"""
   
-        all_dates = pd.date_range(start=self.start_date, end=self.end_date, freq='D')
-        
-        daily_stats = (self.all_student_data.groupby('date')
-                    .agg({
-                        'views': 'sum'
-                    }).reset_index())
-        
-        complete_daily_stats = pd.DataFrame({'date': all_dates.date})
-        
-        complete_daily_stats = complete_daily_stats.merge(
-            daily_stats, 
-            on='date', 
-            how='left'
-        ).fillna({'views': 0})
+        complete_daily_stats = pd.DataFrame({
+            'date': pd.DatetimeIndex(self.aggregates.dates).date,
+            'views': self.aggregates.day_views
+        })
         
         top_days = complete_daily_stats.nlargest(5, 'views')
         bottom_days = complete_daily_stats.nsmallest(5, 'views')
@@ -76,23 +184,20 @@ class CourseSummaryAnalyzer:
     def analyze_monthly_patterns(self):
         """Analyze monthly patterns in page views"""
  
-        monthly_stats = (self.all_student_data.groupby(['month', 'month_name'])
-                        .agg({
-                            'views': ['sum', 'mean', 'count'],
-                            'date': 'nunique'
-                        }).reset_index())
-        
-        monthly_stats.columns = ['month', 'month_name', 'total_views', 'avg_views', 'activity_count', 'active_days']
-        
-        month_days = {}
-        current_date = self.start_date
-        while current_date <= self.end_date:
-            month = current_date.month
-            if month not in month_days:
-                month_days[month] = 0
-            month_days[month] += 1
-            current_date += timedelta(days=1)
-        
+        daily_stats = self.aggregates.daily_frame()
+        daily_stats['month'] = daily_stats['date'].dt.month
+        daily_stats['month_name'] = daily_stats['date'].dt.strftime('%B')
+
+        monthly_stats = (daily_stats.groupby(['month', 'month_name'])
+                        .agg(total_views=('total_views', 'sum'),
+                             activity_count=('activity_count', 'sum'),
+                             active_days=('date', 'count'))
+                        .reset_index())
+
+        monthly_stats.insert(3, 'avg_views', monthly_stats['total_views'] / monthly_stats['activity_count'])
+
+        month_days = pd.Series(pd.DatetimeIndex(self.aggregates.dates).month).value_counts()
+
         monthly_stats['total_days'] = monthly_stats['month'].map(month_days)
         
         monthly_stats['avg_daily_views'] = (monthly_stats['total_views'] / monthly_stats['total_days']).round(2)
@@ -107,18 +212,8 @@ class CourseSummaryAnalyzer:
     def analyze_detailed_patterns(self):
      
         start_ts = pd.Timestamp(self.start_date)
-        end_ts = pd.Timestamp(self.end_date)
 
-        daily_stats = (self.all_student_data.groupby('date')
-                    .agg({
-                        'views': ['sum', 'count', 'mean'],
-                        'id': 'nunique'  
-                    }).reset_index())
-
-        daily_stats.columns = ['date', 'total_views', 'activity_count', 'avg_views', 'unique_users']
-
-        daily_stats['date'] = pd.to_datetime(daily_stats['date'])
-        daily_stats = daily_stats.sort_values('date')
+        daily_stats = self.aggregates.daily_frame()
 
         daily_stats['rolling_avg_7day'] = daily_stats['total_views'].rolling(window=7, min_periods=1).mean()
         daily_stats['view_change'] = daily_stats['total_views'].pct_change() * 100
@@ -131,175 +226,89 @@ class CourseSummaryAnalyzer:
 
         first_monday = start_ts - pd.Timedelta(days=start_ts.weekday())
 
-        week_ranges = []
-        current_date = first_monday
-        week_num = 1
-
-        while current_date <= end_ts:
-            week_end = current_date + pd.Timedelta(days=6)  
-            week_ranges.append({
-                'week_num': week_num,
-                'start_date': current_date,
-                'end_date': week_end
-            })
-            current_date += pd.Timedelta(days=7)
-            week_num += 1
-
-        def get_week_number(date):
-            date_ts = pd.Timestamp(date)
-            for week in week_ranges:
-                if week['start_date'] <= date_ts <= week['end_date']:
-                    return week['week_num']
-            return None
-
-        daily_stats['week_number'] = daily_stats['date'].apply(get_week_number)
+        daily_stats['week_number'] = week_numbers(daily_stats['date'], first_monday)
 
-    
         weekly_stats = daily_stats.groupby('week_number').agg({
             'total_views': 'sum',
-            'unique_users': 'max',
+            'unique_users': 'mean',
             'date': ['min', 'max']
         }).reset_index()
 
 
         weekly_stats.columns = ['week_number', 'total_views', 'avg_users', 'week_start', 'week_end']
+        weekly_stats['unique_users'] = self.aggregates.week_users[weekly_stats['week_number'].to_numpy() - 1]
 
         weekly_stats['view_change'] = weekly_stats['total_views'].pct_change() * 100
         weekly_stats['view_change'] = weekly_stats['view_change'].fillna(0)
 
-        def get_week_range(week_num):
-            week_data = next(w for w in week_ranges if w['week_num'] == week_num)
-            return [week_data['start_date'], week_data['end_date']]
+        # Months in order of appearance, which is also the order of 'months' below.
+        monthly_stats = daily_stats.groupby('month', sort=False).agg(
+            month_name=('month_name', 'first'),
+            total_views=('total_views', 'sum')
+        ).reset_index()
+        monthly_stats['unique_users'] = self.aggregates.month_users[monthly_stats['month'].to_numpy() - 1]
 
-        date_ranges = [get_week_range(week) for week in weekly_stats['week_number']]
+        date_ranges = week_date_ranges(weekly_stats['week_number'], first_monday)
 
         try:
             return {
                 'daily': {
                     'dates': daily_stats['date'].dt.strftime('%Y-%m-%d').tolist(),
-                    'views': daily_stats['total_views'].astype(int).tolist(),
-                    'unique_users': daily_stats['unique_users'].astype(int).tolist(),
-                    'rolling_average': daily_stats['rolling_avg_7day'].round(2).tolist(),
-                    'view_change': daily_stats['view_change'].round(2).tolist()
+                    'views': daily_stats['total_views'].to_numpy(np.int64),
+                    'unique_users': daily_stats['unique_users'].to_numpy(np.int64),
+                    'rolling_average': daily_stats['rolling_avg_7day'].round(2).to_numpy(),
+                    'view_change': daily_stats['view_change'].round(2).to_numpy()
                 },
                 'weekly': {
-                    'weeks': weekly_stats['week_number'].tolist(),
-                    'views': weekly_stats['total_views'].astype(int).tolist(),
-                    'avg_users': weekly_stats['avg_users'].round(1).tolist(),
-                    'view_change': weekly_stats['view_change'].round(2).tolist(),
-                    'date_ranges': [[d[0].strftime('%Y-%m-%d'), d[1].strftime('%Y-%m-%d')] 
-                                for d in date_ranges]
+                    'weeks': weekly_stats['week_number'].to_numpy(np.int64),
+                    'views': weekly_stats['total_views'].to_numpy(np.int64),
+                    'avg_users': weekly_stats['avg_users'].round(1).to_numpy(),
+                    'unique_users': weekly_stats['unique_users'].to_numpy(np.int64),
+                    'view_change': weekly_stats['view_change'].round(2).to_numpy(),
+                    'date_ranges': date_ranges
                 },
                 'monthly': {
-                    'months': daily_stats['month_name'].unique().tolist(),
-                    'views_by_month': daily_stats.groupby('month_name')['total_views'].sum().astype(int).tolist(),
-                    'users_by_month': daily_stats.groupby('month_name')['unique_users'].max().tolist()
+                    'months': monthly_stats['month_name'].tolist(),
+                    'views_by_month': monthly_stats['total_views'].to_numpy(np.int64),
+                    'users_by_month': monthly_stats['unique_users'].to_numpy(np.int64)
                 }
             }
-        except Exception as e:
-            print(f"Error in analyze_detailed_patterns: {str(e)}")
-            print(f"Daily stats dtypes: {daily_stats.dtypes}")
-            print(f"Sample of daily_stats: {daily_stats.head()}")
+        except Exception:
+            logger.exception("Error in analyze_detailed_patterns (daily stats dtypes: %s)", dict(daily_stats.dtypes))
             raise
     
     def analyze_hourly_patterns(self):
         """Analyze hourly patterns in page views"""
       
-        hourly_stats = self.all_student_data.groupby('hour').agg({
-            'views': 'sum',
-            'id': 'nunique',
-            'date': 'nunique'
-        }).reset_index()
-        
-        total_days = (self.end_date - self.start_date).days + 1  
-        total_views = int(hourly_stats['views'].sum())
-        
-        formatted_data = []
-        for _, row in hourly_stats.iterrows():
-            hour = int(row['hour'])
-            views = int(row['views'])
-            
-            formatted_hour = (
-                "12 AM" if hour == 0 
-                else f"{hour} AM" if hour < 12 
-                else "12 PM" if hour == 12 
-                else f"{hour-12} PM"
-            )
-            
-            period = (
-                "Morning" if 5 <= hour <= 11
-                else "Afternoon" if 12 <= hour <= 16
-                else "Evening" if 17 <= hour <= 21
-                else "Night"
-            )
-            
-            formatted_data.append({
-                'hour': hour,
-                'formatted_hour': formatted_hour,
-                'period': period,
-                'views': views,
-                'unique_users': int(row['id']),
-                'unique_days': int(row['date']),
-                'avg_daily_views': float(round(views / total_days, 2)),
-                'percentage': float(round((views / total_views * 100), 2))
-            })
-        
-        period_totals = {}
-        for data in formatted_data:
-            period = data['period']
-            if period not in period_totals:
-                period_totals[period] = {'views': 0, 'unique_users': 0}
-            period_totals[period]['views'] += data['views']
-            period_totals[period]['unique_users'] = max(
-                period_totals[period]['unique_users'],
-                data['unique_users']
-            )
-        
-        period_order = {
-            "Morning": 1,
-            "Afternoon": 2,
-            "Evening": 3,
-            "Night": 4
-        }
-        
-        period_summary = []
-        for period, totals in sorted(period_totals.items(), key=lambda x: period_order[x[0]]):
-            period_summary.append({
-                'period': period,
-                'views': int(totals['views']),
-                'unique_users': int(totals['unique_users']),
-                'percentage': float(round((totals['views'] / total_views * 100), 2))
-            })
-
-        return {
-            'hourly_data': sorted(formatted_data, key=lambda x: x['views'], reverse=True),
-            'period_summary': period_summary
-        }
+        return format_hourly_stats(self.aggregates.hourly_frame(), self.aggregates.total_days)
 
     
     def get_high_level_overview(self):
         """Generate high-level overview statistics"""
-        total_views = self.all_student_data['views'].sum()
-        unique_users = self.all_student_data['id'].nunique()  
-        total_days = (self.end_date - self.start_date).days + 1
+        total_views = self.aggregates.total_views
+        unique_users = self.aggregates.total_users
+        total_days = self.aggregates.total_days
         avg_views_per_day = round(total_views / total_days, 2)
-        active_days = self.all_student_data['date'].nunique()
+        active_days = self.aggregates.active_days
 
         return {
             'total_views': int(total_views),
             'unique_users': int(unique_users),
             'total_days': total_days,
             'active_days': active_days,
-            'avg_views_per_day': avg_views_per_day
+            'avg_views_per_day': avg_views_per_day,
+            'exact_users': bool(self.aggregates.exact)
         }
         
     def generate_report(self):
-        overview = self.get_high_level_overview()
-        detailed_stats = self.analyze_detailed_patterns()
-        hourly_data = self.analyze_hourly_patterns()  
-        daily_stats = self.analyze_daily_patterns()
-        monthly_stats = self.analyze_monthly_patterns()
-        
+        return self._format_report(
+            self.get_high_level_overview(),
+            self.analyze_detailed_patterns(),
+            self.analyze_hourly_patterns(),
+            self.analyze_daily_patterns()
+        )
+
+    def _format_report(self, overview, detailed_stats, hourly_data, daily_stats):
         report = [
             f"Course Access Pattern Analysis ({self.start_date} to {self.end_date})\n",
             "Overview:",
@@ -321,7 +330,7 @@ class CourseSummaryAnalyzer:
             report.append(
                 f"{month_name}:\n"
                 f"- Total Views: {int(views)}\n"
-                f"- Average Daily Users: {int(users)}"
+                f"- Unique Users: {int(users)}"
             )
 
         report.append("\nDaily Patterns:")
@@ -340,14 +349,16 @@ class CourseSummaryAnalyzer:
         report.append("\nWeekly Patterns:")
         report.append("-" * 50)
         
-        for week_num, views, users, week_range in zip(detailed_stats['weekly']['weeks'],
-                                                    detailed_stats['weekly']['views'],
-                                                    detailed_stats['weekly']['avg_users'],
-                                                    detailed_stats['weekly']['date_ranges']):
+        for week_num, views, users, week_users, week_range in zip(detailed_stats['weekly']['weeks'],
+                                                                detailed_stats['weekly']['views'],
+                                                                detailed_stats['weekly']['avg_users'],
+                                                                detailed_stats['weekly']['unique_users'],
+                                                                detailed_stats['weekly']['date_ranges']):
             report.append(
                 f"Week {week_num} ({week_range[0]} to {week_range[1]}):\n"
                 f"- Total Views: {int(views)}\n"
-                f"- Average Users: {int(users)}"
+                f"- Average Daily Users: {users}\n"
+                f"- Unique Users: {int(week_users)}"
             )
  
         report.append("\nHourly Patterns:")
@@ -372,12 +383,17 @@ class CourseSummaryAnalyzer:
     
     def generate_response(self):
         """Generate both text report and structured data"""
-        overview = self.get_high_level_overview()
-        detailed_stats = self.analyze_detailed_patterns()
-        hourly_stats = self.analyze_hourly_patterns()
-        daily_stats = self.analyze_daily_patterns()
-  
-        text_report = self.generate_report()
+        with span('analyze.overview'):
+            overview = self.get_high_level_overview()
+        with span('analyze.detailed'):
+            detailed_stats = self.analyze_detailed_patterns()
+        with span('analyze.hourly'):
+            hourly_stats = self.analyze_hourly_patterns()
+        with span('analyze.daily'):
+            daily_stats = self.analyze_daily_patterns()
+
+        with span('analyze.report'):
+            text_report = self._format_report(overview, detailed_stats, hourly_stats, daily_stats)
 
         structured_data = {
             "overview": overview,
@@ -392,6 +408,7 @@ class CourseSummaryAnalyzer:
                 "weeks": detailed_stats['weekly']['weeks'], 
                 "views": detailed_stats['weekly']['views'],
                 "avg_users": detailed_stats['weekly']['avg_users'],
+                "unique_users": detailed_stats['weekly']['unique_users'],
                 "view_change": detailed_stats['weekly']['view_change'],
                 "date_ranges": detailed_stats['weekly']['date_ranges']  
             },
@@ -0,0 +1,83 @@
+"""HyperLogLog sketches for approximate distinct-user counts.
+
+Sketches are kept sparse, as (register, rho) entries with at most one entry per
+register, so a day or hour of a small cohort costs a few entries and a large one is
+capped at HLL_REGISTERS. Merging is a per-register max, which makes distinct counts
+over any union of days or hours cheap. The standard error is 1.04 / sqrt(HLL_REGISTERS),
+about 0.8%; small counts use linear counting and are close to exact.
+"""
+import numpy as np
+
+HLL_PRECISION = 14
+HLL_REGISTERS = 1 << HLL_PRECISION
+_MAX_RHO = 64 - HLL_PRECISION + 1
+_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+
+
+def hash_ids(values):
+    """64-bit splitmix64 hash of integer ids, stable across processes and runs."""
+    with np.errstate(over='ignore'):
+        z = np.asarray(values).astype(np.int64).view(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def _bit_length(values):
+    # frexp is exact on 32-bit halves, unlike on full 64-bit values.
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+def entries(ids):
+    """(register, rho) for each id: the top bits pick the register, rho = leading zeros + 1."""
+    hashed = hash_ids(ids)
+    registers = (hashed >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+    remainder = hashed << np.uint64(HLL_PRECISION)
+    rho = np.minimum(64 - _bit_length(remainder) + 1, _MAX_RHO).astype(np.uint8)
+    return registers, rho
+
+
+def max_per_key(keys, rho):
+    """Sorted unique keys and the largest rho seen for each."""
+    combined = np.unique(np.asarray(keys, dtype=np.int64) * 64 + rho)
+    keys = combined // 64
+    last = np.ones(keys.size, dtype=bool)
+    last[:-1] = keys[1:] != keys[:-1]
+    return keys[last], (combined[last] % 64).astype(np.uint8)
+
+
+def pack(registers, rho):
+    """Serialize sketch entries as little-endian uint32 values, register << 6 | rho."""
+    return ((np.asarray(registers).astype(np.uint32) << np.uint32(6)) | rho).astype('<u4').tobytes()
+
+
+def unpack(data):
+    """(registers, rho) from bytes written by pack; concatenated blobs unpack as one."""
+    values = np.frombuffer(data, dtype='<u4')
+    return (values >> 6).astype(np.int64), (values & 63).astype(np.uint8)
+
+
+def estimate(inverse_sums, zeros):
+    """Cardinality estimates from each sketch's sum of 2^-rho over all registers and its empty registers."""
+    raw = _ALPHA * HLL_REGISTERS ** 2 / np.asarray(inverse_sums, dtype=np.float64)
+    zeros = np.asarray(zeros)
+    with np.errstate(divide='ignore'):
+        linear = HLL_REGISTERS * np.log(HLL_REGISTERS / np.maximum(zeros, 1))
+    estimate = np.where((raw <= 2.5 * HLL_REGISTERS) & (zeros > 0), linear, raw)
+    return np.rint(estimate).astype(np.int64)
+
+
+def count_by(codes, size, registers, rho):
+    """Estimated distinct count per group code in [0, size) from sketch entries.
+
+    Entries are merged per (group, register) and the estimate is taken straight from
+    the sparse entries, so no dense register matrix is built.
+    """
+    keys, rho = max_per_key(np.asarray(codes, dtype=np.int64) * HLL_REGISTERS + registers, rho)
+    groups = keys // HLL_REGISTERS
+    filled = np.bincount(groups, minlength=size)
+    inverse_sums = (HLL_REGISTERS - filled) + np.bincount(groups, weights=np.exp2(-rho.astype(np.float64)),
+                                                          minlength=size)
+    return estimate(inverse_sums, HLL_REGISTERS - filled)
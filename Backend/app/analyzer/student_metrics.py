@@ -0,0 +1,115 @@
+"""Per-student analysis metrics kept as state that new days fold into.
+
+A student's state is their first and last active day, active day count, views per
+time-of-day period and the gaps between active days seen so far. A day after the
+last active day extends it in constant time; only a day that lands before it (a
+late import or a rebuilt range) needs the student's days replayed. The metrics that
+depend on the course's length (avg_weekly_views, engagement_rate) are derived from
+the state and the number of weeks when they are published.
+"""
+from app.analyzer.course_analyzer import HOUR_PERIOD_INDEX, PERIODS
+
+# Inactive days between two active days from which a gap counts in total_gaps_4days.
+GAP_DAYS = 4
+
+
+def period_of(hour):
+    """Index into PERIODS of an hour of day."""
+    return int(HOUR_PERIOD_INDEX[hour])
+
+
+def week_of(day, first_monday):
+    """1-based Monday-to-Sunday week of day, counted from first_monday as in the analyzer."""
+    return (day - first_monday).days // 7 + 1
+
+
+class StudentState:
+    """What the metrics of one student in one course are computed from."""
+
+    def __init__(self, first_day=None, last_day=None, active_days=0, period_views=(0,) * len(PERIODS),
+                 gaps_4days=0, longest_gap=0):
+        self.first_day = first_day
+        self.last_day = last_day
+        self.active_days = active_days
+        self.period_views = list(period_views)
+        self.gaps_4days = gaps_4days
+        self.longest_gap = longest_gap
+
+    @classmethod
+    def from_days(cls, days):
+        """State from all of a student's (day, period_views) rows, in any order."""
+        state = cls()
+        for day, period_views in sorted(days, key=lambda row: row[0]):
+            state.add_day(day, period_views)
+        return state
+
+    @property
+    def views(self):
+        return sum(self.period_views)
+
+    @property
+    def total_gap_days(self):
+        if self.first_day is None:
+            return 0
+        return (self.last_day - self.first_day).days + 1 - self.active_days
+
+    def add_day(self, day, period_views):
+        """Fold views on day into the state; day must not be before the last active day.
+
+        Views on the last active day only add to the totals; a later day also closes
+        the gap since the last active day.
+        """
+        if self.last_day is None:
+            self.first_day = self.last_day = day
+            self.active_days = 1
+        elif day > self.last_day:
+            gap = (day - self.last_day).days - 1
+            if gap >= GAP_DAYS:
+                self.gaps_4days += 1
+            self.longest_gap = max(self.longest_gap, gap)
+            self.last_day = day
+            self.active_days += 1
+        elif day < self.last_day:
+            raise ValueError(f"{day} is before the last active day {self.last_day}; replay the student's days")
+        for period, views in enumerate(period_views):
+            self.period_views[period] += views
+
+    def summary(self, n_weeks):
+        """The analysis table's per-student columns, in SUMMARY_COLUMNS order."""
+        views = self.views
+        pct = [round(period / views * 100, 2) if views else 0.0 for period in self.period_views]
+        return (
+            views,
+            self.active_days,
+            round(views / self.active_days, 2) if self.active_days else 0.0,
+            round(views / n_weeks, 2),
+            round(self.active_days / (7 * n_weeks) * 100, 2),
+            *pct,
+            self.gaps_4days,
+            self.longest_gap,
+            self.total_gap_days,
+        )
+
+
+def week_rows(students, weeks, views):
+    """(student_id, week, views, pct_change, rank) rows of every student for the given weeks.
+
+    views maps week -> {student_id: views} and must also hold the week before the first
+    one. Students without views in a week get 0. pct_change is against the student's
+    previous week and None for week 1 or after a week without views; rank 1 is the
+    most views that week, and ties share a rank.
+    """
+    rows = []
+    for week in weeks:
+        current = views.get(week, {})
+        before = views.get(week - 1, {})
+        ranked = sorted((current.get(student, 0) for student in students), reverse=True)
+        ranks = {}
+        for position, value in enumerate(ranked, 1):
+            ranks.setdefault(value, position)
+        for student in students:
+            value = current.get(student, 0)
+            last = before.get(student, 0)
+            pct_change = round((value - last) / last * 100, 2) if last else None
+            rows.append((student, week, value, pct_change, ranks[value]))
+    return rows
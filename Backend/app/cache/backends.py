@@ -0,0 +1,156 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryCache:
+    """Per-process LRU cache with per-entry expiry.
+
+    Namespaces in limits get an LRU of their own, bounded by their limit, so they
+    neither evict nor are evicted by the shared max_entries LRU of the others.
+    """
+
+    def __init__(self, max_entries=1024, limits=None):
+        self.max_entries = max_entries
+        self.limits = dict(limits or {})
+        # LRU name (the namespace, or None for the shared one) -> (namespace, key) -> (expires_at, value)
+        self._lrus = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _lru(self, namespace):
+        name = namespace if namespace in self.limits else None
+        lru = self._lrus.get(name)
+        if lru is None:
+            lru = self._lrus[name] = OrderedDict()
+        return lru, self.limits.get(namespace, self.max_entries)
+
+    def get(self, namespace, key):
+        """Return (found, value)."""
+        with self._lock:
+            lru, _ = self._lru(namespace)
+            entry = lru.get((namespace, key))
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del lru[(namespace, key)]
+                return False, None
+            lru.move_to_end((namespace, key))
+            return True, value
+
+    def set(self, namespace, key, value, ttl):
+        with self._lock:
+            lru, max_entries = self._lru(namespace)
+            lru[(namespace, key)] = (time.time() + ttl, value)
+            lru.move_to_end((namespace, key))
+            while len(lru) > max_entries:
+                lru.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                removed = sum(len(lru) for lru in self._lrus.values())
+                self._lrus.clear()
+                return removed
+            lru, _ = self._lru(namespace)
+            keys = [k for k in lru if k[0] == namespace]
+            for k in keys:
+                del lru[k]
+            return len(keys)
+
+    def size(self):
+        with self._lock:
+            return sum(len(lru) for lru in self._lrus.values())
+
+
+class SQLiteCache:
+    """LRU cache in a local SQLite file, shared by every worker process on the host.
+
+    Values are pickled. Suitable for running several gunicorn workers without an
+    external cache server; invalidation from any worker is seen by all of them.
+    Namespaces in limits are bounded and evicted on their own, as in MemoryCache.
+    """
+
+    def __init__(self, path, max_entries=1024, limits=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.limits = dict(limits or {})
+        self._local = threading.local()
+        self.evictions = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn().execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self._conn().execute("CREATE INDEX IF NOT EXISTS ix_cache_last_used ON cache_entries (last_used)")
+        self._conn().execute("CREATE INDEX IF NOT EXISTS ix_cache_namespace_last_used "
+                             "ON cache_entries (namespace, last_used)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key):
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+        if row is None:
+            return False, None
+        now = time.time()
+        if row[1] <= now:
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+            return False, None
+        conn.execute("UPDATE cache_entries SET last_used = ? WHERE namespace = ? AND key = ?",
+                     (now, namespace, key))
+        return True, pickle.loads(row[0])
+
+    def set(self, namespace, key, value, ttl):
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl, now)
+        )
+        if namespace in self.limits:
+            where, params, max_entries = "namespace = ?", (namespace,), self.limits[namespace]
+        else:
+            where = f"namespace NOT IN ({', '.join('?' for _ in self.limits)})" if self.limits else "1 = 1"
+            params, max_entries = tuple(self.limits), self.max_entries
+        excess = conn.execute(f"SELECT COUNT(*) FROM cache_entries WHERE {where}", params).fetchone()[0] - max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE rowid IN "
+                f"(SELECT rowid FROM cache_entries WHERE {where} ORDER BY last_used LIMIT ?)",
+                (*params, excess)
+            )
+            self.evictions += excess
+
+    def invalidate(self, namespace=None):
+        conn = self._conn()
+        if namespace is None:
+            return conn.execute("DELETE FROM cache_entries").rowcount
+        return conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,)).rowcount
+
+    def size(self):
+        return self._conn().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
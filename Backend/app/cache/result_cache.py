@@ -0,0 +1,189 @@
+import functools
+import os
+import threading
+from dotenv import load_dotenv
+from app.cache.backends import MemoryCache, SQLiteCache
+from app.cache.single_flight import SingleFlight
+
+load_dotenv()
+
+# Seconds each cached service result stays valid. The underlying tables only change
+# when the nightly LMS import runs, which should call invalidate() when it finishes.
+DEFAULT_TTLS = {
+    'courses': 3600,
+    'course_name': 3600,
+    'students': 3600,
+    'participations': 3600,
+    'device_stats': 3600,
+    'video_stats': 3600,
+    'video_pages': 3600,
+    'discussion_stats': 3600,
+    'weekly_activity': 3600,
+    'detailed_weekly_activity': 3600,
+    'batch_weekly_activity': 3600,
+    'student_courses': 3600,
+    'course_summary': 3600,
+    # Per-day partial aggregates behind the course summary. Settled days do not
+    # change, so they live much longer than the assembled summaries.
+    'summary_days': 7 * 24 * 3600,
+}
+
+# Namespaces with an LRU of their own, bounded to this many entries, instead of a share
+# of CACHE_MAX_ENTRIES. Day partials hold user-id arrays and a long range adds one per
+# day: in the shared LRU they would push out every route's results, and be pushed out
+# by them in turn.
+DEFAULT_MAX_ENTRIES = {
+    'summary_days': 4096,
+}
+
+
+class ResultCache:
+    def __init__(self, backend=None, ttls=None, enabled=True, single_flight=True):
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.enabled = enabled
+        # Concurrent misses on the same key wait for one computation (also with caching off).
+        self.flights = SingleFlight() if single_flight else None
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    @classmethod
+    def from_env(cls):
+        """CACHE_BACKEND=memory|sqlite|none, CACHE_MAX_ENTRIES, CACHE_MAX_ENTRIES_<NAMESPACE>, CACHE_SQLITE_PATH,
+        CACHE_TTL_<NAMESPACE>, CACHE_SINGLE_FLIGHT."""
+        kind = os.getenv('CACHE_BACKEND', 'memory').lower()
+        max_entries = int(os.getenv('CACHE_MAX_ENTRIES', '1024'))
+        limits = {
+            namespace: int(os.getenv(f'CACHE_MAX_ENTRIES_{namespace.upper()}', str(limit)))
+            for namespace, limit in DEFAULT_MAX_ENTRIES.items()
+        }
+        ttls = {
+            namespace: int(os.environ[f'CACHE_TTL_{namespace.upper()}'])
+            for namespace in DEFAULT_TTLS
+            if f'CACHE_TTL_{namespace.upper()}' in os.environ
+        }
+
+        if kind == 'sqlite':
+            backend = SQLiteCache(os.getenv('CACHE_SQLITE_PATH', 'instance/result_cache.sqlite'), max_entries, limits)
+        elif kind in ('memory', 'none'):
+            backend = MemoryCache(max_entries, limits)
+        else:
+            raise ValueError(f"Unknown CACHE_BACKEND '{kind}', expected memory, sqlite or none.")
+        single_flight = os.getenv('CACHE_SINGLE_FLIGHT', 'true').lower() in ('true', '1')
+        return cls(backend, ttls, enabled=kind != 'none', single_flight=single_flight)
+
+    def _count(self, namespace, outcome):
+        with self._lock:
+            counters = self._metrics.setdefault(namespace, {'hits': 0, 'misses': 0})
+            counters[outcome] += 1
+
+    def lookup(self, namespace, key):
+        """Return (found, value) and record a hit or miss."""
+        if not self.enabled:
+            return False, None
+        found, value = self.backend.get(namespace, key)
+        self._count(namespace, 'hits' if found else 'misses')
+        return found, value
+
+    def store(self, namespace, key, value):
+        if self.enabled:
+            self.backend.set(namespace, key, value, self.ttls.get(namespace, 3600))
+
+    def get_or_compute(self, namespace, key, compute):
+        found, value = self.lookup(namespace, key)
+        if found:
+            return value
+        if self.flights is None:
+            return self._compute(namespace, key, compute)
+        return self.flights.do(namespace, key, lambda: self._compute(namespace, key, compute, recheck=True))
+
+    def _compute(self, namespace, key, compute, recheck=False):
+        if recheck and self.enabled:
+            # A flight that finished between our miss and this one has stored the value.
+            found, value = self.backend.get(namespace, key)
+            if found:
+                return value
+        value = compute()
+        self.store(namespace, key, value)
+        return value
+
+    def get_or_compute_many(self, namespace, keys, compute, cacheable=None):
+        """{key: value} for keys, with compute(missing keys) -> {key: value} called for the ones not cached.
+
+        Keys another caller is already computing are waited for rather than computed
+        again. Values are stored unless cacheable(key) is False; keys compute leaves
+        out are left out of the result.
+        """
+        result, missing = {}, []
+        for key in keys:
+            found, value = self.lookup(namespace, key)
+            if found:
+                result[key] = value
+            else:
+                missing.append(key)
+        if not missing:
+            return result
+
+        def compute_and_store(missing):
+            values = {}
+            if self.flights is not None and self.enabled:
+                # Flights that finished between our misses and now have stored their values.
+                for key in missing:
+                    found, value = self.backend.get(namespace, key)
+                    if found:
+                        values[key] = value
+                missing = [key for key in missing if key not in values]
+            if missing:
+                computed = compute(missing)
+                for key, value in computed.items():
+                    if cacheable is None or cacheable(key):
+                        self.store(namespace, key, value)
+                values.update(computed)
+            return values
+
+        if self.flights is None:
+            result.update(compute_and_store(missing))
+        else:
+            result.update(self.flights.do_many(namespace, missing, compute_and_store))
+        return result
+
+    def cached(self, namespace):
+        """Cache a function's results under namespace, keyed by its arguments."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = repr((args, sorted(kwargs.items())))
+                return self.get_or_compute(namespace, key, lambda: func(*args, **kwargs))
+            return wrapper
+        return decorator
+
+    def invalidate(self, namespace=None):
+        """Drop one namespace, or everything; returns the number of entries removed."""
+        return self.backend.invalidate(namespace)
+
+    def stats(self):
+        with self._lock:
+            namespaces = {name: dict(counters) for name, counters in self._metrics.items()}
+        flights = self.flights.stats() if self.flights is not None else {'in_flight': 0, 'namespaces': {}}
+        for name, counters in flights['namespaces'].items():
+            namespaces.setdefault(name, {'hits': 0, 'misses': 0})['coalesced'] = counters['coalesced']
+        hits = sum(c['hits'] for c in namespaces.values())
+        misses = sum(c['misses'] for c in namespaces.values())
+        coalesced = sum(c.get('coalesced', 0) for c in namespaces.values())
+        return {
+            'backend': type(self.backend).__name__,
+            'enabled': self.enabled,
+            'entries': self.backend.size(),
+            'evictions': self.backend.evictions,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+            'single_flight': self.flights is not None,
+            'coalesced': coalesced,
+            'in_flight': flights['in_flight'],
+            'namespaces': namespaces,
+        }
+
+
+result_cache = ResultCache.from_env()
+cached = result_cache.cached
@@ -0,0 +1,109 @@
+import threading
+
+# Value of a key that a do_many leader's function left out of its result.
+_MISSING = object()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same namespace and key onto one computation.
+
+    The first caller (the leader) runs the function; callers that arrive while it is
+    running wait for it and get its result, or its exception, instead of running their
+    own. Calls are only shared within a process: each gunicorn worker still computes
+    once for itself.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # (namespace, key) -> _Call
+        self._metrics = {}
+
+    def _count(self, namespace, outcome):
+        counters = self._metrics.setdefault(namespace, {'leaders': 0, 'coalesced': 0})
+        counters[outcome] += 1
+
+    def do(self, namespace, key, fn):
+        """fn() once for all concurrent callers with this namespace and key."""
+        with self._lock:
+            call = self._calls.get((namespace, key))
+            leader = call is None
+            if leader:
+                call = self._calls[(namespace, key)] = _Call()
+            self._count(namespace, 'leaders' if leader else 'coalesced')
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[(namespace, key)]
+            call.done.set()
+        return call.value
+
+    def do_many(self, namespace, keys, fn):
+        """{key: value} for keys, running fn(the keys no one else is computing) once and waiting for the rest.
+
+        fn takes a list of keys and returns {key: value}, e.g. from one batched query;
+        keys it leaves out are left out of the result too. A caller computes its own
+        keys before it waits for anyone else's, so two overlapping calls cannot wait
+        on each other.
+        """
+        led, joined = {}, {}
+        with self._lock:
+            for key in keys:
+                call = self._calls.get((namespace, key))
+                if call is None:
+                    led[key] = self._calls[(namespace, key)] = _Call()
+                    self._count(namespace, 'leaders')
+                else:
+                    joined[key] = call
+                    self._count(namespace, 'coalesced')
+
+        results = {}
+        if led:
+            try:
+                values = fn(list(led))
+                for key, call in led.items():
+                    call.value = values.get(key, _MISSING)
+                    if call.value is not _MISSING:
+                        results[key] = call.value
+            except BaseException as e:
+                for call in led.values():
+                    call.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in led:
+                        del self._calls[(namespace, key)]
+                for call in led.values():
+                    call.done.set()
+
+        for key, call in joined.items():
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            if call.value is not _MISSING:
+                results[key] = call.value
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'namespaces': {name: dict(counters) for name, counters in self._metrics.items()},
+            }
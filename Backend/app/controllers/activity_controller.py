@@ -1,24 +1,34 @@
 from flask import jsonify, request, Response
-import pandas as pd
-from app.database.connection import Database
 from datetime import datetime, timedelta
 from app.services.course_service import CourseService
 from app.services.activity_service import ActivityService
+from app.services.report_export import REPORT_FORMATS, COLUMNAR_FORMATS, columnar_available
+from app.serialization.json_provider import RESPONSE_SHAPES
+from app.storage.analysis import get_analysis_storage
 
 class ActivityController:
     @staticmethod
     def get_detailed_weekly_activity():
         course_id = request.args.get('course_id')
         student_ids = request.args.get('student_ids')
+        shape = request.args.get('shape', 'rows')
 
         if not course_id:
             return jsonify({"error": "Missing course_id parameter"}), 400
-        
+
+        try:
+            course_id = int(course_id)
+        except ValueError:
+            return jsonify({"error": "Invalid course_id parameter"}), 400
+
         if not student_ids:
             return jsonify({"error": "Missing student_ids parameter"}), 400
 
+        if shape not in RESPONSE_SHAPES:
+            return jsonify({"error": f"Invalid shape parameter, expected one of {', '.join(RESPONSE_SHAPES)}"}), 400
+
         try:
-            data = ActivityService.get_detailed_weekly_activity(course_id, student_ids)
+            data = ActivityService.get_detailed_weekly_activity(course_id, student_ids, shape == 'columns')
             return jsonify({
                 "success": True,
                 "course_id": course_id,
@@ -31,6 +41,38 @@ class ActivityController:
                 "error": str(e)
             }), 500
             
+    @staticmethod
+    def get_batch_weekly_activity():
+        payload = request.get_json(silent=True) or {}
+        courses = payload.get('courses')
+
+        if not isinstance(courses, list) or not courses:
+            return jsonify({"error": "Expected a JSON body with a non-empty 'courses' list"}), 400
+
+        selections = {}
+        for entry in courses:
+            if not isinstance(entry, dict):
+                return jsonify({"error": "Each entry in 'courses' must be an object"}), 400
+            course_id = str(entry.get('course_id', ''))
+            student_ids = entry.get('student_ids')
+            if not course_id.isdigit():
+                return jsonify({"error": "Each entry needs a numeric course_id"}), 400
+            if not isinstance(student_ids, list) or not student_ids:
+                return jsonify({"error": f"Course {course_id} needs a non-empty student_ids list"}), 400
+            selections.setdefault(course_id, []).extend(student_ids)
+
+        try:
+            data = ActivityService.get_batch_weekly_activity(selections)
+            return jsonify({
+                "success": True,
+                "courses": data
+            })
+        except Exception as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 500
+
     @staticmethod
     def get_weekly_activity():
         course_id = request.args.get('course_id')
@@ -38,7 +80,12 @@ class ActivityController:
         
         if not course_id:
             return jsonify({"error": "Missing course_id"}), 400
-            
+
+        try:
+            course_id = int(course_id)
+        except ValueError:
+            return jsonify({"error": "Invalid course_id parameter"}), 400
+
         try:
             data = ActivityService.get_weekly_activity(course_id, student_id)
             return jsonify({
@@ -49,36 +96,62 @@ class ActivityController:
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
+    @staticmethod
+    def get_student_courses():
+        student_id = request.args.get('student_id')
+
+        if not student_id:
+            return jsonify({"error": "Missing student_id parameter"}), 400
+
+        if not get_analysis_storage().cross_course:
+            return jsonify({"error": "Cross-course queries require ANALYSIS_STORAGE=unified", "success": False}), 501
+
+        try:
+            data = ActivityService.get_student_courses(student_id)
+            return jsonify({
+                "success": True,
+                "student_id": student_id,
+                "courses": data
+            })
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
+
     @staticmethod
     def download_report():
         course_id = request.args.get('course_id')
+        fmt = request.args.get('format', 'csv')
         if not course_id:
             return jsonify({"error": "Missing course_id parameter"}), 400
 
         try:
-            course_name = CourseService.get_course_name(course_id)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            sanitized_course_name = "".join(x for x in str(course_name) if x.isalnum() or x in [' ', '_']).strip()
-            filename = f"{sanitized_course_name}_activity_report_{timestamp}.csv"
-            
-            with Database.get_connection() as conn:
-                query = f"SELECT * FROM page_view_analysis_course_{course_id}"
-                df = pd.read_sql_query(query, conn)
-                
-                if df.empty:
-                    return jsonify({"error": "No data found for this course", "success": False}), 404
-                
-                df = df.drop(['original_id'], axis=1)
-                
-                output = df.to_csv(index=False)
-                
-                return Response(
-                    output,
-                    mimetype="text/csv",
-                    headers={
-                        "Content-Disposition": f"attachment;filename={filename}",
-                        "Content-Type": "text/csv",
-                    }
-                )
+            course_id = int(course_id)
+        except ValueError:
+            return jsonify({"error": "Invalid course_id parameter"}), 400
+
+        if fmt not in REPORT_FORMATS:
+            return jsonify({"error": f"Invalid format parameter, expected one of {', '.join(REPORT_FORMATS)}"}), 400
+
+        if fmt in COLUMNAR_FORMATS and not columnar_available():
+            return jsonify({"error": f"The {fmt} format requires pyarrow, which is not installed on the server", "success": False}), 501
+
+        try:
+            filename = ActivityService.report_filename(course_id, fmt)
+            mimetype = REPORT_FORMATS[fmt][0]
+
+            # Plain CSV is gzipped in transit when the client accepts it; csv.gz is a gzip file.
+            content_encoding = fmt == 'csv' and 'gzip' in request.accept_encodings
+            chunks = ActivityService.stream_report(course_id, 'csv.gz' if content_encoding else fmt)
+            if chunks is None:
+                return jsonify({"error": "No data found for this course", "success": False}), 404
+
+            headers = {
+                "Content-Disposition": f"attachment;filename={filename}",
+                "Content-Type": mimetype,
+            }
+            if content_encoding:
+                headers["Content-Encoding"] = "gzip"
+                headers["Vary"] = "Accept-Encoding"
+
+            return Response(chunks, mimetype=mimetype, headers=headers)
         except Exception as e:
             return jsonify({"success": False, "error": str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,39 @@
+import os
+from flask import jsonify, request
+from app.cache.result_cache import result_cache, DEFAULT_TTLS
+
+class CacheController:
+    @staticmethod
+    def _authorized():
+        token = os.getenv('CACHE_ADMIN_TOKEN')
+        return not token or request.headers.get('X-Cache-Token') == token
+
+    @staticmethod
+    def get_stats():
+        return jsonify(result_cache.stats())
+
+    @staticmethod
+    def invalidate():
+        if not CacheController._authorized():
+            return jsonify({"error": "Invalid or missing X-Cache-Token header"}), 403
+
+        payload = request.get_json(silent=True) or {}
+        namespaces = payload.get('namespaces')
+
+        if namespaces is not None:
+            unknown = [name for name in namespaces if name not in DEFAULT_TTLS]
+            if unknown:
+                return jsonify({"error": f"Unknown cache namespaces: {', '.join(unknown)}"}), 400
+
+        try:
+            if namespaces is None:
+                removed = result_cache.invalidate()
+            else:
+                removed = sum(result_cache.invalidate(name) for name in namespaces)
+            return jsonify({
+                "success": True,
+                "namespaces": namespaces or "all",
+                "removed": removed
+            })
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
@@ -1,4 +1,10 @@
-from app.services.course_service import CourseService
+from app.services.course_service import (
+    CourseService, SUMMARY_MODES, VIDEO_PAGE_SIZE, VIDEO_PAGE_SIZE_MAX, VIDEO_TOP_N,
+    columnar_summary, decode_video_cursor, encode_video_cursor
+)
+from app.services.dashboard_service import DashboardService, DASHBOARD_SECTIONS
+from app.serialization.json_provider import RESPONSE_SHAPES
+from datetime import datetime
 from flask import jsonify, request 
 
 class CourseController:
@@ -36,17 +42,28 @@ class CourseController:
         course_id = request.args.get('course_id')
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
+        mode = request.args.get('mode')
+        exact = request.args.get('exact', 'true').lower() in ('true', '1')
+        shape = request.args.get('shape', 'rows')
 
         if not all([course_id, start_date, end_date]):
             return jsonify({"error": "Missing required parameters"}), 400
 
+        if shape not in RESPONSE_SHAPES:
+            return jsonify({"error": f"Invalid shape parameter, expected one of {', '.join(RESPONSE_SHAPES)}"}), 400
+
+        if mode is not None and mode not in SUMMARY_MODES:
+            return jsonify({"error": f"Invalid mode parameter, expected one of {', '.join(SUMMARY_MODES)}"}), 400
+
         try:
-            summary = CourseService.get_course_summary(course_id, start_date, end_date)
-            print(summary)
+            summary = CourseService.get_course_summary(course_id, start_date, end_date, mode, exact)
+            data = summary["data"]
+            if shape == 'columns':
+                data = columnar_summary(data)
             return jsonify({
                 "success": True,
                 "summary": summary["summary"],
-                "data": summary["data"]
+                "data": data
             })
         except Exception as e:
             return jsonify({
@@ -76,6 +93,8 @@ class CourseController:
     @staticmethod        
     def get_course_device_stats():
         course_id = request.args.get('course_id')
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
         if not course_id:
             return jsonify({"error": "Missing course_id parameter"}), 400
         
@@ -83,10 +102,20 @@ class CourseController:
             course_id = int(course_id)
         except ValueError:
             return jsonify({"error": "Invalid course_id parameter"}), 400
+
+        try:
+            for value in (start_date, end_date):
+                if value:
+                    datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            return jsonify({"error": "Invalid date parameter, expected YYYY-MM-DD"}), 400
+
         try:
-            devicestats = CourseService.get_course_device_stats(course_id)
+            devicestats = CourseService.get_course_device_stats(course_id, start_date, end_date)
             return jsonify({
                 "course_id": course_id,
+                "start_date": start_date,
+                "end_date": end_date,
                 "devicestats": devicestats
             })
         except Exception as e:
@@ -102,9 +131,16 @@ class CourseController:
             course_id = int(course_id)
         except ValueError:
             return jsonify({"error": "Invalid course_id parameter"}), 400
+
+        try:
+            top_n = int(request.args.get('top', VIDEO_TOP_N))
+        except ValueError:
+            return jsonify({"error": "Invalid top parameter"}), 400
+        if not 1 <= top_n <= VIDEO_PAGE_SIZE_MAX:
+            return jsonify({"error": f"top must be between 1 and {VIDEO_PAGE_SIZE_MAX}"}), 400
             
         try:
-            video_stats = CourseService.get_course_video_stats(course_id)
+            video_stats = CourseService.get_course_video_stats(course_id, top_n)
             return jsonify({
                 "success": True,
                 "data": video_stats
@@ -114,6 +150,44 @@ class CourseController:
                 "success": False,
                 "error": f"Error fetching video statistics: {str(e)}"
             }), 500
+
+    @staticmethod
+    def get_course_videos():
+        course_id = request.args.get('course_id')
+        cursor = request.args.get('cursor')
+        if not course_id:
+            return jsonify({"error": "Missing course_id parameter"}), 400
+
+        try:
+            course_id = int(course_id)
+        except ValueError:
+            return jsonify({"error": "Invalid course_id parameter"}), 400
+
+        try:
+            limit = int(request.args.get('limit', VIDEO_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "Invalid limit parameter"}), 400
+        if not 1 <= limit <= VIDEO_PAGE_SIZE_MAX:
+            return jsonify({"error": f"limit must be between 1 and {VIDEO_PAGE_SIZE_MAX}"}), 400
+
+        try:
+            after = decode_video_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        try:
+            page = CourseService.get_course_videos(course_id, limit, after)
+            return jsonify({
+                "success": True,
+                "course_id": course_id,
+                "videos": page["videos"],
+                "next_cursor": encode_video_cursor(*page["next_after"]) if page["next_after"] else None
+            })
+        except Exception as e:
+            return jsonify({
+                "success": False,
+                "error": f"Error fetching videos: {str(e)}"
+            }), 500
         
     
     @staticmethod        
@@ -135,4 +209,37 @@ class CourseController:
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
-        
\ No newline at end of file
+        
+
+    @staticmethod
+    def get_course_dashboard():
+        course_id = request.args.get('course_id')
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        if not course_id:
+            return jsonify({"error": "Missing course_id parameter"}), 400
+
+        try:
+            course_id = int(course_id)
+        except ValueError:
+            return jsonify({"error": "Invalid course_id parameter"}), 400
+
+        if bool(start_date) != bool(end_date):
+            return jsonify({"error": "start_date and end_date must be given together"}), 400
+
+        available = list(DASHBOARD_SECTIONS) + (['summary'] if start_date else [])
+        requested = request.args.get('sections')
+        sections = requested.split(',') if requested else available
+        unknown = [name for name in sections if name not in available]
+        if unknown:
+            return jsonify({"error": f"Unknown or unavailable sections: {', '.join(unknown)}"}), 400
+
+        try:
+            dashboard = DashboardService.get_course_dashboard(course_id, sections, start_date, end_date)
+            return jsonify({
+                "success": not dashboard["errors"],
+                "course_id": course_id,
+                **dashboard
+            })
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
@@ -0,0 +1,149 @@
+from datetime import datetime
+from flask import current_app, jsonify, request, send_file
+from app.jobs.store import get_job_store
+from app.jobs.worker import ensure_workers, submit_job
+from app.serialization.json_provider import RESPONSE_SHAPES
+from app.services.course_service import SUMMARY_MODES
+from app.services.report_export import REPORT_FORMATS, COLUMNAR_FORMATS, columnar_available
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat(' ') if timestamp else None
+
+
+def _job_status(job):
+    status = {
+        "job_id": job['job_id'],
+        "type": job['kind'],
+        "params": job['params'],
+        "status": job['status'],
+        "attempts": job['attempts'],
+        "created_at": _iso(job['created_at']),
+        "started_at": _iso(job['started_at']),
+        "finished_at": _iso(job['finished_at']),
+    }
+    if job['status'] == 'done':
+        status["result_size"] = job['result_size']
+        status["result_url"] = f"/api/job-result?job_id={job['job_id']}"
+    if job['status'] == 'failed':
+        status["error"] = job['error']
+    return status
+
+
+class JobController:
+    @staticmethod
+    def _course_summary_params(payload):
+        course_id = payload.get('course_id')
+        start_date = payload.get('start_date')
+        end_date = payload.get('end_date')
+        mode = payload.get('mode')
+        shape = payload.get('shape', 'rows')
+
+        if not all([course_id, start_date, end_date]):
+            return None, "Missing required parameters"
+        try:
+            course_id = int(course_id)
+        except (TypeError, ValueError):
+            return None, "Invalid course_id parameter"
+        try:
+            for value in (start_date, end_date):
+                datetime.strptime(value, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            return None, "Invalid date parameter, expected YYYY-MM-DD"
+        if shape not in RESPONSE_SHAPES:
+            return None, f"Invalid shape parameter, expected one of {', '.join(RESPONSE_SHAPES)}"
+        if mode is not None and mode not in SUMMARY_MODES:
+            return None, f"Invalid mode parameter, expected one of {', '.join(SUMMARY_MODES)}"
+
+        return {
+            'course_id': course_id,
+            'start_date': start_date,
+            'end_date': end_date,
+            'mode': mode,
+            'exact': bool(payload.get('exact', True)),
+            'shape': shape,
+        }, None
+
+    @staticmethod
+    def _activity_report_params(payload):
+        course_id = payload.get('course_id')
+        fmt = payload.get('format', 'csv')
+
+        if not course_id:
+            return None, "Missing course_id parameter"
+        try:
+            course_id = int(course_id)
+        except (TypeError, ValueError):
+            return None, "Invalid course_id parameter"
+        if fmt not in REPORT_FORMATS:
+            return None, f"Invalid format parameter, expected one of {', '.join(REPORT_FORMATS)}"
+
+        return {'course_id': course_id, 'format': fmt}, None
+
+    @staticmethod
+    def submit_job():
+        payload = request.get_json(silent=True) or {}
+        kind = payload.get('type')
+
+        if kind == 'course-summary':
+            params, error = JobController._course_summary_params(payload)
+        elif kind == 'activity-report':
+            params, error = JobController._activity_report_params(payload)
+        else:
+            return jsonify({"error": "Invalid type parameter, expected course-summary or activity-report"}), 400
+        if error:
+            return jsonify({"error": error}), 400
+
+        if kind == 'activity-report' and params['format'] in COLUMNAR_FORMATS and not columnar_available():
+            return jsonify({"error": f"The {params['format']} format requires pyarrow, which is not installed on the server", "success": False}), 501
+
+        try:
+            job, created = submit_job(kind, params)
+            response = jsonify(dict(_job_status(job), success=True, deduplicated=not created))
+            response.headers['Location'] = f"/api/jobs?job_id={job['job_id']}"
+            return response, 202
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
+
+    @staticmethod
+    def get_job():
+        job_id = request.args.get('job_id')
+        if not job_id:
+            return jsonify({"error": "Missing job_id parameter"}), 400
+
+        try:
+            # A restarted server picks the queue up again once a client polls it.
+            ensure_workers()
+            job = get_job_store().job(job_id)
+            if job is None:
+                return jsonify({"error": "Unknown job_id"}), 404
+            return jsonify(_job_status(job))
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @staticmethod
+    def get_job_result():
+        job_id = request.args.get('job_id')
+        if not job_id:
+            return jsonify({"error": "Missing job_id parameter"}), 400
+
+        try:
+            ensure_workers()
+            job = get_job_store().job(job_id)
+            if job is None:
+                return jsonify({"error": "Unknown job_id"}), 404
+            if job['status'] == 'failed':
+                return jsonify({"success": False, "error": job['error']}), 500
+            if job['status'] != 'done':
+                return jsonify(_job_status(job)), 202
+
+            if job['filename'] is None:
+                # JSON bodies go through the response hooks like any other, so they are compressed.
+                with open(job['result_path'], 'rb') as f:
+                    return current_app.response_class(f.read(), mimetype=job['mimetype'])
+            return send_file(job['result_path'], mimetype=job['mimetype'], as_attachment=True,
+                             download_name=job['filename'])
+        except FileNotFoundError:
+            return jsonify({"error": "The job's result has expired"}), 404
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
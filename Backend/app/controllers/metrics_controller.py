@@ -0,0 +1,62 @@
+from flask import Response
+from app.cache.result_cache import result_cache
+from app.database.connection import Database
+from app.instrumentation.metrics import family, render, request_seconds, span_seconds
+
+# ConnectionPool.stats() key -> help text; keys that only ever grow are exported as counters.
+POOL_GAUGES = {
+    'size': 'Open database connections, idle or borrowed.',
+    'idle': 'Database connections waiting in the pool.',
+    'borrowed': 'Database connections currently borrowed.',
+    'waiting': 'Threads waiting for a database connection.',
+    'min_size': 'Configured minimum pool size.',
+    'max_size': 'Configured maximum pool size.',
+}
+POOL_COUNTERS = {
+    'created': 'Database connections opened.',
+    'closed': 'Database connections closed.',
+    'borrows': 'Connections handed out by the pool.',
+    'health_check_failures': 'Idle connections discarded by the health check.',
+    'timeouts': 'Acquires that timed out waiting for a connection.',
+}
+
+
+class MetricsController:
+    @staticmethod
+    def _pool_families():
+        stats = Database.pool_stats()
+        if stats is None:
+            return []
+        return [
+            family(f'db_pool_{name}', 'gauge', help_text, [({}, stats[name])])
+            for name, help_text in POOL_GAUGES.items()
+        ] + [
+            family(f'db_pool_{name}_total', 'counter', help_text, [({}, stats[name])])
+            for name, help_text in POOL_COUNTERS.items()
+        ]
+
+    @staticmethod
+    def _cache_families():
+        stats = result_cache.stats()
+        namespaces = stats['namespaces']
+        return [
+            family('result_cache_entries', 'gauge', 'Entries in the result cache.', [({}, stats['entries'])]),
+            family('result_cache_evictions_total', 'counter', 'Result cache LRU evictions.',
+                   [({}, stats['evictions'])]),
+            family('result_cache_hits_total', 'counter', 'Result cache hits by namespace.',
+                   [({'namespace': name}, counters['hits']) for name, counters in sorted(namespaces.items())]),
+            family('result_cache_misses_total', 'counter', 'Result cache misses by namespace.',
+                   [({'namespace': name}, counters['misses']) for name, counters in sorted(namespaces.items())]),
+            family('result_cache_coalesced_total', 'counter',
+                   'Cache misses that waited for an identical in-flight computation, by namespace.',
+                   [({'namespace': name}, counters.get('coalesced', 0)) for name, counters in sorted(namespaces.items())]),
+            family('result_cache_in_flight', 'gauge', 'Computations other callers can currently join.',
+                   [({}, stats['in_flight'])]),
+        ]
+
+    @staticmethod
+    def get_metrics():
+        families = [request_seconds.family(), span_seconds.family()]
+        families += MetricsController._pool_families()
+        families += MetricsController._cache_families()
+        return Response(render(families), mimetype='text/plain; version=0.0.4')
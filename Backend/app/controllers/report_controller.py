@@ -0,0 +1,105 @@
+import os
+from datetime import datetime
+from flask import current_app, jsonify, request
+from app.jobs.worker import submit_job
+from app.reports.batch import SUMMARY_WORKERS
+from app.reports.store import get_report_store
+from app.serialization import json_provider
+from app.services.course_service import CourseService, SUMMARY_MODES
+
+
+class ReportController:
+    @staticmethod
+    def _authorized():
+        token = os.getenv('REPORT_ADMIN_TOKEN')
+        return not token or request.headers.get('X-Report-Token') == token
+
+    @staticmethod
+    def start_summary_run():
+        if not ReportController._authorized():
+            return jsonify({"error": "Invalid or missing X-Report-Token header"}), 403
+
+        payload = request.get_json(silent=True) or {}
+        start_date = payload.get('start_date')
+        end_date = payload.get('end_date')
+        mode = payload.get('mode')
+        course_ids = payload.get('course_ids')
+
+        if not all([start_date, end_date]):
+            return jsonify({"error": "Missing required parameters"}), 400
+
+        try:
+            for value in (start_date, end_date):
+                datetime.strptime(value, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid date parameter, expected YYYY-MM-DD"}), 400
+
+        if mode is not None and mode not in SUMMARY_MODES:
+            return jsonify({"error": f"Invalid mode parameter, expected one of {', '.join(SUMMARY_MODES)}"}), 400
+
+        if course_ids is not None:
+            if not isinstance(course_ids, list) or not course_ids:
+                return jsonify({"error": "course_ids must be a non-empty list"}), 400
+            try:
+                course_ids = [int(course_id) for course_id in course_ids]
+            except (TypeError, ValueError):
+                return jsonify({"error": "Invalid course_ids parameter"}), 400
+
+        try:
+            workers = int(payload.get('workers', SUMMARY_WORKERS))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid workers parameter"}), 400
+
+        try:
+            if course_ids is None:
+                course_ids = [course['course_id'] for course in CourseService.get_all_courses()]
+            run_id = get_report_store().create_run(course_ids, start_date, end_date, mode,
+                                                   bool(payload.get('exact', True)))
+            job, _ = submit_job('summary-run', {'run_id': run_id, 'workers': workers})
+            return jsonify({
+                "success": True,
+                "run_id": run_id,
+                "job_id": job['job_id'],
+                "courses": len(course_ids)
+            }), 202
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
+
+    @staticmethod
+    def get_summary_runs():
+        run_id = request.args.get('run_id')
+        try:
+            store = get_report_store()
+            if not run_id:
+                return jsonify({"runs": store.runs()})
+
+            run = store.run(run_id)
+            if run is None:
+                return jsonify({"error": "Unknown run_id"}), 404
+            return jsonify(dict(run, course_reports=store.course_statuses(run_id)))
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    @staticmethod
+    def get_summary_report():
+        run_id = request.args.get('run_id')
+        course_id = request.args.get('course_id')
+
+        if not all([run_id, course_id]):
+            return jsonify({"error": "Missing required parameters"}), 400
+
+        try:
+            course_id = int(course_id)
+        except ValueError:
+            return jsonify({"error": "Invalid course_id parameter"}), 400
+
+        try:
+            report = get_report_store().report(run_id, course_id)
+            if report is None:
+                return jsonify({"error": "No finished report for this run_id and course_id"}), 404
+            summary, data = report
+            # The data was encoded once by the worker; it is sent as stored, not decoded again.
+            body = b'{"success":true,"summary":' + json_provider.dumps(summary) + b',"data":' + data + b'}'
+            return current_app.response_class(body, mimetype='application/json')
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 500
@@ -1,12 +1,16 @@
-import pyodbc
 import os
+import threading
 from dotenv import load_dotenv
+from app.database.pool import ConnectionPool, ping
 
 load_dotenv()
 
 class Database:
+    _pool = None
+    _lock = threading.Lock()
+
     @staticmethod
-    def get_connection():
+    def connection_string():
         server = os.getenv('SERVER')
         database = os.getenv('DATABASE')
         uid = os.getenv('UID')
@@ -15,7 +19,7 @@ class Database:
         if not all([server, database, uid, password]):
             raise ValueError("Missing required database environment variables.")
 
-        return pyodbc.connect(
+        return (
             f"DRIVER={{ODBC Driver 18 for SQL Server}};"
             f"SERVER={server};"
             f"DATABASE={database};"
@@ -23,4 +27,67 @@ class Database:
             f"PWD={password};"
             "Encrypt=yes;"
             "TrustServerCertificate=yes;"
-        )
\ No newline at end of file
+        )
+
+    @classmethod
+    def sql_server_connect(cls):
+        # pyodbc is only needed for the real SQL Server; stand-ins passed to
+        # configure() (e.g. SQLite in the benchmarks) run without it.
+        import pyodbc
+
+        conn_str = cls.connection_string()
+        return lambda: pyodbc.connect(conn_str)
+
+    @staticmethod
+    def pool_options_from_env():
+        health_check = os.getenv('DB_POOL_HEALTH_CHECK', 'true').lower() in ('1', 'true', 'yes')
+        return {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            'idle_timeout': float(os.getenv('DB_POOL_IDLE_TIMEOUT', '300')),
+            'acquire_timeout': float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', '30')),
+            'health_check': ping if health_check else (lambda raw: True),
+        }
+
+    @classmethod
+    def configure(cls, connect=None, **pool_options):
+        """Replace the process-wide pool, e.g. to point the app at a local stand-in database.
+
+        `connect` defaults to a pyodbc connection built from the environment; any pool
+        option not given is read from the DB_POOL_* environment variables.
+        """
+        if connect is None:
+            connect = cls.sql_server_connect()
+
+        options = cls.pool_options_from_env()
+        options.update(pool_options)
+        pool = ConnectionPool(connect, **options)
+
+        with cls._lock:
+            old, cls._pool = cls._pool, pool
+        if old is not None:
+            old.close()
+        return pool
+
+    @classmethod
+    def get_pool(cls):
+        pool = cls._pool
+        if pool is None:
+            with cls._lock:
+                pool = cls._pool
+                if pool is None:
+                    pool = cls._pool = ConnectionPool(
+                        cls.sql_server_connect(),
+                        **cls.pool_options_from_env()
+                    )
+        return pool
+
+    @classmethod
+    def get_connection(cls):
+        """Borrow a pooled connection; close() or leaving a with block returns it to the pool."""
+        return cls.get_pool().acquire()
+
+    @classmethod
+    def pool_stats(cls):
+        pool = cls._pool
+        return pool.stats() if pool is not None else None
@@ -0,0 +1,284 @@
+import logging
+import threading
+import time
+from collections import deque
+from app.instrumentation.spans import TimedCursor
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class PooledConnection:
+    """Borrowed connection that goes back to its pool on close() or at the end of a with block."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    @property
+    def raw(self):
+        if self._raw is None:
+            raise RuntimeError("Connection has already been returned to the pool.")
+        return self._raw
+
+    def cursor(self):
+        return TimedCursor(self.raw.cursor())
+
+    def commit(self):
+        return self.raw.commit()
+
+    def rollback(self):
+        return self.raw.rollback()
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw)
+
+    def discard(self):
+        """Close the underlying connection instead of returning it, e.g. after a broken link."""
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw, discard=True)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Same semantics as a pyodbc connection used as a context manager
+        # (commit on success, rollback on error), plus returning it to the pool.
+        try:
+            if self._raw is not None:
+                if exc_type is None:
+                    self._raw.commit()
+                else:
+                    self._raw.rollback()
+        except Exception:
+            self.discard()
+            raise
+        finally:
+            self.close()
+        return False
+
+    def __del__(self):
+        # A finalizer can run on a thread that holds the pool's lock, so it must not take
+        # it: the leaked connection is only queued, and the pool discards it later.
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._leaked.append(raw)
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of DB-API connections.
+
+    `connect` is any zero-argument callable returning a new connection, so the pool
+    works the same for pyodbc and for local stand-ins such as sqlite3.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, idle_timeout=300.0,
+                 acquire_timeout=30.0, health_check=None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size: need 0 <= min_size <= max_size and max_size >= 1.")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self._health_check = health_check if health_check is not None else ping
+
+        self._idle = deque()  # (raw connection, time it was returned)
+        self._size = 0
+        self._borrowed = 0
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        # Connections whose PooledConnection was collected without close(). deque.append
+        # needs no lock, so finalizers can add to it; see _drain_leaked.
+        self._leaked = deque()
+        self._counters = {
+            'created': 0,
+            'closed': 0,
+            'borrows': 0,
+            'health_check_failures': 0,
+            'timeouts': 0,
+        }
+
+        for _ in range(min_size):
+            raw = self._new_connection()
+            with self._cond:
+                self._size += 1
+                self._idle.append((raw, time.monotonic()))
+
+    def _new_connection(self):
+        raw = self._connect()
+        with self._cond:
+            self._counters['created'] += 1
+        return raw
+
+    def _close_raw(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._counters['closed'] += 1
+
+    def _drain_leaked(self):
+        """Stop counting leaked connections as borrowed; returns them to be closed. Caller holds the lock."""
+        leaked = []
+        while self._leaked:
+            leaked.append(self._leaked.popleft())
+        if leaked:
+            self._borrowed -= len(leaked)
+            self._size -= len(leaked)
+            self._cond.notify(len(leaked))
+            logger.warning("%s database connections were not closed by their borrower; discarding them",
+                           len(leaked))
+        return leaked
+
+    def _reap_idle(self, now):
+        """Pop idle connections past idle_timeout, keeping min_size alive. Caller holds the lock."""
+        expired = []
+        if self.idle_timeout is None:
+            return expired
+        while self._idle and self._size > self.min_size:
+            raw, returned_at = self._idle[0]
+            if now - returned_at < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            expired.append(raw)
+        return expired
+
+    def acquire(self, timeout=None):
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            raw = None
+            create = False
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed.")
+                expired = self._drain_leaked() + self._reap_idle(time.monotonic())
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout(
+                            f"Timed out after {timeout}s waiting for a database connection "
+                            f"(max_size={self.max_size})."
+                        )
+                    self._waiting += 1
+                    try:
+                        # Leaks free a slot without a notify, so look for them every second.
+                        self._cond.wait(min(remaining, 1.0))
+                    finally:
+                        self._waiting -= 1
+                    expired += self._drain_leaked()
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed.")
+
+                if self._idle:
+                    # Most recently returned first, so surplus connections age out.
+                    raw, _ = self._idle.pop()
+                else:
+                    create = True
+                    self._size += 1
+                self._borrowed += 1
+                self._counters['borrows'] += 1
+
+            for old in expired:
+                self._close_raw(old)
+
+            if create:
+                try:
+                    raw = self._new_connection()
+                except Exception:
+                    self._forget_borrowed()
+                    raise
+                return PooledConnection(self, raw)
+
+            if self._is_healthy(raw):
+                return PooledConnection(self, raw)
+
+            with self._cond:
+                self._counters['health_check_failures'] += 1
+            self._close_raw(raw)
+            self._forget_borrowed()
+
+    def _is_healthy(self, raw):
+        try:
+            return self._health_check(raw) is not False
+        except Exception:
+            return False
+
+    def _forget_borrowed(self):
+        with self._cond:
+            self._size -= 1
+            self._borrowed -= 1
+            self._cond.notify()
+
+    def release(self, raw, discard=False):
+        if not discard:
+            try:
+                raw.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            self._borrowed -= 1
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+            leaked = self._drain_leaked()
+
+        if discard or self._closed:
+            self._close_raw(raw)
+        for old in leaked:
+            self._close_raw(old)
+
+    def stats(self):
+        with self._cond:
+            leaked = self._drain_leaked()
+            stats = {
+                'size': self._size,
+                'idle': len(self._idle),
+                'borrowed': self._borrowed,
+                'waiting': self._waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                **self._counters,
+            }
+        for raw in leaked:
+            self._close_raw(raw)
+        return stats
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle = [raw for raw, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for raw in idle:
+            self._close_raw(raw)
+
+
+def ping(raw):
+    cursor = raw.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    finally:
+        cursor.close()
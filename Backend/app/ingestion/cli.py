@@ -0,0 +1,47 @@
+"""Import LMS export files into page_views and detailed_page_views.
+
+    python -m app.ingestion.cli create                              # bookkeeping tables, once
+    python -m app.ingestion.cli load page_views exports/page_views_*.csv.gz
+    python -m app.ingestion.cli load detailed_page_views events.jsonl --workers 8
+
+Files may be CSV or JSON lines, optionally gzipped. Loading the same files again
+inserts nothing. Run the rollup refresh (python -m app.rollups.cli refresh) after
+an import.
+"""
+import argparse
+import json
+import sys
+import time
+from app.ingestion.pipeline import INGEST_WORKERS, create_tables, ingest_files
+from app.ingestion.tables import TARGETS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import LMS export files.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('create', help='create the ingestion_files and ingestion_watermarks tables')
+    load = commands.add_parser('load', help='load export files into a table')
+    load.add_argument('table', choices=sorted(TARGETS))
+    load.add_argument('paths', nargs='+')
+    load.add_argument('--workers', type=int, default=INGEST_WORKERS, help='files loaded in parallel')
+
+    args = parser.parse_args(argv)
+    if args.command == 'create':
+        print(json.dumps({'created': create_tables()}))
+        return 0
+
+    t0 = time.perf_counter()
+    totals = {'files': 0, 'skipped': 0, 'read': 0, 'inserted': 0, 'rejected': 0}
+    for result in ingest_files(args.paths, args.table, workers=args.workers):
+        print(json.dumps(result))
+        totals['files'] += 1
+        totals['skipped'] += result['skipped']
+        for key in ('read', 'inserted', 'rejected'):
+            totals[key] += result[key]
+    elapsed = time.perf_counter() - t0
+    print(json.dumps(dict(totals, seconds=round(elapsed, 2), rows_per_s=round(totals['read'] / elapsed))))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
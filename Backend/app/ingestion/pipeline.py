@@ -0,0 +1,250 @@
+"""Load LMS export files into page_views and detailed_page_views.
+
+Each file is streamed through a generator pipeline (read records -> parse rows ->
+batches) and inserted INGEST_BATCH_SIZE rows at a time with one parameter-array
+executemany per batch (pyodbc's fast_executemany on SQL Server). Files run in
+parallel on a process pool, one file per worker.
+
+Re-running an import does not duplicate rows:
+  - ingestion_files records each loaded file by its sha256, and a file seen before
+    is skipped without being parsed;
+  - ingestion_watermarks keeps, per table and course, the latest date loaded. A
+    batch whose rows are all newer than their course's watermark cannot repeat a
+    loaded row and is inserted directly. Any other batch goes through a staging
+    table and only rows whose key is not in the table yet are inserted.
+Files loaded concurrently in one run are assumed not to repeat each other's rows,
+as is the case for per-day or per-course exports.
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from app.database.connection import Database
+from app.ingestion.sources import file_digest, read_records
+from app.ingestion.tables import TARGETS, parse_datetime
+
+logger = logging.getLogger(__name__)
+
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '10000'))
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Rejected records logged per file; the rest are only counted.
+LOGGED_REJECTS = 5
+
+TABLES = {
+    'ingestion_files': """
+        CREATE TABLE ingestion_files (
+            table_name VARCHAR(64) NOT NULL,
+            digest CHAR(64) NOT NULL,
+            source NVARCHAR(400) NOT NULL,
+            rows_read INT NOT NULL,
+            rows_inserted INT NOT NULL,
+            rows_rejected INT NOT NULL,
+            ingested_at DATETIME2 NOT NULL,
+            CONSTRAINT pk_ingestion_files PRIMARY KEY (table_name, digest)
+        )
+    """,
+    'ingestion_watermarks': """
+        CREATE TABLE ingestion_watermarks (
+            table_name VARCHAR(64) NOT NULL,
+            course_id INT NOT NULL,
+            high_water DATETIME2 NOT NULL,
+            CONSTRAINT pk_ingestion_watermarks PRIMARY KEY (table_name, course_id)
+        )
+    """,
+}
+
+
+def create_tables():
+    """Create the ingestion bookkeeping tables that do not exist yet; returns the names created."""
+    created = []
+    with Database.get_connection() as conn:
+        cursor = conn.cursor()
+        for table, ddl in TABLES.items():
+            try:
+                cursor.execute(f"SELECT TOP 1 1 FROM {table}")
+                cursor.fetchall()
+            except Exception:
+                cursor.execute(ddl)
+                created.append(table)
+    return created
+
+
+def parse_rows(records, target, counts):
+    """Row tuples of target from export records; records that do not parse are counted and skipped."""
+    parse = None
+    for number, record in enumerate(records, 1):
+        counts['read'] += 1
+        if parse is None:
+            parse = target.parser(target.field_map(record))
+        try:
+            yield parse(record)
+        except (ValueError, TypeError) as e:
+            counts['rejected'] += 1
+            if counts['rejected'] <= LOGGED_REJECTS:
+                logger.warning("Skipping record %d of %s: %s", number, counts['source'], e)
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _watermarks(cursor, target, course_ids):
+    """({course_id: stored watermark}, {course_id: latest date loaded or None}) for the courses.
+
+    A course without a stored watermark may still have rows loaded before ingestion
+    ran, so its latest date is read from the table itself.
+    """
+    cursor.execute("SELECT course_id, high_water FROM ingestion_watermarks WHERE table_name = ?", (target.table,))
+    stored = {int(course_id): parse_datetime(high_water) for course_id, high_water in cursor.fetchall()}
+    latest = {}
+    for course_id in course_ids:
+        if course_id in stored:
+            latest[course_id] = stored[course_id]
+        else:
+            cursor.execute(f"SELECT MAX({target.names[target.date_index]}) FROM {target.table} WHERE course_id = ?",
+                           (course_id,))
+            high_water = cursor.fetchone()[0]
+            latest[course_id] = parse_datetime(high_water) if high_water is not None else None
+    return stored, latest
+
+
+def _date_ranges(target, batch):
+    """{course_id: (first date, last date)} of the batch's rows."""
+    ranges = {}
+    for row in batch:
+        course_id, day = row[target.course_index], row[target.date_index]
+        first, last = ranges.get(course_id, (day, day))
+        ranges[course_id] = (min(first, day), max(last, day))
+    return ranges
+
+
+def _stage_table(target):
+    return f"#ingest_{target.table}"
+
+
+def load_batch(cursor, target, batch):
+    """Insert the batch's rows that are not loaded yet and advance the watermarks; returns rows inserted."""
+    # Repeats within the batch: the first row of each key wins, as it would across batches.
+    unique = {}
+    for row in batch:
+        unique.setdefault(tuple(row[i] for i in target.key_index), row)
+    rows = list(unique.values())
+
+    columns = ', '.join(target.names)
+    placeholders = ', '.join('?' for _ in target.names)
+    ranges = _date_ranges(target, rows)
+    stored, latest = _watermarks(cursor, target, ranges)
+    new_only = all(latest[course_id] is None or first > latest[course_id]
+                   for course_id, (first, _) in ranges.items())
+
+    if new_only:
+        cursor.executemany(f"INSERT INTO {target.table} ({columns}) VALUES ({placeholders})", rows)
+        inserted = len(rows)
+    else:
+        stage = _stage_table(target)
+        cursor.execute(f"DELETE FROM {stage}")
+        cursor.executemany(f"INSERT INTO {stage} ({columns}) VALUES ({placeholders})", rows)
+        matches = ' AND '.join(f"t.{column} = s.{column}" for column in target.key)
+        cursor.execute(f"""
+            INSERT INTO {target.table} ({columns})
+            SELECT {', '.join(f's.{column}' for column in target.names)}
+            FROM {stage} s
+            WHERE NOT EXISTS (SELECT 1 FROM {target.table} t WHERE {matches})
+        """)
+        inserted = cursor.rowcount
+
+    # Another worker may advance the same course's watermark meanwhile: it only ever
+    # moves forward, and the lock hints keep two first batches from both inserting it.
+    for course_id, (_, last) in ranges.items():
+        high_water = max(last, latest[course_id]) if latest[course_id] is not None else last
+        if course_id in stored:
+            cursor.execute("""
+                UPDATE ingestion_watermarks SET high_water = ?
+                WHERE table_name = ? AND course_id = ? AND high_water < ?
+            """, (high_water, target.table, course_id, high_water))
+        else:
+            cursor.execute("""
+                INSERT INTO ingestion_watermarks (table_name, course_id, high_water)
+                SELECT ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM ingestion_watermarks WITH (UPDLOCK, HOLDLOCK)
+                                  WHERE table_name = ? AND course_id = ?)
+            """, (target.table, course_id, high_water, target.table, course_id))
+            if cursor.rowcount == 0:
+                cursor.execute("""
+                    UPDATE ingestion_watermarks SET high_water = ?
+                    WHERE table_name = ? AND course_id = ? AND high_water < ?
+                """, (high_water, target.table, course_id, high_water))
+    return inserted
+
+
+def ingest_file(path, table):
+    """Load one export file into table; returns counts for the file.
+
+    Every batch is committed with its watermark update, so an interrupted file can
+    simply be loaded again. The file is recorded in ingestion_files once done.
+    """
+    target = TARGETS[table]
+    digest = file_digest(path)
+    counts = {'source': str(path), 'table': table, 'read': 0, 'inserted': 0, 'rejected': 0, 'batches': 0}
+    with Database.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM ingestion_files WHERE table_name = ? AND digest = ?", (table, digest))
+        if cursor.fetchone() is not None:
+            return dict(counts, skipped=True)
+
+        # pyodbc sends each executemany as one parameter array instead of a round trip per row.
+        cursor.fast_executemany = True
+        stage = _stage_table(target)
+        cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+        cursor.execute(f"CREATE TABLE {stage} ("
+                       + ', '.join(f"{column} {spec[0]}" for column, spec in target.columns.items()) + ")")
+        try:
+            for batch in batched(parse_rows(read_records(path), target, counts), INGEST_BATCH_SIZE):
+                counts['inserted'] += load_batch(cursor, target, batch)
+                counts['batches'] += 1
+                conn.commit()
+            cursor.execute(
+                "INSERT INTO ingestion_files (table_name, digest, source, rows_read, rows_inserted, rows_rejected, "
+                "ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (table, digest, os.path.basename(str(path))[:400], counts['read'], counts['inserted'],
+                 counts['rejected'], datetime.now())
+            )
+        finally:
+            cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+    return dict(counts, skipped=False)
+
+
+def _init_worker(initializer, initargs):
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def ingest_files(paths, table, workers=INGEST_WORKERS, initializer=None, initargs=()):
+    """Load export files into table, one file per worker process; yields each file's counts.
+
+    Workers are spawned rather than forked, so none inherits the parent's pooled
+    connections. Each opens its own from the environment, after running
+    initializer(*initargs) if given, e.g. to point Database at a stand-in. With one
+    worker the files are loaded in this process, after the same initializer.
+    """
+    if table not in TARGETS:
+        raise ValueError(f"Unknown table {table!r}, expected one of {', '.join(TARGETS)}")
+    paths = [str(path) for path in paths]
+    if workers <= 1 or len(paths) <= 1:
+        _init_worker(initializer, initargs)
+        for path in paths:
+            yield ingest_file(path, table)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths)), mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(initializer, initargs)) as pool:
+        # Largest files first, so a big file does not start last and hold up the run.
+        paths.sort(key=os.path.getsize, reverse=True)
+        yield from pool.map(ingest_file, paths, [table] * len(paths))
@@ -0,0 +1,59 @@
+"""Streaming readers for LMS export files: CSV or JSON lines, optionally gzipped.
+
+Records are yielded one at a time as dicts of strings (CSV) or JSON values, so a
+file of any size is read in constant memory.
+"""
+import csv
+import gzip
+import hashlib
+import json
+
+try:
+    import orjson
+except ImportError:  # JSON lines are parsed with the stdlib instead
+    orjson = None
+
+CSV_SUFFIXES = ('.csv',)
+JSONL_SUFFIXES = ('.jsonl', '.ndjson')
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def file_format(path):
+    """'csv' or 'jsonl' from the file name, ignoring a trailing .gz."""
+    name = str(path).lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if name.endswith(CSV_SUFFIXES):
+        return 'csv'
+    if name.endswith(JSONL_SUFFIXES):
+        return 'jsonl'
+    raise ValueError(f"Unsupported export file {path}: expected .csv or .jsonl, optionally gzipped")
+
+
+def _open_text(path):
+    # utf-8-sig drops the byte order mark some LMS exports start with.
+    if str(path).lower().endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8-sig', newline='')
+    return open(path, 'r', encoding='utf-8-sig', newline='')
+
+
+def read_records(path):
+    """Yield the file's records as dicts."""
+    fmt = file_format(path)
+    with _open_text(path) as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if line.strip():
+                yield _loads(line)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """sha256 of the file's bytes as stored, which identifies an export across renames."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
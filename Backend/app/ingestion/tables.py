@@ -0,0 +1,96 @@
+"""The tables LMS exports are loaded into, and how export fields map onto their columns.
+
+Canvas and Blackboard name the same fields differently (created_at or timestamp,
+user_id or user_pk1, ...), so each column lists the field names it accepts. The
+first record of a file decides which of them that file uses.
+"""
+from datetime import datetime, timezone
+
+
+def parse_datetime(value):
+    """Naive UTC datetime from an ISO 8601 string (with or without an offset) or a datetime."""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = str(value).strip()
+        if text.endswith(('Z', 'z')):
+            text = text[:-1] + '+00:00'
+        parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        # int('12.0') fails, but CSV exports written from spreadsheets produce it.
+        return int(float(value))
+
+
+def parse_text(value):
+    return str(value).strip()
+
+
+class Target:
+    """A table that export rows are inserted into.
+
+    columns maps column -> (SQL Server type, parser, accepted field names, default);
+    a default of None makes the field required. key holds the columns that identify
+    a row, used to skip rows that are already loaded; date is the column the
+    ingestion watermarks track per course.
+    """
+
+    def __init__(self, table, columns, key, date='date'):
+        self.table = table
+        self.columns = columns
+        self.names = tuple(columns)
+        self.key = key
+        self.key_index = tuple(self.names.index(column) for column in key)
+        self.course_index = self.names.index('course_id')
+        self.date_index = self.names.index(date)
+
+    def field_map(self, record):
+        """For each column, the field of record that holds it, or None to use the default."""
+        fields = {}
+        for column, (_, _, accepted, default) in self.columns.items():
+            field = next((name for name in accepted if name in record), None)
+            if field is None and default is None:
+                raise ValueError(f"{self.table} needs one of the fields {', '.join(accepted)}")
+            fields[column] = field
+        return fields
+
+    def parser(self, fields):
+        """Function from a record to the row tuple, raising ValueError or TypeError on bad data."""
+        steps = [(fields[column], parse, default)
+                 for column, (_, parse, _, default) in self.columns.items()]
+
+        def parse_record(record):
+            row = []
+            for field, parse, default in steps:
+                value = record.get(field) if field is not None else None
+                if value is None or value == '':
+                    if default is None:
+                        raise ValueError(f"missing {field}")
+                    row.append(default)
+                else:
+                    row.append(parse(value))
+            return tuple(row)
+        return parse_record
+
+
+TARGETS = {
+    'page_views': Target('page_views', {
+        'course_id': ('INT', parse_int, ('course_id', 'course_pk1', 'context_id'), None),
+        'user_id': ('INT', parse_int, ('user_id', 'student_id', 'user_pk1'), None),
+        'date': ('DATETIME2', parse_datetime, ('date', 'created_at', 'timestamp', 'event_time'), None),
+        'views': ('INT', parse_int, ('views', 'view_count', 'count'), 1),
+    }, key=('course_id', 'user_id', 'date')),
+    'detailed_page_views': Target('detailed_page_views', {
+        'course_id': ('INT', parse_int, ('course_id', 'course_pk1', 'context_id'), None),
+        'user_id': ('INT', parse_int, ('user_id', 'student_id', 'user_pk1'), None),
+        'date': ('DATETIME2', parse_datetime, ('date', 'created_at', 'timestamp', 'event_time'), None),
+        'device_type': ('NVARCHAR(32)', parse_text, ('device_type', 'device'), 'Unknown'),
+    }, key=('course_id', 'user_id', 'date', 'device_type')),
+}
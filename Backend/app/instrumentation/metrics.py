@@ -0,0 +1,100 @@
+"""Process-wide metrics rendered in the Prometheus text exposition format.
+
+Histograms are updated as requests and spans finish; gauges such as the database pool
+and result cache stats are read when /metrics is scraped. Values are per process, so
+with several gunicorn workers each worker reports its own.
+"""
+import bisect
+import itertools
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float) and value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a fixed set of label names."""
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def family(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+
+        samples = []
+        for key, values in sorted(series.items()):
+            labels = dict(zip(self.label_names, key))
+            cumulative = list(itertools.accumulate(values[:-1]))
+            for bound, count in zip(self.buckets, cumulative):
+                samples.append((f'{self.name}_bucket', dict(labels, le=_format_value(float(bound))), count))
+            samples.append((f'{self.name}_bucket', dict(labels, le='+Inf'), cumulative[-1]))
+            samples.append((f'{self.name}_sum', labels, round(values[-1], 6)))
+            samples.append((f'{self.name}_count', labels, cumulative[-1]))
+        return self.name, 'histogram', self.help_text, samples
+
+
+def family(name, kind, help_text, values):
+    """A metric family from (labels, value) pairs, for values read at scrape time."""
+    return name, kind, help_text, [(name, labels, value) for labels, value in values]
+
+
+def render(families):
+    """Prometheus text format for (name, type, help, [(sample name, labels, value)]) families."""
+    lines = []
+    for name, kind, help_text, samples in families:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for sample_name, labels, value in samples:
+            lines.append(f'{sample_name}{_format_labels(labels)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+request_seconds = Histogram(
+    'app_request_duration_seconds',
+    'Time to build each response, by route (streamed bodies are not included).',
+    ('method', 'route', 'status'),
+)
+
+span_seconds = Histogram(
+    'app_span_duration_seconds',
+    'Time spent in instrumented spans: SQL execute and fetch, row conversion, analyzer stages, JSON.',
+    ('span',),
+)
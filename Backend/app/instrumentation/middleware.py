@@ -0,0 +1,53 @@
+"""Flask hooks for request timings, latency metrics and the opt-in request profiler."""
+import os
+import threading
+import time
+from flask import Response, g, request
+from app.instrumentation import spans
+from app.instrumentation.metrics import request_seconds
+from app.instrumentation.profiler import SamplingProfiler
+
+# ?profile=1 (or an X-Profile: 1 header) returns the request's sampled stacks instead
+# of its body. Off unless PROFILING_ENABLED is set, since anyone could trigger it.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+
+
+def _profile_requested():
+    return PROFILING_ENABLED and (
+        request.args.get('profile') in ('1', 'true') or request.headers.get('X-Profile') in ('1', 'true')
+    )
+
+
+def init_app(app):
+    @app.before_request
+    def start_timing():
+        g.request_started = time.perf_counter()
+        g.request_timings = spans.start_request()
+        g.profiler = None
+        if _profile_requested():
+            g.profiler = SamplingProfiler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000).start()
+
+    @app.after_request
+    def finish_timing(response):
+        timings = g.pop('request_timings', None)
+        started = g.pop('request_started', None)
+        profiler = g.pop('profiler', None)
+        if started is None:
+            return response
+
+        elapsed = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        request_seconds.observe(elapsed, method=request.method, route=route, status=response.status_code)
+
+        if profiler is not None:
+            profiler.stop()
+            response = Response(profiler.collapsed(), mimetype='text/plain')
+            response.headers['Content-Disposition'] = 'inline; filename=profile.folded'
+
+        server_timing = timings.server_timing() if timings is not None else ''
+        total = f'total;dur={elapsed * 1000:.1f}'
+        response.headers['Server-Timing'] = f'{server_timing}, {total}' if server_timing else total
+        response.headers['Timing-Allow-Origin'] = 'http://localhost:3000'
+        spans.end_request()
+        return response
@@ -0,0 +1,129 @@
+"""Timing spans for the hot paths of a request.
+
+span(name) times a block of code. Every span feeds the app_span_duration_seconds
+histogram; inside a request the time is also added to that request's RequestTimings,
+which is sent back as a Server-Timing header. Spans with the same name add up, so a
+loop of fetchmany() calls shows as one sql.fetch entry with its total and count.
+"""
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from app.instrumentation.metrics import span_seconds
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = {}  # name -> [seconds, count], in order of first use
+
+    def add(self, name, seconds):
+        with self._lock:
+            entry = self._spans.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def items(self):
+        with self._lock:
+            return [(name, seconds, count) for name, (seconds, count) in self._spans.items()]
+
+    def server_timing(self):
+        """Value for the Server-Timing response header."""
+        return ', '.join(
+            f'{name};dur={seconds * 1000:.1f}' + (f';desc="{count} calls"' if count > 1 else '')
+            for name, seconds, count in self.items()
+        )
+
+
+def start_request():
+    """Begin collecting spans for the current request; returns its RequestTimings."""
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def end_request():
+    _current.set(None)
+
+
+def current_timings():
+    return _current.get()
+
+
+def record(name, seconds):
+    span_seconds.observe(seconds, span=name)
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator form of span()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def propagate(func):
+    """Wrap func to run in a copy of the caller's context, e.g. before handing it to a
+    thread pool, so its spans are added to the calling request's timings."""
+    context = contextvars.copy_context()
+    return functools.partial(context.run, func)
+
+
+class TimedCursor:
+    """DB-API cursor proxy that records sql.execute and sql.fetch spans."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        with span('sql.execute'):
+            result = self._cursor.execute(*args, **kwargs)
+        return self if result is self._cursor else result
+
+    def executemany(self, *args, **kwargs):
+        with span('sql.execute'):
+            result = self._cursor.executemany(*args, **kwargs)
+        return self if result is self._cursor else result
+
+    def fetchone(self):
+        with span('sql.fetch'):
+            return self._cursor.fetchone()
+
+    def fetchmany(self, *args):
+        with span('sql.fetch'):
+            return self._cursor.fetchmany(*args)
+
+    def fetchall(self):
+        with span('sql.fetch'):
+            return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        # Driver switches such as pyodbc's fast_executemany belong on the real cursor.
+        if name == '_cursor':
+            super().__setattr__(name, value)
+        else:
+            setattr(self._cursor, name, value)
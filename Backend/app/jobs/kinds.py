@@ -0,0 +1,65 @@
+"""What each kind of background job does.
+
+A job function takes the job's parameters and the path its result is to be written
+to, and returns (mimetype, download filename or None). It writes the same body the
+synchronous endpoint would have sent, so the result endpoint can serve the file as is.
+"""
+from app.reports.batch import run_summaries
+from app.reports.store import get_report_store
+from app.serialization import json_provider
+from app.services.activity_service import ActivityService
+from app.services.course_service import CourseService, columnar_summary
+from app.services.report_export import REPORT_FORMATS
+
+
+def course_summary(params, path):
+    """The /api/course-summary response body for the course and range."""
+    summary = CourseService.get_course_summary(params['course_id'], params['start_date'], params['end_date'],
+                                               params.get('mode'), params.get('exact', True))
+    data = summary['data']
+    if params.get('shape') == 'columns':
+        data = columnar_summary(data)
+    # Byte for byte what jsonify() writes: sorted keys and a trailing newline.
+    body = json_provider.dumps({'success': True, 'summary': summary['summary'], 'data': data}, sort_keys=True)
+    with open(path, 'wb') as f:
+        f.write(body + b'\n')
+    return 'application/json', None
+
+
+def activity_report(params, path):
+    """The /api/download-report file for the course and format."""
+    course_id, fmt = params['course_id'], params['format']
+    chunks = ActivityService.stream_report(course_id, fmt)
+    if chunks is None:
+        raise LookupError("No data found for this course")
+    try:
+        with open(path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+    finally:
+        chunks.close()
+    return REPORT_FORMATS[fmt][0], ActivityService.report_filename(course_id, fmt)
+
+
+def summary_run(params, path):
+    """Work through a batch summary run (see app/reports); the result is the run's final status."""
+    store = get_report_store()
+    for _ in run_summaries(store, params['run_id'], workers=params['workers']):
+        pass
+    run = store.run(params['run_id'])
+    with open(path, 'wb') as f:
+        f.write(json_provider.dumps({key: value for key, value in run.items() if key != 'course_ids'}))
+    return 'application/json', None
+
+
+# kind -> (job function, result file extension); a report's extension follows its format.
+JOB_KINDS = {
+    'course-summary': (course_summary, 'json'),
+    'activity-report': (activity_report, None),
+    'summary-run': (summary_run, 'json'),
+}
+
+
+def result_extension(kind, params):
+    extension = JOB_KINDS[kind][1]
+    return extension or REPORT_FORMATS[params['format']][1]
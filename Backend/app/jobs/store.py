@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Attempts a job gets when the worker running it stops renewing its lease.
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '2'))
+
+_store = None
+_store_lock = threading.Lock()
+
+_COLUMNS = ('job_id', 'kind', 'params', 'status', 'attempts', 'worker', 'created_at', 'started_at',
+            'finished_at', 'error', 'result_path', 'result_size', 'mimetype', 'filename')
+
+
+def dedup_key(kind, params):
+    """Identity of a job: its kind and its parameters, whatever their order."""
+    encoded = json.dumps([kind, params], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class JobStore:
+    """Queue of background jobs in a local SQLite file, with their results on disk.
+
+    jobs holds one row per job: its kind and parameters, its status (queued, running,
+    done or failed) and, once done, where its result file is. A queued or running job
+    is unique per dedup_key, so an identical submission gets the job already in flight.
+    Workers in any process on the host claim jobs under BEGIN IMMEDIATE and hold them
+    on a lease they keep renewing; a job whose lease runs out (its worker died) is
+    queued again, up to JOB_MAX_ATTEMPTS times.
+    """
+
+    def __init__(self, path, result_dir):
+        self.path = path
+        self.result_dir = result_dir
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        os.makedirs(result_dir, exist_ok=True)
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                dedup_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_until REAL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                error TEXT,
+                result_path TEXT,
+                result_size INTEGER,
+                mimetype TEXT,
+                filename TEXT
+            )
+        """)
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_jobs_in_flight ON jobs (dedup_key) "
+                     "WHERE status IN ('queued', 'running')")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status, created_at)")
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv('JOB_SQLITE_PATH', 'instance/jobs.sqlite'),
+                   os.getenv('JOB_RESULT_DIR', 'instance/job_results'))
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _job(self, row):
+        if row is None:
+            return None
+        job = dict(zip(_COLUMNS, row))
+        job['params'] = json.loads(job['params'])
+        return job
+
+    def submit(self, kind, params):
+        """Queue a job unless an identical one is queued or running; returns (job, created)."""
+        key = dedup_key(kind, params)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE dedup_key = ? AND status IN ('queued', 'running')",
+                (key,)
+            ).fetchone()
+            if row is None:
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO jobs (job_id, kind, params, dedup_key, status, created_at) "
+                    "VALUES (?, ?, ?, ?, 'queued', ?)",
+                    (job_id, kind, json.dumps(params, sort_keys=True), key, time.time())
+                )
+                row = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+                created = True
+            else:
+                created = False
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self._job(row), created
+
+    def job(self, job_id):
+        """The job's parameters, status and result location, or None."""
+        return self._job(self._conn().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone())
+
+    def claim(self, worker, lease):
+        """Move the oldest queued job to running for worker, holding it for lease seconds; None if there is none.
+
+        Running jobs whose lease has expired are first queued again, or failed once
+        they have had JOB_MAX_ATTEMPTS attempts.
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, worker = NULL, "
+                "error = 'Worker stopped before the job finished' "
+                "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, now, JOB_MAX_ATTEMPTS)
+            )
+            conn.execute("UPDATE jobs SET status = 'queued', worker = NULL "
+                         "WHERE status = 'running' AND lease_until < ?", (now,))
+            row = conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            job = None
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, started_at = ?, "
+                    "attempts = attempts + 1 WHERE job_id = ?",
+                    (worker, now + lease, now, row[0])
+                )
+                job = self._job(conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE job_id = ?", (row[0],)
+                ).fetchone())
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return job
+
+    def renew(self, job_ids, worker, lease):
+        """Extend the lease on the jobs worker is still running."""
+        if job_ids:
+            self._conn().execute(
+                f"UPDATE jobs SET lease_until = ? WHERE status = 'running' AND worker = ? "
+                f"AND job_id IN ({', '.join('?' for _ in job_ids)})",
+                (time.time() + lease, worker, *job_ids)
+            )
+
+    def result_path(self, job_id, extension):
+        return os.path.join(self.result_dir, f'{job_id}.{extension}')
+
+    def finish(self, job_id, worker, path, mimetype, filename=None):
+        """Record the job's result file; False if the job is no longer worker's."""
+        updated = self._conn().execute(
+            "UPDATE jobs SET status = 'done', finished_at = ?, lease_until = NULL, result_path = ?, "
+            "result_size = ?, mimetype = ?, filename = ? WHERE job_id = ? AND worker = ? AND status = 'running'",
+            (time.time(), path, os.path.getsize(path), mimetype, filename, job_id, worker)
+        ).rowcount
+        return updated == 1
+
+    def fail(self, job_id, worker, error):
+        self._conn().execute(
+            "UPDATE jobs SET status = 'failed', finished_at = ?, lease_until = NULL, error = ? "
+            "WHERE job_id = ? AND worker = ? AND status = 'running'",
+            (time.time(), error, job_id, worker)
+        )
+
+    def counts(self):
+        return dict(self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def purge(self, older_than):
+        """Delete jobs that finished more than older_than seconds ago, and their result files."""
+        conn = self._conn()
+        cutoff = time.time() - older_than
+        expired = conn.execute(
+            "SELECT job_id, result_path FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (cutoff,)
+        ).fetchall()
+        for _, path in expired:
+            if path:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(job_id,) for job_id, _ in expired])
+        return len(expired)
+
+
+def configure_job_store(path, result_dir):
+    """Point the process at another job queue, e.g. a scratch store in the benchmarks."""
+    global _store
+    with _store_lock:
+        _store = JobStore(path, result_dir)
+        return _store
+
+
+def get_job_store():
+    """Process-wide JobStore at JOB_SQLITE_PATH and JOB_RESULT_DIR, opened on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore.from_env()
+        return _store
@@ -0,0 +1,170 @@
+"""Threads that run the queued background jobs.
+
+Every server process starts JOB_WORKERS of them the first time it submits a job or
+looks one up, and they stay for the life of the process. They share the queue in
+JOB_SQLITE_PATH with the other processes on the host, so a job submitted to one
+gunicorn worker may run in another. Set JOB_WORKERS=0 to keep jobs out of the server
+processes and run them in a separate one instead:
+
+    python -m app.jobs.worker --threads 2
+"""
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from app.jobs.kinds import JOB_KINDS, result_extension
+from app.jobs.store import get_job_store
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+# Seconds an idle worker waits before it looks for jobs submitted by other processes.
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))
+# Seconds a claimed job stays the worker's without a renewal; renewed every third of it.
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '60'))
+# Seconds finished jobs and their result files are kept.
+JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', str(24 * 3600)))
+
+_workers = None
+_workers_lock = threading.Lock()
+
+
+class JobWorkers:
+    """A pool of threads claiming jobs from a JobStore, with one thread renewing their leases."""
+
+    def __init__(self, store, threads):
+        self.store = store
+        self.threads = threads
+        # Lease owner; one per pool, so a restarted process never finishes a job it lost.
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._running = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._stopped = False
+        self._last_purge = 0.0
+        self._threads = []
+
+    def start(self):
+        for i in range(self.threads):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._renew, name='job-lease', daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def wake(self):
+        """Have an idle worker look at the queue now rather than at its next poll."""
+        with self._wake:
+            self._wake.notify_all()
+
+    def stop(self, timeout=None):
+        with self._wake:
+            self._stopped = True
+            self._wake.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _idle(self):
+        with self._wake:
+            if not self._stopped:
+                self._wake.wait(JOB_POLL_INTERVAL)
+        now = time.monotonic()
+        if now - self._last_purge > 60:
+            self._last_purge = now
+            purged = self.store.purge(JOB_RESULT_TTL)
+            if purged:
+                logger.info("Purged %s finished jobs", purged)
+
+    def _work(self):
+        while not self._stopped:
+            try:
+                job = self.store.claim(self.worker_id, JOB_LEASE_SECONDS)
+            except Exception:
+                logger.exception("Could not claim a job")
+                job = None
+            if job is None:
+                self._idle()
+                continue
+            with self._lock:
+                self._running.add(job['job_id'])
+            try:
+                run_job(self.store, job, self.worker_id)
+            finally:
+                with self._lock:
+                    self._running.discard(job['job_id'])
+
+    def _renew(self):
+        while not self._stopped:
+            with self._wake:
+                self._wake.wait(JOB_LEASE_SECONDS / 3)
+                running = list(self._running)
+            try:
+                self.store.renew(running, self.worker_id, JOB_LEASE_SECONDS)
+            except Exception:
+                logger.exception("Could not renew job leases")
+
+
+def run_job(store, job, worker_id):
+    """Run a claimed job and record its result file or its error."""
+    job_id, kind, params = job['job_id'], job['kind'], job['params']
+    path = store.result_path(job_id, result_extension(kind, params))
+    partial = f'{path}.partial'
+    t0 = time.perf_counter()
+    try:
+        mimetype, filename = JOB_KINDS[kind][0](params, partial)
+        os.replace(partial, path)
+    except Exception as e:
+        logger.warning("Job %s (%s) failed: %s", job_id, kind, e)
+        if os.path.exists(partial):
+            os.remove(partial)
+        store.fail(job_id, worker_id, str(e))
+        return
+    if store.finish(job_id, worker_id, path, mimetype, filename):
+        logger.info("Job %s (%s) done in %.2fs", job_id, kind, time.perf_counter() - t0)
+    else:
+        logger.warning("Job %s (%s) finished after its lease was lost; result discarded", job_id, kind)
+
+
+def ensure_workers():
+    """Start this process's JOB_WORKERS threads if they are not running yet; None with JOB_WORKERS=0."""
+    global _workers
+    with _workers_lock:
+        if _workers is None and JOB_WORKERS > 0:
+            _workers = JobWorkers(get_job_store(), JOB_WORKERS).start()
+        return _workers
+
+
+def submit_job(kind, params):
+    """Queue a job, or join the identical one in flight; returns (job, created)."""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    job, created = get_job_store().submit(kind, params)
+    workers = ensure_workers()
+    if created and workers is not None:
+        workers.wake()
+    return job, created
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run queued background jobs outside the server.")
+    parser.add_argument('--threads', type=int, default=max(JOB_WORKERS, 1), help='jobs run at once')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    workers = JobWorkers(get_job_store(), args.threads).start()
+    logger.info("Running jobs from %s on %s threads", workers.store.path, args.threads)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        workers.stop()
+
+
+if __name__ == '__main__':
+    main()
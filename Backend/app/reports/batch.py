@@ -0,0 +1,89 @@
+"""Course summaries for many courses at once, spread across a process pool.
+
+Each worker process holds its own pooled database connection (and rollup store
+handle) and builds whole summaries: it loads one course's rows, runs the analyzer and
+writes the report into the ReportStore itself. Only course ids go to the workers and
+only small status dicts come back, so neither the analyzer's frames nor its results
+are pickled between processes.
+"""
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app.reports.store import ReportStore
+from app.serialization import json_provider
+from app.services.course_service import CourseService
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_WORKERS = int(os.getenv('SUMMARY_WORKERS', str(os.cpu_count() or 1)))
+
+# ReportStore per path in a worker process, opened on its first course.
+_stores = {}
+
+
+def _store(path):
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = ReportStore(path)
+    return store
+
+
+def summarize_course(run_id, course_id, start_date, end_date, mode, exact, store_path):
+    """Build one course's summary and store it in the report store at store_path; returns its status."""
+    mode = mode or os.getenv('COURSE_SUMMARY_MODE', 'incremental')
+    store = _store(store_path)
+    t0 = time.perf_counter()
+    try:
+        response = CourseService._generate_course_summary(course_id, start_date, end_date, mode, exact)
+        data = json_provider.dumps(response['data'])
+        seconds = round(time.perf_counter() - t0, 3)
+        store.save_report(run_id, course_id, response['summary'], data, seconds)
+        return {'course_id': course_id, 'status': 'done', 'seconds': seconds}
+    except Exception as e:
+        seconds = round(time.perf_counter() - t0, 3)
+        logger.warning("Summary of course %s in run %s failed: %s", course_id, run_id, e)
+        store.save_failure(run_id, course_id, str(e), seconds)
+        return {'course_id': course_id, 'status': 'failed', 'seconds': seconds, 'error': str(e)}
+
+
+def _init_worker(initializer, initargs):
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def run_summaries(store, run_id, workers=SUMMARY_WORKERS, initializer=None, initargs=()):
+    """Summarize the run's courses that have no report yet, one course per worker; yields each course's status.
+
+    Workers are spawned rather than forked, so none inherits the parent's pooled
+    connections. Each opens its own from the environment, after running
+    initializer(*initargs) if given. With one worker the courses are summarized in
+    this process, after the same initializer. A run that was interrupted can be run
+    again and only does the courses that are left.
+    """
+    run = store.run(run_id)
+    if run is None:
+        raise ValueError(f"Unknown report run {run_id}")
+    done = store.completed_courses(run_id)
+    pending = [course_id for course_id in run['course_ids'] if course_id not in done]
+    args = (run['start_date'], run['end_date'], run['mode'], run['exact'], store.path)
+
+    store.set_status(run_id, 'running')
+    try:
+        if workers <= 1 or len(pending) <= 1:
+            _init_worker(initializer, initargs)
+            for course_id in pending:
+                yield summarize_course(run_id, course_id, *args)
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending)),
+                                     mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker, initargs=(initializer, initargs)) as pool:
+                futures = [pool.submit(summarize_course, run_id, course_id, *args) for course_id in pending]
+                for future in as_completed(futures):
+                    yield future.result()
+    except BaseException:
+        store.set_status(run_id, 'failed')
+        raise
+    store.set_status(run_id, 'done')
+
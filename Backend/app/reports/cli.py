@@ -0,0 +1,95 @@
+"""Build course summaries for many courses at once, e.g. every course at term end.
+
+    python -m app.reports.cli run --start 2024-01-08 --end 2024-05-03            # every course in course_info
+    python -m app.reports.cli run --start 2024-01-08 --end 2024-05-03 --course-id 101 --mode rollup --workers 8
+    python -m app.reports.cli resume <run_id>                                    # the courses an interrupted run left
+    python -m app.reports.cli list
+    python -m app.reports.cli show <run_id> --course-id 101                      # the text summary
+
+Courses are spread across SUMMARY_WORKERS processes and each report is written to
+the report store (REPORT_SQLITE_PATH), where GET /api/course-summary-report serves it.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from app.reports.batch import SUMMARY_WORKERS, run_summaries
+from app.reports.store import get_report_store
+from app.services.course_service import CourseService, SUMMARY_MODES
+
+
+def _date(value):
+    datetime.strptime(value, '%Y-%m-%d')
+    return value
+
+
+def _run(store, run_id, workers):
+    t0 = time.perf_counter()
+    for result in run_summaries(store, run_id, workers=workers):
+        print(json.dumps(result))
+    run = store.run(run_id)
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({'run_id': run_id, 'status': run['status'], 'done': run['done'], 'failed': run['failed'],
+                      'seconds': round(elapsed, 2), 'courses_per_s': round(run['courses'] / elapsed, 2)}))
+    return 0 if run['failed'] == 0 else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build course summaries for many courses at once.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='summarize courses across a process pool')
+    run.add_argument('--start', type=_date, required=True)
+    run.add_argument('--end', type=_date, required=True)
+    run.add_argument('--course-id', type=int, action='append',
+                     help='course to summarize (repeatable); default: every course in course_info')
+    run.add_argument('--mode', choices=SUMMARY_MODES)
+    run.add_argument('--approximate', dest='exact', action='store_false',
+                     help='HyperLogLog distinct-user counts (about 1%% error) in the incremental and rollup modes')
+    run.add_argument('--workers', type=int, default=SUMMARY_WORKERS, help='courses summarized in parallel')
+
+    resume = commands.add_parser('resume', help="summarize the courses a run has no report for yet")
+    resume.add_argument('run_id')
+    resume.add_argument('--workers', type=int, default=SUMMARY_WORKERS)
+
+    commands.add_parser('list', help='the latest runs')
+
+    show = commands.add_parser('show', help="a run's status, or one course's text summary")
+    show.add_argument('run_id')
+    show.add_argument('--course-id', type=int)
+
+    args = parser.parse_args(argv)
+    store = get_report_store()
+
+    if args.command == 'run':
+        course_ids = args.course_id or [course['course_id'] for course in CourseService.get_all_courses()]
+        run_id = store.create_run(course_ids, args.start, args.end, args.mode, args.exact)
+        return _run(store, run_id, args.workers)
+
+    if args.command == 'resume':
+        return _run(store, args.run_id, args.workers)
+
+    if args.command == 'list':
+        for run in store.runs():
+            print(json.dumps({key: value for key, value in run.items() if key != 'course_ids'}))
+        return 0
+
+    if args.course_id is None:
+        run = store.run(args.run_id)
+        if run is None:
+            print(f"Unknown run {args.run_id}", file=sys.stderr)
+            return 1
+        print(json.dumps(dict(run, course_reports=store.course_statuses(args.run_id)), indent=2))
+        return 0
+
+    report = store.report(args.run_id, args.course_id)
+    if report is None:
+        print(f"No finished report for course {args.course_id} in run {args.run_id}", file=sys.stderr)
+        return 1
+    print(report[0])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
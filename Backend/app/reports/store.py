@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class ReportStore:
+    """Batch course summary runs and their per-course reports in a local SQLite file.
+
+    report_runs holds each run's parameters and status; course_reports holds one row
+    per course of a run with its text summary, its structured data as the JSON that
+    /api/course-summary returns, or the error it failed with. Worker processes write
+    their own course's row, so the file is opened in WAL mode with a busy timeout.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS report_runs (
+                run_id TEXT PRIMARY KEY,
+                start_date TEXT NOT NULL,
+                end_date TEXT NOT NULL,
+                mode TEXT,
+                exact INTEGER NOT NULL,
+                course_ids TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS course_reports (
+                run_id TEXT NOT NULL,
+                course_id INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                summary TEXT,
+                data BLOB,
+                error TEXT,
+                seconds REAL NOT NULL,
+                finished_at TEXT NOT NULL,
+                PRIMARY KEY (run_id, course_id)
+            ) WITHOUT ROWID
+        """)
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv('REPORT_SQLITE_PATH', 'instance/reports.sqlite'))
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create_run(self, course_ids, start_date, end_date, mode=None, exact=True):
+        """Record a queued run over course_ids; returns its run_id."""
+        run_id = uuid.uuid4().hex
+        self._conn().execute(
+            "INSERT INTO report_runs (run_id, start_date, end_date, mode, exact, course_ids, status, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, 'queued', ?)",
+            (run_id, start_date, end_date, mode, int(bool(exact)),
+             ','.join(str(int(course_id)) for course_id in course_ids), datetime.now().isoformat(' '))
+        )
+        return run_id
+
+    def run(self, run_id):
+        """The run's parameters, status and per-status course counts, or None."""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT start_date, end_date, mode, exact, course_ids, status, created_at, started_at, finished_at "
+            "FROM report_runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        start_date, end_date, mode, exact, course_ids, status, created_at, started_at, finished_at = row
+        counts = dict(conn.execute(
+            "SELECT status, COUNT(*) FROM course_reports WHERE run_id = ? GROUP BY status", (run_id,)
+        ).fetchall())
+        course_ids = [int(course_id) for course_id in course_ids.split(',') if course_id]
+        return {
+            'run_id': run_id,
+            'start_date': start_date,
+            'end_date': end_date,
+            'mode': mode,
+            'exact': bool(exact),
+            'course_ids': course_ids,
+            'status': status,
+            'courses': len(course_ids),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'created_at': created_at,
+            'started_at': started_at,
+            'finished_at': finished_at,
+        }
+
+    def runs(self, limit=20):
+        """The latest runs, newest first."""
+        run_ids = [row[0] for row in self._conn().execute(
+            "SELECT run_id FROM report_runs ORDER BY created_at DESC LIMIT ?", (limit,)
+        )]
+        return [self.run(run_id) for run_id in run_ids]
+
+    def set_status(self, run_id, status):
+        """Move the run to running (stamping started_at) or a final status (stamping finished_at)."""
+        column = 'started_at' if status == 'running' else 'finished_at'
+        self._conn().execute(f"UPDATE report_runs SET status = ?, {column} = ? WHERE run_id = ?",
+                             (status, datetime.now().isoformat(' '), run_id))
+
+    def completed_courses(self, run_id):
+        return {row[0] for row in self._conn().execute(
+            "SELECT course_id FROM course_reports WHERE run_id = ? AND status = 'done'", (run_id,)
+        )}
+
+    def course_statuses(self, run_id):
+        """[{course_id, status, seconds, error}] of the courses finished so far, by course."""
+        return [
+            {'course_id': course_id, 'status': status, 'seconds': seconds, 'error': error}
+            for course_id, status, seconds, error in self._conn().execute(
+                "SELECT course_id, status, seconds, error FROM course_reports WHERE run_id = ? ORDER BY course_id",
+                (run_id,)
+            )
+        ]
+
+    def save_report(self, run_id, course_id, summary, data, seconds):
+        """Store a course's text summary and its data as encoded JSON bytes."""
+        self._conn().execute(
+            "INSERT OR REPLACE INTO course_reports VALUES (?, ?, 'done', ?, ?, NULL, ?, ?)",
+            (run_id, int(course_id), summary, data, seconds, datetime.now().isoformat(' '))
+        )
+
+    def save_failure(self, run_id, course_id, error, seconds):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO course_reports VALUES (?, ?, 'failed', NULL, NULL, ?, ?, ?)",
+            (run_id, int(course_id), error, seconds, datetime.now().isoformat(' '))
+        )
+
+    def report(self, run_id, course_id):
+        """(summary, data JSON bytes) of a finished course, or None."""
+        row = self._conn().execute(
+            "SELECT summary, data FROM course_reports WHERE run_id = ? AND course_id = ? AND status = 'done'",
+            (run_id, int(course_id))
+        ).fetchone()
+        return (row[0], bytes(row[1])) if row else None
+
+
+def configure_report_store(path):
+    """Point the process at another report file, e.g. a scratch store in the benchmarks."""
+    global _store
+    with _store_lock:
+        _store = ReportStore(path)
+        return _store
+
+
+def get_report_store():
+    """Process-wide ReportStore at REPORT_SQLITE_PATH, opened on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ReportStore.from_env()
+        return _store
@@ -0,0 +1,74 @@
+"""Maintain the page view, device and discussion rollup store.
+
+    python -m app.rollups.cli refresh                  # every course, rows since each watermark
+    python -m app.rollups.cli refresh --course-id 101
+    python -m app.rollups.cli rebuild --course-id 101 --start 2024-01-08 --end 2024-05-03
+    python -m app.rollups.cli check --course-id 101 --start 2024-01-08 --end 2024-05-03
+    python -m app.rollups.cli publish --course-id 101  # student metrics -> unified analysis tables
+
+The first refresh of a course backfills all of its page_views, detailed_page_views and
+discussion posts. Run refresh after each LMS import, then clear the course_summary,
+device_stats and discussion_stats caches (POST /api/cache/invalidate). After publish,
+clear the students, weekly_activity, detailed_weekly_activity, batch_weekly_activity
+and student_courses caches too.
+"""
+import argparse
+import json
+import sys
+from datetime import datetime
+from app.rollups.refresh import check_course, rebuild_days, refresh_course
+from app.rollups.store import get_rollup_store
+from app.services.course_service import CourseService
+from app.storage.publish import publish_students
+
+
+def _date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the page view rollup store.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    refresh = commands.add_parser('refresh', help='fold new page_views, detailed_page_views and discussion rows into the rollups')
+    refresh.add_argument('--course-id', type=int, action='append',
+                         help='course to refresh (repeatable); default: every course in course_info')
+
+    publish = commands.add_parser('publish', help='write changed student metrics into the unified analysis tables')
+    publish.add_argument('--course-id', type=int, action='append',
+                         help='course to publish (repeatable); default: every course with student state')
+    publish.add_argument('--full', action='store_true', help="rewrite every row of the course")
+
+    for name, help_text in (('rebuild', 'recompute a date range from page_views and detailed_page_views'),
+                            ('check', 'compare the rollups with the raw page_views path')):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--course-id', type=int, required=True)
+        command.add_argument('--start', type=_date, required=True)
+        command.add_argument('--end', type=_date, required=True)
+
+    args = parser.parse_args(argv)
+    store = get_rollup_store()
+
+    if args.command == 'refresh':
+        course_ids = args.course_id or [course['course_id'] for course in CourseService.get_all_courses()]
+        for course_id in course_ids:
+            print(json.dumps(refresh_course(store, course_id)))
+        return 0
+
+    if args.command == 'publish':
+        course_ids = args.course_id or [course_id for course_id in store.courses() if store.has_students(course_id)]
+        for course_id in course_ids:
+            print(json.dumps(publish_students(store, course_id, full=args.full)))
+        return 0
+
+    if args.command == 'rebuild':
+        print(json.dumps(rebuild_days(store, args.course_id, args.start, args.end)))
+        return 0
+
+    result = check_course(store, args.course_id, args.start, args.end)
+    print(json.dumps(result, indent=2))
+    return 0 if result['consistent'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
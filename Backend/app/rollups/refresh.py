@@ -0,0 +1,246 @@
+"""Keep the rollup store in step with page_views, detailed_page_views and the discussion
+tables, and check it against the raw rows."""
+from datetime import date, datetime, timedelta
+import numpy as np
+from app.analyzer.aggregates import CourseAggregates
+from app.analyzer.course_analyzer import CourseSummaryAnalyzer, PERIODS
+from app.analyzer.student_metrics import StudentState, period_of
+from app.database.connection import Database
+from app.services.course_service import CourseService, FETCH_BATCH_SIZE, discussion_title
+
+ROLLUP_QUERY = """
+    SELECT CAST(date AS date) AS day,
+           DATEPART(hour, date) AS hour,
+           user_id,
+           SUM(views) AS views,
+           COUNT(*) AS activity_count,
+           MAX(date) AS last_seen
+    FROM page_views
+    WHERE course_id = ?{conditions}
+    GROUP BY CAST(date AS date), DATEPART(hour, date), user_id
+"""
+
+DEVICE_ROLLUP_QUERY = """
+    SELECT CAST(date AS date) AS day,
+           device_type,
+           COUNT(*) AS views,
+           MAX(date) AS last_seen
+    FROM detailed_page_views
+    WHERE course_id = ?{conditions}
+    GROUP BY CAST(date AS date), device_type
+"""
+
+
+DISCUSSION_ENTRIES_QUERY = """
+    SELECT id, message, date
+    FROM discussion_entries
+    WHERE course_id = ?{conditions}
+"""
+
+DISCUSSION_REPLIES_QUERY = """
+    SELECT parent_id, COUNT(*) AS reply_count, MAX(date) AS last_reply
+    FROM discussion_replies
+    WHERE course_id = ?{conditions}
+    GROUP BY parent_id
+"""
+
+
+def _grouped_batches(cursor, course_id, conditions='', params=(), query=ROLLUP_QUERY):
+    cursor.execute(query.format(conditions=conditions), (course_id, *params))
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+        if not rows:
+            break
+        yield rows
+
+
+def _day_start(day):
+    return datetime.combine(day, datetime.min.time())
+
+
+def _since(high_water):
+    return ('', ()) if high_water is None else (" AND date > ?", (high_water,))
+
+
+def refresh_devices(store, course_id):
+    """Fold detailed_page_views rows newer than the course's device watermark into the store."""
+    with Database.get_connection() as conn:
+        batches = _grouped_batches(conn.cursor(), course_id, *_since(store.device_watermark(course_id)[0]),
+                                   query=DEVICE_ROLLUP_QUERY)
+        merged = store.merge_devices(course_id, batches)
+    return {
+        'course_id': course_id,
+        'device_rows': merged,
+        'device_high_water': str(store.device_watermark(course_id)[0]),
+    }
+
+
+def refresh_students(store, course_id):
+    """Fold page_views rows newer than the course's student watermark into the per-student state."""
+    with Database.get_connection() as conn:
+        batches = _grouped_batches(conn.cursor(), course_id, *_since(store.student_watermark(course_id)[0]))
+        merged = store.merge_students(course_id, batches)
+    return {
+        'course_id': course_id,
+        'student_rows': merged,
+        'student_high_water': str(store.student_watermark(course_id)[0]),
+    }
+
+
+def refresh_discussions(store, course_id, full=False):
+    """Fold discussion entries and replies newer than the course's watermarks into the store.
+
+    full=True rebuilds the course's threads from scratch, which also picks up posts
+    imported with dates at or before the watermarks.
+    """
+    watermarks = None if full else store.discussion_watermarks(course_id)
+    entries_high_water, replies_high_water = watermarks or (None, None)
+    with Database.get_connection() as conn:
+        cursor = conn.cursor()
+        conditions, params = _since(entries_high_water)
+        cursor.execute(DISCUSSION_ENTRIES_QUERY.format(conditions=conditions), (course_id, *params))
+        entries = [(entry_id, discussion_title(message), posted) for entry_id, message, posted in cursor.fetchall()]
+        conditions, params = _since(replies_high_water)
+        cursor.execute(DISCUSSION_REPLIES_QUERY.format(conditions=conditions), (course_id, *params))
+        replies = [tuple(row) for row in cursor.fetchall()]
+    merged_entries, merged_replies = store.merge_discussions(course_id, entries, replies, replace=full)
+    return {'course_id': course_id, 'discussion_entries': merged_entries, 'reply_groups': merged_replies}
+
+
+def refresh_course(store, course_id):
+    """Fold page_views, detailed_page_views and discussion rows newer than the course's watermarks into the store.
+
+    The first refresh of a course processes all of its rows (the backfill). A row that
+    arrives later with a date at or before the watermark is not picked up; rebuild_days
+    recomputes a range from scratch for that.
+    """
+    with Database.get_connection() as conn:
+        batches = _grouped_batches(conn.cursor(), course_id, *_since(store.watermark(course_id)[0]))
+        merged = store.merge(course_id, batches)
+    return {
+        'course_id': course_id,
+        'grouped_rows': merged,
+        'high_water': str(store.watermark(course_id)[0]),
+        **refresh_devices(store, course_id),
+        **refresh_discussions(store, course_id),
+        **refresh_students(store, course_id),
+    }
+
+
+def rebuild_days(store, course_id, first_day, last_day):
+    """Recompute [first_day, last_day] from page_views and detailed_page_views, replacing what is
+    stored, and the course's discussion threads in full."""
+    params = (_day_start(first_day), _day_start(last_day + timedelta(days=1)))
+    with Database.get_connection() as conn:
+        cursor = conn.cursor()
+        batches = _grouped_batches(cursor, course_id, " AND date >= ? AND date < ?", params)
+        merged = store.merge(course_id, batches, replace_days=(first_day, last_day))
+        device_batches = _grouped_batches(cursor, course_id, " AND date >= ? AND date < ?", params,
+                                          query=DEVICE_ROLLUP_QUERY)
+        device_rows = store.merge_devices(course_id, device_batches, replace_days=(first_day, last_day))
+        student_batches = _grouped_batches(cursor, course_id, " AND date >= ? AND date < ?", params)
+        student_rows = store.merge_students(course_id, student_batches, replace_days=(first_day, last_day))
+    return {
+        'course_id': course_id,
+        'grouped_rows': merged,
+        'high_water': str(store.watermark(course_id)[0]),
+        'device_rows': device_rows,
+        'device_high_water': str(store.device_watermark(course_id)[0]),
+        'student_rows': student_rows,
+        'student_high_water': str(store.student_watermark(course_id)[0]),
+        # Threads are not kept per day; the course's are recomputed in full.
+        **refresh_discussions(store, course_id, full=True),
+    }
+
+
+def check_course(store, course_id, first_day, last_day):
+    """Compare rollup-derived aggregates with the raw-row path over the same rows.
+
+    Raw rows newer than the watermark are left out, so a check is meaningful between
+    refreshes. Returns the mismatching fields with the days or hours (or, for
+    device_views, the device types) that differ. The per-student state is compared
+    over the whole course, and students lists the first ids whose state differs.
+    """
+    high_water, _ = store.watermark(course_id)
+    if high_water is None:
+        raise ValueError(f"Course {course_id} has no rollups yet; run a refresh first.")
+
+    with Database.get_connection() as conn:
+        columns = CourseService._fetch_page_view_columns(
+            conn.cursor(), course_id, _day_start(first_day), _day_start(last_day)
+        )
+    keep = columns['datetime'] <= np.datetime64(high_water)
+    columns = {name: values[keep] for name, values in columns.items()}
+
+    if keep.any():
+        expected = CourseSummaryAnalyzer(columns, first_day.isoformat(), last_day.isoformat()).aggregates
+    else:
+        expected = CourseAggregates.from_totals(first_day, last_day, [], [], 0)
+    actual = CourseAggregates.from_days(first_day, last_day, store.load_days(course_id, first_day, last_day))
+
+    dates = np.datetime_as_string(actual.dates, unit='D')
+    mismatches = {}
+    for field in ('day_views', 'day_activity', 'day_users'):
+        differ = np.flatnonzero(getattr(actual, field) != getattr(expected, field))
+        if differ.size:
+            mismatches[field] = dates[differ].tolist()
+    for field in ('hour_views', 'hour_activity', 'hour_users', 'hour_days'):
+        differ = np.flatnonzero(getattr(actual, field) != getattr(expected, field))
+        if differ.size:
+            mismatches[field] = differ.tolist()
+    if actual.total_users != expected.total_users:
+        mismatches['total_users'] = [int(actual.total_users), int(expected.total_users)]
+
+    device_high_water, _ = store.device_watermark(course_id)
+    if device_high_water is not None:
+        with Database.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT device_type, COUNT(*)
+                FROM detailed_page_views
+                WHERE course_id = ? AND date >= ? AND date < ? AND date <= ?
+                GROUP BY device_type
+            """, (course_id, _day_start(first_day), _day_start(last_day + timedelta(days=1)), device_high_water))
+            expected_devices = {row[0]: row[1] for row in cursor.fetchall()}
+        actual_devices = dict(store.load_devices(course_id, first_day, last_day))
+        if actual_devices != expected_devices:
+            mismatches['device_views'] = sorted(
+                device for device in actual_devices.keys() | expected_devices.keys()
+                if actual_devices.get(device) != expected_devices.get(device)
+            )
+
+    student_high_water, _ = store.student_watermark(course_id)
+    if student_high_water is not None:
+        differ = _check_students(store, course_id, student_high_water)
+        if differ:
+            mismatches['students'] = differ
+
+    return {
+        'course_id': course_id,
+        'range': f'{first_day}..{last_day}',
+        'high_water': str(high_water),
+        'raw_rows': int(keep.sum()),
+        'consistent': not mismatches,
+        'mismatches': mismatches,
+    }
+
+
+def _check_students(store, course_id, high_water):
+    """Ids of up to 20 students whose stored state differs from one replayed from page_views."""
+    days = {}
+    with Database.get_connection() as conn:
+        for rows in _grouped_batches(conn.cursor(), course_id, " AND date <= ?", (high_water,)):
+            for day, hour, user_id, views, _, _ in rows:
+                day = day if isinstance(day, date) else date.fromisoformat(str(day)[:10])
+                periods = days.setdefault(user_id, {}).setdefault(day, [0] * len(PERIODS))
+                periods[period_of(hour)] += views
+    expected = {user_id: StudentState.from_days(student_days.items()) for user_id, student_days in days.items()}
+    actual = {user_id: state for user_id, (state, _) in store.load_students(course_id).items() if state.active_days}
+
+    fields = ('first_day', 'last_day', 'active_days', 'period_views', 'gaps_4days', 'longest_gap')
+    differ = sorted(
+        user_id for user_id in expected.keys() | actual.keys()
+        if user_id not in expected or user_id not in actual
+        or any(getattr(expected[user_id], field) != getattr(actual[user_id], field) for field in fields)
+    )
+    return differ[:20]
@@ -0,0 +1,761 @@
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+import numpy as np
+from dotenv import load_dotenv
+from app.analyzer import sketches
+from app.analyzer.aggregates import DayActivity
+from app.analyzer.course_analyzer import PERIODS
+from app.analyzer.student_metrics import StudentState, period_of, week_of
+
+load_dotenv()
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class RollupStore:
+    """Per-course, per-day, per-hour page view rollups in a local SQLite file.
+
+    rollup_cells holds views and activity counts per (course, day, hour);
+    rollup_users holds the distinct users of each (course, day, hour), which keeps
+    distinct-user counts exact when days and hours are combined; rollup_sketches holds
+    the same users as one packed HyperLogLog sketch per (course, day, hour), which is
+    far fewer rows to read when approximate counts will do.
+    rollup_watermarks records, per course, the latest page_views.date already folded in.
+
+    rollup_devices holds page views per (course, day, device type) from
+    detailed_page_views, with its own watermark in rollup_device_watermarks.
+    rollup_threads holds each discussion entry's title, date and reply count, and
+    rollup_discussion_watermarks the course's reply total and the latest entry and
+    reply dates folded in.
+
+    rollup_student_days holds each student's views per (course, day) by time-of-day
+    period, and rollup_students the per-student state the analysis metrics are
+    computed from (see app/analyzer/student_metrics.py). A student's changed column
+    is the course's change count when their state last changed, or 0 once published.
+    rollup_student_watermarks records the latest page_views.date folded into them and
+    what the last publish covered.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_cells (
+                course_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                hour INTEGER NOT NULL,
+                views INTEGER NOT NULL,
+                activity_count INTEGER NOT NULL,
+                PRIMARY KEY (course_id, day, hour)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_users (
+                course_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                hour INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                PRIMARY KEY (course_id, day, hour, user_id)
+            ) WITHOUT ROWID
+        """)
+        has_sketches = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollup_sketches'"
+        ).fetchone()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_sketches (
+                course_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                hour INTEGER NOT NULL,
+                entries BLOB NOT NULL,
+                PRIMARY KEY (course_id, day, hour)
+            ) WITHOUT ROWID
+        """)
+        if not has_sketches:
+            self._backfill_sketches(conn)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_watermarks (
+                course_id INTEGER PRIMARY KEY,
+                high_water TEXT,
+                refreshed_at TEXT NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_devices (
+                course_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                device_type TEXT NOT NULL,
+                views INTEGER NOT NULL,
+                PRIMARY KEY (course_id, day, device_type)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_device_watermarks (
+                course_id INTEGER PRIMARY KEY,
+                high_water TEXT,
+                refreshed_at TEXT NOT NULL
+            )
+        """)
+        # Replies can arrive for entries not folded in yet; those rows have no posted date
+        # until the entry does, and are left out of the entry count and top threads.
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_threads (
+                course_id INTEGER NOT NULL,
+                entry_id INTEGER NOT NULL,
+                title TEXT,
+                posted TEXT,
+                reply_count INTEGER NOT NULL,
+                PRIMARY KEY (course_id, entry_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS ix_rollup_threads_replies
+            ON rollup_threads (course_id, reply_count DESC, entry_id)
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_discussion_watermarks (
+                course_id INTEGER PRIMARY KEY,
+                entries_high_water TEXT,
+                replies_high_water TEXT,
+                total_replies INTEGER NOT NULL,
+                refreshed_at TEXT NOT NULL
+            )
+        """)
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_student_days (
+                course_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                morning INTEGER NOT NULL,
+                afternoon INTEGER NOT NULL,
+                evening INTEGER NOT NULL,
+                night INTEGER NOT NULL,
+                PRIMARY KEY (course_id, user_id, day)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS ix_rollup_student_days_day
+            ON rollup_student_days (course_id, day, user_id)
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_students (
+                course_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                first_day TEXT,
+                last_day TEXT,
+                active_days INTEGER NOT NULL,
+                morning INTEGER NOT NULL,
+                afternoon INTEGER NOT NULL,
+                evening INTEGER NOT NULL,
+                night INTEGER NOT NULL,
+                gaps_4days INTEGER NOT NULL,
+                longest_gap INTEGER NOT NULL,
+                changed INTEGER NOT NULL,
+                published INTEGER NOT NULL,
+                PRIMARY KEY (course_id, user_id)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS ix_rollup_students_changed
+            ON rollup_students (course_id, changed) WHERE changed > 0
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_student_watermarks (
+                course_id INTEGER PRIMARY KEY,
+                high_water TEXT,
+                changes INTEGER NOT NULL,
+                changed_from TEXT,
+                published_monday TEXT,
+                published_weeks INTEGER,
+                refreshed_at TEXT NOT NULL
+            )
+        """)
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.getenv('ROLLUP_SQLITE_PATH', 'instance/rollups.sqlite'))
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _merge_sketches(conn, course_id, rows):
+        """Fold (day, hour, user_id) rows into the stored sketch of each (day, hour)."""
+        cells = {}
+        for day, hour, user_id in rows:
+            cells.setdefault((day, hour), []).append(user_id)
+
+        merged = []
+        for (day, hour), users in cells.items():
+            registers, rho = sketches.entries(np.array(users, dtype=np.int64))
+            stored = conn.execute(
+                "SELECT entries FROM rollup_sketches WHERE course_id = ? AND day = ? AND hour = ?",
+                (course_id, day, hour)
+            ).fetchone()
+            if stored is not None:
+                stored_registers, stored_rho = sketches.unpack(stored[0])
+                registers = np.concatenate([stored_registers, registers])
+                rho = np.concatenate([stored_rho, rho])
+            merged.append((course_id, day, hour, sketches.pack(*sketches.max_per_key(registers, rho))))
+        conn.executemany("INSERT OR REPLACE INTO rollup_sketches VALUES (?, ?, ?, ?)", merged)
+
+    def _backfill_sketches(self, conn):
+        """Derive rollup_sketches from rollup_users, for stores created before the sketches existed."""
+        courses = [row[0] for row in conn.execute("SELECT DISTINCT course_id FROM rollup_users")]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for course_id in courses:
+                rows = conn.execute(
+                    "SELECT day, hour, user_id FROM rollup_users WHERE course_id = ?", (course_id,)
+                ).fetchall()
+                self._merge_sketches(conn, course_id, rows)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def watermark(self, course_id):
+        """(latest page_views.date folded in, time of the last refresh), or (None, None)."""
+        row = self._conn().execute(
+            "SELECT high_water, refreshed_at FROM rollup_watermarks WHERE course_id = ?",
+            (int(course_id),)
+        ).fetchone()
+        if row is None:
+            return None, None
+        high_water = datetime.fromisoformat(row[0]) if row[0] else None
+        return high_water, datetime.fromisoformat(row[1])
+
+    def has_course(self, course_id):
+        return self.watermark(course_id)[1] is not None
+
+    def courses(self):
+        return [row[0] for row in self._conn().execute("SELECT course_id FROM rollup_watermarks ORDER BY course_id")]
+
+    def merge(self, course_id, batches, replace_days=None):
+        """Fold GROUP BY (day, hour, user) rows into the rollups in one transaction.
+
+        Each batch holds (day, hour, user_id, views, activity_count, last_seen) rows.
+        Views and activity add to what is stored; users are a set; the watermark moves
+        forward to the latest last_seen. replace_days=(first, last) clears those days
+        first, for rebuilding a range from scratch. Returns the number of rows merged.
+        """
+        course_id = int(course_id)
+        conn = self._conn()
+        merged = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            previous = conn.execute(
+                "SELECT high_water FROM rollup_watermarks WHERE course_id = ?", (course_id,)
+            ).fetchone()
+            high_water = datetime.fromisoformat(previous[0]) if previous and previous[0] else None
+
+            if replace_days is not None:
+                first, last = (day.isoformat() for day in replace_days)
+                for table in ('rollup_cells', 'rollup_users', 'rollup_sketches'):
+                    conn.execute(f"DELETE FROM {table} WHERE course_id = ? AND day BETWEEN ? AND ?",
+                                 (course_id, first, last))
+
+            for rows in batches:
+                cells = {}
+                users = []
+                for day, hour, user_id, views, activity, _ in rows:
+                    day = day.isoformat() if isinstance(day, date) else str(day)[:10]
+                    cell = cells.get((day, hour))
+                    cells[day, hour] = (views, activity) if cell is None else (cell[0] + views, cell[1] + activity)
+                    users.append((course_id, day, hour, user_id))
+
+                latest = max(row[5] for row in rows)
+                if not isinstance(latest, datetime):
+                    # Drivers without a datetime type for MAX(date) hand back ISO text.
+                    latest = datetime.fromisoformat(str(latest))
+                if high_water is None or latest > high_water:
+                    high_water = latest
+                conn.executemany("""
+                    INSERT INTO rollup_cells (course_id, day, hour, views, activity_count)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (course_id, day, hour) DO UPDATE SET
+                        views = views + excluded.views,
+                        activity_count = activity_count + excluded.activity_count
+                """, [(course_id, day, hour, views, activity) for (day, hour), (views, activity) in cells.items()])
+                conn.executemany("INSERT OR IGNORE INTO rollup_users VALUES (?, ?, ?, ?)", users)
+                self._merge_sketches(conn, course_id, [user[1:] for user in users])
+                merged += len(rows)
+
+            conn.execute(
+                "INSERT OR REPLACE INTO rollup_watermarks (course_id, high_water, refreshed_at) VALUES (?, ?, ?)",
+                (course_id, high_water.isoformat(' ') if high_water else None, datetime.now().isoformat(' '))
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return merged
+
+    def device_watermark(self, course_id):
+        """(latest detailed_page_views.date folded in, time of the last refresh), or (None, None)."""
+        row = self._conn().execute(
+            "SELECT high_water, refreshed_at FROM rollup_device_watermarks WHERE course_id = ?",
+            (int(course_id),)
+        ).fetchone()
+        if row is None:
+            return None, None
+        high_water = datetime.fromisoformat(row[0]) if row[0] else None
+        return high_water, datetime.fromisoformat(row[1])
+
+    def has_devices(self, course_id):
+        return self.device_watermark(course_id)[1] is not None
+
+    def merge_devices(self, course_id, batches, replace_days=None):
+        """Fold GROUP BY (day, device_type) rows into rollup_devices in one transaction.
+
+        Each batch holds (day, device_type, views, last_seen) rows; views add to what is
+        stored and the device watermark moves forward to the latest last_seen. A NULL
+        device_type is kept as '' (it is part of the key) and read back as None.
+        replace_days=(first, last) clears those days first. Returns the rows merged.
+        """
+        course_id = int(course_id)
+        conn = self._conn()
+        merged = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            previous = conn.execute(
+                "SELECT high_water FROM rollup_device_watermarks WHERE course_id = ?", (course_id,)
+            ).fetchone()
+            high_water = datetime.fromisoformat(previous[0]) if previous and previous[0] else None
+
+            if replace_days is not None:
+                first, last = (day.isoformat() for day in replace_days)
+                conn.execute("DELETE FROM rollup_devices WHERE course_id = ? AND day BETWEEN ? AND ?",
+                             (course_id, first, last))
+
+            for rows in batches:
+                conn.executemany("""
+                    INSERT INTO rollup_devices (course_id, day, device_type, views)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (course_id, day, device_type) DO UPDATE SET views = views + excluded.views
+                """, [
+                    (course_id, day.isoformat() if isinstance(day, date) else str(day)[:10], device_type or '',
+                     views)
+                    for day, device_type, views, _ in rows
+                ])
+                latest = max(row[3] for row in rows)
+                if not isinstance(latest, datetime):
+                    latest = datetime.fromisoformat(str(latest))
+                if high_water is None or latest > high_water:
+                    high_water = latest
+                merged += len(rows)
+
+            conn.execute(
+                "INSERT OR REPLACE INTO rollup_device_watermarks (course_id, high_water, refreshed_at) "
+                "VALUES (?, ?, ?)",
+                (course_id, high_water.isoformat(' ') if high_water else None, datetime.now().isoformat(' '))
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return merged
+
+    def load_devices(self, course_id, first_day=None, last_day=None):
+        """[(device_type, views)] summed over the days in range (open-ended if None)."""
+        conditions, params = '', [int(course_id)]
+        if first_day is not None:
+            conditions += " AND day >= ?"
+            params.append(first_day.isoformat())
+        if last_day is not None:
+            conditions += " AND day <= ?"
+            params.append(last_day.isoformat())
+        return self._conn().execute(
+            f"SELECT NULLIF(device_type, ''), SUM(views) FROM rollup_devices WHERE course_id = ?{conditions} "
+            "GROUP BY device_type", params
+        ).fetchall()
+
+    def discussion_watermarks(self, course_id):
+        """(latest entry date, latest reply date) folded in, or None if never refreshed."""
+        row = self._conn().execute(
+            "SELECT entries_high_water, replies_high_water FROM rollup_discussion_watermarks WHERE course_id = ?",
+            (int(course_id),)
+        ).fetchone()
+        if row is None:
+            return None
+        return tuple(datetime.fromisoformat(value) if value else None for value in row)
+
+    def has_discussions(self, course_id):
+        return self.discussion_watermarks(course_id) is not None
+
+    def merge_discussions(self, course_id, entries, replies, replace=False):
+        """Fold new discussion rows into rollup_threads in one transaction.
+
+        entries holds (entry_id, title, posted) rows; replies holds GROUP BY parent_id
+        (parent_id, reply_count, last_reply) rows, whose counts add to what is stored.
+        replace=True clears the course first. Returns (entries, reply groups) merged.
+        """
+        course_id = int(course_id)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if replace:
+                conn.execute("DELETE FROM rollup_threads WHERE course_id = ?", (course_id,))
+                conn.execute("DELETE FROM rollup_discussion_watermarks WHERE course_id = ?", (course_id,))
+            previous = conn.execute(
+                "SELECT entries_high_water, replies_high_water, total_replies "
+                "FROM rollup_discussion_watermarks WHERE course_id = ?", (course_id,)
+            ).fetchone() or (None, None, 0)
+            entries_high_water, replies_high_water, total_replies = previous
+
+            def text(value):
+                return value.isoformat(' ') if isinstance(value, datetime) else str(value)
+
+            conn.executemany("""
+                INSERT INTO rollup_threads (course_id, entry_id, title, posted, reply_count)
+                VALUES (?, ?, ?, ?, 0)
+                ON CONFLICT (course_id, entry_id) DO UPDATE SET title = excluded.title, posted = excluded.posted
+            """, [(course_id, entry_id, title, text(posted)) for entry_id, title, posted in entries])
+            conn.executemany("""
+                INSERT INTO rollup_threads (course_id, entry_id, title, posted, reply_count)
+                VALUES (?, ?, NULL, NULL, ?)
+                ON CONFLICT (course_id, entry_id) DO UPDATE SET reply_count = reply_count + excluded.reply_count
+            """, [(course_id, parent_id, count) for parent_id, count, _ in replies])
+
+            if entries:
+                entries_high_water = max([text(posted) for _, _, posted in entries] + [entries_high_water or ''])
+            if replies:
+                replies_high_water = max([text(last) for _, _, last in replies] + [replies_high_water or ''])
+            total_replies += sum(count for _, count, _ in replies)
+            conn.execute(
+                "INSERT OR REPLACE INTO rollup_discussion_watermarks VALUES (?, ?, ?, ?, ?)",
+                (course_id, entries_high_water, replies_high_water, total_replies, datetime.now().isoformat(' '))
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(entries), len(replies)
+
+    def load_discussions(self, course_id, top_n):
+        """(total entries, total replies, [(entry_id, title, reply_count, posted)] of the top_n threads)."""
+        conn = self._conn()
+        course_id = int(course_id)
+        total_entries = conn.execute(
+            "SELECT COUNT(*) FROM rollup_threads WHERE course_id = ? AND posted IS NOT NULL", (course_id,)
+        ).fetchone()[0]
+        total_replies = conn.execute(
+            "SELECT total_replies FROM rollup_discussion_watermarks WHERE course_id = ?", (course_id,)
+        ).fetchone()[0]
+        top = conn.execute("""
+            SELECT entry_id, title, reply_count, posted
+            FROM rollup_threads
+            WHERE course_id = ? AND posted IS NOT NULL
+            ORDER BY reply_count DESC, entry_id
+            LIMIT ?
+        """, (course_id, top_n)).fetchall()
+        return total_entries, total_replies, [
+            (entry_id, title, reply_count, datetime.fromisoformat(posted)) for entry_id, title, reply_count, posted in top
+        ]
+
+    def load_days(self, course_id, first_day, last_day, exact=True):
+        """{date: DayActivity} for every day of the range, read from the rollups alone.
+
+        exact=False reads the HyperLogLog sketches instead of the per-user rows.
+        """
+        conn = self._conn()
+        params = (int(course_id), first_day.isoformat(), last_day.isoformat())
+        cells = conn.execute(
+            "SELECT day, hour, views, activity_count FROM rollup_cells "
+            "WHERE course_id = ? AND day BETWEEN ? AND ?", params
+        ).fetchall()
+        cell_columns = list(zip(*cells)) or [()] * 4
+        cells = (np.array(cell_columns[0], dtype='datetime64[D]'),
+                 np.array(cell_columns[1], dtype=np.int64),
+                 np.array(cell_columns[2], dtype=np.int64),
+                 np.array(cell_columns[3], dtype=np.int64))
+
+        if exact:
+            pairs = conn.execute(
+                "SELECT day, hour, user_id FROM rollup_users "
+                "WHERE course_id = ? AND day BETWEEN ? AND ?", params
+            ).fetchall()
+            pair_columns = list(zip(*pairs)) or [()] * 3
+            return DayActivity.from_rollups(first_day, last_day, cells, pairs=(
+                np.array(pair_columns[0], dtype='datetime64[D]'),
+                np.array(pair_columns[1], dtype=np.int64),
+                np.array(pair_columns[2], dtype=np.int64)
+            ))
+
+        stored = conn.execute(
+            "SELECT day, hour, entries FROM rollup_sketches "
+            "WHERE course_id = ? AND day BETWEEN ? AND ?", params
+        ).fetchall()
+        sketch_days, sketch_hours, blobs = list(zip(*stored)) or [()] * 3
+        lengths = [len(blob) // 4 for blob in blobs]
+        registers, rho = sketches.unpack(b''.join(blobs))
+        return DayActivity.from_rollups(first_day, last_day, cells, sketch_entries=(
+            np.repeat(np.array(sketch_days, dtype='datetime64[D]'), lengths),
+            np.repeat(np.array(sketch_hours, dtype=np.int64), lengths),
+            registers,
+            rho
+        ))
+
+
+    def student_watermark(self, course_id):
+        """(latest page_views.date folded into the student state, time of the last refresh), or (None, None)."""
+        row = self._conn().execute(
+            "SELECT high_water, refreshed_at FROM rollup_student_watermarks WHERE course_id = ?",
+            (int(course_id),)
+        ).fetchone()
+        if row is None:
+            return None, None
+        high_water = datetime.fromisoformat(row[0]) if row[0] else None
+        return high_water, datetime.fromisoformat(row[1])
+
+    def has_students(self, course_id):
+        return self.student_watermark(course_id)[1] is not None
+
+    @staticmethod
+    def _student_state(row):
+        first_day, last_day, active_days, morning, afternoon, evening, night, gaps_4days, longest_gap = row
+        return StudentState(
+            date.fromisoformat(first_day) if first_day else None,
+            date.fromisoformat(last_day) if last_day else None,
+            active_days, (morning, afternoon, evening, night), gaps_4days, longest_gap
+        )
+
+    @staticmethod
+    def _replay_student(conn, course_id, user_id):
+        return StudentState.from_days(
+            (date.fromisoformat(day), periods)
+            for day, *periods in conn.execute(
+                "SELECT day, morning, afternoon, evening, night FROM rollup_student_days "
+                "WHERE course_id = ? AND user_id = ?", (course_id, user_id)
+            )
+        )
+
+    def merge_students(self, course_id, batches, replace_days=None):
+        """Fold GROUP BY (day, hour, user) rows into the per-student state in one transaction.
+
+        Takes the same rows as merge. Each affected student's new days are folded into
+        their state, unless one lands before their last active day, in which case their
+        stored days are replayed; students without rows in the batches are not read.
+        replace_days=(first, last) clears those days first and replays every student
+        who had views in them. Returns the number of rows merged.
+        """
+        course_id = int(course_id)
+        conn = self._conn()
+        merged = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            previous = conn.execute(
+                "SELECT high_water, changes, changed_from FROM rollup_student_watermarks WHERE course_id = ?",
+                (course_id,)
+            ).fetchone()
+            high_water = datetime.fromisoformat(previous[0]) if previous and previous[0] else None
+            changes = (previous[1] if previous else 0) + 1
+            changed_from = previous[2] if previous else None
+
+            replay = set()
+            if replace_days is not None:
+                first, last = (day.isoformat() for day in replace_days)
+                replay.update(row[0] for row in conn.execute(
+                    "SELECT DISTINCT user_id FROM rollup_student_days WHERE course_id = ? AND day BETWEEN ? AND ?",
+                    (course_id, first, last)
+                ))
+                conn.execute("DELETE FROM rollup_student_days WHERE course_id = ? AND day BETWEEN ? AND ?",
+                             (course_id, first, last))
+                changed_from = min(changed_from or first, first)
+
+            new_days = {}
+            for rows in batches:
+                days = {}
+                for day, hour, user_id, views, _, _ in rows:
+                    day = day.isoformat() if isinstance(day, date) else str(day)[:10]
+                    periods = days.setdefault((user_id, day), [0] * len(PERIODS))
+                    periods[period_of(hour)] += views
+                conn.executemany("""
+                    INSERT INTO rollup_student_days (course_id, user_id, day, morning, afternoon, evening, night)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (course_id, user_id, day) DO UPDATE SET
+                        morning = morning + excluded.morning,
+                        afternoon = afternoon + excluded.afternoon,
+                        evening = evening + excluded.evening,
+                        night = night + excluded.night
+                """, [(course_id, user_id, day, *periods) for (user_id, day), periods in days.items()])
+                for (user_id, day), periods in days.items():
+                    stored = new_days.setdefault(user_id, {}).setdefault(day, [0] * len(PERIODS))
+                    for period, views in enumerate(periods):
+                        stored[period] += views
+
+                latest = max(row[5] for row in rows)
+                if not isinstance(latest, datetime):
+                    latest = datetime.fromisoformat(str(latest))
+                if high_water is None or latest > high_water:
+                    high_water = latest
+                merged += len(rows)
+
+            states, removed = [], []
+            for user_id in replay | new_days.keys():
+                row = conn.execute(
+                    "SELECT first_day, last_day, active_days, morning, afternoon, evening, night, gaps_4days, "
+                    "longest_gap, published FROM rollup_students WHERE course_id = ? AND user_id = ?",
+                    (course_id, user_id)
+                ).fetchone()
+                published = row[9] if row else 0
+                days = sorted(new_days.get(user_id, {}).items())
+                state = self._student_state(row[:9]) if row else StudentState()
+                if user_id in replay or (state.last_day is not None
+                                         and date.fromisoformat(days[0][0]) < state.last_day):
+                    state = self._replay_student(conn, course_id, user_id)
+                else:
+                    for day, periods in days:
+                        state.add_day(date.fromisoformat(day), periods)
+                if days:
+                    changed_from = min(changed_from or days[0][0], days[0][0])
+
+                if state.active_days == 0 and not published:
+                    removed.append((course_id, user_id))
+                    continue
+                states.append((
+                    course_id, user_id,
+                    state.first_day.isoformat() if state.first_day else None,
+                    state.last_day.isoformat() if state.last_day else None,
+                    state.active_days, *state.period_views, state.gaps_4days, state.longest_gap,
+                    changes, published
+                ))
+            conn.executemany("INSERT OR REPLACE INTO rollup_students VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             states)
+            conn.executemany("DELETE FROM rollup_students WHERE course_id = ? AND user_id = ?", removed)
+
+            conn.execute("""
+                INSERT INTO rollup_student_watermarks (course_id, high_water, changes, changed_from, refreshed_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (course_id) DO UPDATE SET
+                    high_water = excluded.high_water,
+                    changes = excluded.changes,
+                    changed_from = excluded.changed_from,
+                    refreshed_at = excluded.refreshed_at
+            """, (course_id, high_water.isoformat(' ') if high_water else None, changes, changed_from,
+                  datetime.now().isoformat(' ')))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return merged
+
+    def student_changes(self, course_id):
+        """What a publish of the course's student metrics has to cover, or None if there is no state.
+
+        A dict of the change count, the earliest day changed since the last publish,
+        the first and last day with views, and the first Monday and week count the
+        last publish used.
+        """
+        conn = self._conn()
+        course_id = int(course_id)
+        row = conn.execute(
+            "SELECT changes, changed_from, published_monday, published_weeks "
+            "FROM rollup_student_watermarks WHERE course_id = ?", (course_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        # Separate statements, so each is a single seek on the day index.
+        first_day = conn.execute("SELECT MIN(day) FROM rollup_student_days WHERE course_id = ?",
+                                 (course_id,)).fetchone()[0]
+        last_day = conn.execute("SELECT MAX(day) FROM rollup_student_days WHERE course_id = ?",
+                                (course_id,)).fetchone()[0]
+        return {
+            'changes': row[0],
+            'changed_from': date.fromisoformat(row[1]) if row[1] else None,
+            'published_monday': date.fromisoformat(row[2]) if row[2] else None,
+            'published_weeks': row[3],
+            'first_day': date.fromisoformat(first_day) if first_day else None,
+            'last_day': date.fromisoformat(last_day) if last_day else None,
+        }
+
+    def load_students(self, course_id, changed_only=False):
+        """{user_id: (StudentState, published)} of the course's students, or only the changed ones."""
+        conditions = " AND changed > 0" if changed_only else ""
+        rows = self._conn().execute(
+            "SELECT user_id, first_day, last_day, active_days, morning, afternoon, evening, night, gaps_4days, "
+            f"longest_gap, published FROM rollup_students WHERE course_id = ?{conditions}", (int(course_id),)
+        ).fetchall()
+        return {row[0]: (self._student_state(row[1:10]), bool(row[10])) for row in rows}
+
+    def student_ids(self, course_id):
+        """The course's students with at least one active day, in order."""
+        return [row[0] for row in self._conn().execute(
+            "SELECT user_id FROM rollup_students WHERE course_id = ? AND active_days > 0 ORDER BY user_id",
+            (int(course_id),)
+        )]
+
+    def student_week_views(self, course_id, first_monday, first_week, last_week):
+        """{week: {user_id: views}} for weeks first_week..last_week counted from first_monday."""
+        first = first_monday + timedelta(days=7 * (first_week - 1))
+        last = first_monday + timedelta(days=7 * last_week - 1)
+        weeks = {}
+        for day, user_id, views in self._conn().execute(
+            "SELECT day, user_id, morning + afternoon + evening + night FROM rollup_student_days "
+            "WHERE course_id = ? AND day BETWEEN ? AND ?", (int(course_id), first.isoformat(), last.isoformat())
+        ):
+            students = weeks.setdefault(week_of(date.fromisoformat(day), first_monday), {})
+            students[user_id] = students.get(user_id, 0) + views
+        return weeks
+
+    def student_week_counts(self, course_id, first_monday, first_week, last_week):
+        """{week: students with views that week} for weeks first_week..last_week counted from first_monday."""
+        first = first_monday + timedelta(days=7 * (first_week - 1))
+        last = first_monday + timedelta(days=7 * last_week - 1)
+        return dict(self._conn().execute("""
+            SELECT CAST((julianday(day) - julianday(?)) / 7 AS INTEGER) + 1 AS week, COUNT(DISTINCT user_id)
+            FROM rollup_student_days
+            WHERE course_id = ? AND day BETWEEN ? AND ?
+            GROUP BY week
+        """, (first_monday.isoformat(), int(course_id), first.isoformat(), last.isoformat())).fetchall())
+
+    def mark_students_published(self, course_id, changes, first_monday, n_weeks):
+        """Record a publish that covered every change up to the change count changes."""
+        course_id = int(course_id)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM rollup_students WHERE course_id = ? AND active_days = 0 AND changed <= ?",
+                         (course_id, changes))
+            conn.execute("UPDATE rollup_students SET changed = 0, published = 1 "
+                         "WHERE course_id = ? AND changed > 0 AND changed <= ?", (course_id, changes))
+            # A refresh since the publish keeps its changed_from for the next one.
+            conn.execute("""
+                UPDATE rollup_student_watermarks
+                SET changed_from = CASE WHEN changes = ? THEN NULL ELSE changed_from END,
+                    published_monday = ?, published_weeks = ?
+                WHERE course_id = ?
+            """, (changes, first_monday.isoformat() if first_monday else None, n_weeks, course_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+def configure_rollup_store(path):
+    """Point the process at another rollup file, e.g. a scratch store in the benchmarks."""
+    global _store
+    with _store_lock:
+        _store = RollupStore(path)
+        return _store
+
+
+def get_rollup_store():
+    """Process-wide RollupStore at ROLLUP_SQLITE_PATH, opened on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RollupStore.from_env()
+        return _store
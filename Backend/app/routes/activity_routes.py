@@ -7,10 +7,18 @@ activity_bp = Blueprint('activity', __name__)
 def get_detailed_weekly_activity():
     return ActivityController.get_detailed_weekly_activity()
 
+@activity_bp.route('/api/batch-weekly-activity', methods=['POST'])
+def batch_weekly_activity():
+    return ActivityController.get_batch_weekly_activity()
+
 @activity_bp.route('/api/weekly-activity', methods=['GET'])
 def weekly_activity():
     return ActivityController.get_weekly_activity()
 
+@activity_bp.route('/api/student-courses', methods=['GET'])
+def student_courses():
+    return ActivityController.get_student_courses()
+
 @activity_bp.route('/api/download-report', methods=['GET'])
 def download_report():
     return ActivityController.download_report()
\ No newline at end of file
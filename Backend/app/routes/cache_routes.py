@@ -0,0 +1,12 @@
+from flask import Blueprint
+from app.controllers.cache_controller import CacheController
+
+cache_bp = Blueprint('cache', __name__)
+
+@cache_bp.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return CacheController.get_stats()
+
+@cache_bp.route('/api/cache/invalidate', methods=['POST'])
+def invalidate_cache():
+    return CacheController.invalidate()
@@ -28,6 +28,14 @@ def get_course_device_stats():
 def get_course_video_stats():
     return CourseController.get_course_video_stats()
 
+@course_bp.route('/api/course-videos', methods=['GET'])
+def get_course_videos():
+    return CourseController.get_course_videos()
+
 @course_bp.route('/api/course-discussion-stats', methods=['GET'])
 def get_course_discussion_stats():
-    return CourseController.get_course_discussion_stats()
\ No newline at end of file
+    return CourseController.get_course_discussion_stats()
+
+@course_bp.route('/api/course-dashboard', methods=['GET'])
+def get_course_dashboard():
+    return CourseController.get_course_dashboard()
\ No newline at end of file
@@ -0,0 +1,16 @@
+from flask import Blueprint
+from app.controllers.job_controller import JobController
+
+job_bp = Blueprint('jobs', __name__)
+
+@job_bp.route('/api/jobs', methods=['POST'])
+def submit_job():
+    return JobController.submit_job()
+
+@job_bp.route('/api/jobs', methods=['GET'])
+def get_job():
+    return JobController.get_job()
+
+@job_bp.route('/api/job-result', methods=['GET'])
+def get_job_result():
+    return JobController.get_job_result()
@@ -0,0 +1,8 @@
+from flask import Blueprint
+from app.controllers.metrics_controller import MetricsController
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    return MetricsController.get_metrics()
@@ -0,0 +1,16 @@
+from flask import Blueprint
+from app.controllers.report_controller import ReportController
+
+report_bp = Blueprint('reports', __name__)
+
+@report_bp.route('/api/course-summary-runs', methods=['POST'])
+def start_summary_run():
+    return ReportController.start_summary_run()
+
+@report_bp.route('/api/course-summary-runs', methods=['GET'])
+def get_summary_runs():
+    return ReportController.get_summary_runs()
+
+@report_bp.route('/api/course-summary-report', methods=['GET'])
+def get_summary_report():
+    return ReportController.get_summary_report()
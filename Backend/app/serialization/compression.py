@@ -0,0 +1,67 @@
+"""Response compression negotiated from the request's Accept-Encoding.
+
+JSON and text responses of at least COMPRESSION_MIN_BYTES are sent brotli-encoded
+when the client accepts br and the brotli package is installed (it is optional),
+gzip-encoded otherwise. Streamed responses, such as report downloads, are left alone:
+they encode their own chunks.
+"""
+import gzip
+import os
+from flask import request
+from app.instrumentation import spans
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '1'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '4'))
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/csv', 'text/html')
+
+
+def encodings():
+    """Content codings this process can produce, best first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output the same for the same body.
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _compressible(response):
+    return (
+        200 <= response.status_code < 300 and response.status_code != 204
+        and not response.direct_passthrough
+        and not response.is_streamed
+        and 'Content-Encoding' not in response.headers
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+    )
+
+
+def init_app(app):
+    if not COMPRESSION_ENABLED:
+        return
+
+    @app.after_request
+    def compress_response(response):
+        if not _compressible(response):
+            return response
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_BYTES:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(encodings())
+        if encoding is None:
+            return response
+        with spans.span(f'compress.{encoding}'):
+            response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,85 @@
+"""JSON encoding for API responses, with orjson when it is installed.
+
+orjson writes NumPy arrays and scalars natively, so analyzer output can hold arrays
+rather than lists of Python ints. Without orjson the standard library encoder is used,
+with the same handling of NumPy, date, Decimal and UUID values. Dates keep Flask's
+HTTP-date format and Decimals are written as strings, as jsonify() always did.
+"""
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+from app.instrumentation import spans
+
+try:
+    import orjson
+except ImportError:  # the standard library encoder is used instead
+    orjson = None
+
+# ?shape=columns on the row-list endpoints returns {"columns": [...], "data": [[...], ...]}
+# with each key written once, like the batch weekly activity response.
+RESPONSE_SHAPES = ('rows', 'columns')
+
+
+def orjson_available():
+    return orjson is not None
+
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, date):
+        return http_date(obj)
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj, sort_keys=False):
+    """obj as UTF-8 JSON bytes. orjson writes NaN and infinity as null."""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+    text = json.dumps(obj, default=_default, sort_keys=sort_keys, ensure_ascii=False, separators=(',', ':'))
+    return text.encode('utf-8')
+
+
+def to_columns(records):
+    """A list of dicts with the same keys as {"columns": [...], "data": [[values of column 0], ...]}."""
+    if not records:
+        return {'columns': [], 'data': []}
+    columns = list(records[0])
+    return {'columns': columns, 'data': [[record[column] for record in records] for column in columns]}
+
+
+class JSONProvider(DefaultJSONProvider):
+    """jsonify() through dumps() above, timed as the json.dumps span.
+
+    Responses are compact; sort_keys is honoured (Flask's default is True) so
+    key order is unchanged from the default provider.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return self._encode(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encode(obj) + b'\n', mimetype=self.mimetype)
+
+    def _encode(self, obj):
+        with spans.span('json.dumps'):
+            return dumps(obj, sort_keys=self.sort_keys)
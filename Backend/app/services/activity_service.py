@@ -1,53 +1,154 @@
+import os
+from datetime import datetime
 from app.database.connection import Database
+from app.cache.result_cache import cached, result_cache
+from app.services.course_service import CourseService
+from app.instrumentation.spans import span
 from app.models.activity import WeeklyActivity
+from app.services import report_export
+from app.storage.analysis import SUMMARY_COLUMNS, get_analysis_storage
+
+REPORT_BATCH_SIZE = int(os.getenv('REPORT_BATCH_SIZE', '5000'))
+REPORT_EXCLUDED_COLUMNS = ('original_id',)
+
+
+def _columnar(columns, rows):
+    return {
+        'columns': columns,
+        'data': [list(values) for values in zip(*rows)] if rows else [[] for _ in columns],
+    }
+
+
+def _report_batches(cursor, keep, rows):
+    """Row batches projected to the kept columns, starting with the already fetched rows."""
+    while rows:
+        yield [[row[i] for i in keep] for row in rows]
+        rows = cursor.fetchmany(REPORT_BATCH_SIZE)
+
+
+class _ReportChunks:
+    """Iterator over encoded chunks that returns the connection to the pool once done.
+
+    WSGI servers call close() when the response ends or the client disconnects,
+    which also covers a download abandoned before its first chunk.
+    """
+
+    def __init__(self, chunks, conn):
+        self._chunks = chunks
+        self._conn = conn
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._chunks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        self._chunks.close()
+        self._conn.close()
+
 
 class ActivityService:
     @staticmethod
+    @cached('weekly_activity')
     def get_weekly_activity(course_id, student_id=None):
         with Database.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            base_query = f"""
-                SELECT total_pageviews, active_days, avg_daily_views, avg_weekly_views, 
-                       engagement_rate, morning_pct, afternoon_pct, evening_pct, night_pct, 
-                       total_gaps_4days, longest_gap_days, total_gap_days  
-                FROM page_view_analysis_course_{course_id}
-            """
-            
-            if student_id:
-                query = f"{base_query} WHERE student_id = ?"
-                cursor.execute(query, (student_id,))
-            else:
-                cursor.execute(base_query)
-            
-            rows = cursor.fetchall()
-            return [WeeklyActivity(row).to_dict() for row in rows]
+            rows = get_analysis_storage().summary_rows(conn.cursor(), course_id, student_id)
+            with span('rows.convert'):
+                return [WeeklyActivity(row).to_dict() for row in rows]
         
     @staticmethod
-    def get_detailed_weekly_activity(course_id, student_ids):
+    @cached('detailed_weekly_activity')
+    def get_detailed_weekly_activity(course_id, student_ids, columnar=False):
+        """One dict per analysis row, or {"columns": [...], "data": [...]} if columnar."""
         with Database.get_connection() as conn:
             cursor = conn.cursor()
             
             student_id_list = [id.strip() for id in student_ids.split(',')]
-            
-            placeholders = ','.join(['?' for _ in student_id_list])
-            query = f"""
-                SELECT *
-                FROM page_view_analysis_course_{course_id}
-                WHERE student_id IN ({placeholders})
-            """
+            columns, rows = get_analysis_storage().analysis_rows(cursor, course_id, student_id_list)
 
-            cursor.execute(query, student_id_list)
+            with span('rows.convert'):
+                if columnar:
+                    return _columnar(columns, rows)
+                return [dict(zip(columns, row)) for row in rows]
 
-            columns = [column[0] for column in cursor.description]
-            
-            rows = cursor.fetchall()
-            
-            data = []
-            for row in rows:
-                row_dict = {}
-                for i, value in enumerate(row):
-                    row_dict[columns[i]] = value
-                data.append(row_dict)
-
-            return data
\ No newline at end of file
+    @staticmethod
+    def get_batch_weekly_activity(selections):
+        """Weekly activity for several courses and students in columnar form.
+
+        selections maps course_id -> student ids. Courses not already cached share one
+        connection and need one query per chunk of app.storage.analysis.STUDENT_CHUNK_SIZE
+        (999) students, in either layout.
+        Courses an identical concurrent request is already querying are waited for.
+        Returns {course_id: {"columns": [...], "data": [[values of column 0], ...]}}.
+        """
+        courses = {}
+        for course_id, student_ids in selections.items():
+            student_ids = sorted({str(id).strip() for id in student_ids})
+            courses[repr((str(course_id), student_ids))] = (course_id, student_ids)
+
+        def fetch(missing):
+            fetched = {}
+            with Database.get_connection() as conn:
+                cursor = conn.cursor()
+                for key in missing:
+                    course_id, student_ids = courses[key]
+                    columns, rows = get_analysis_storage().analysis_rows(cursor, course_id, student_ids)
+                    with span('rows.convert'):
+                        fetched[key] = _columnar(columns, rows)
+            return fetched
+
+        found = result_cache.get_or_compute_many('batch_weekly_activity', list(courses), fetch)
+        return {courses[key][0]: found[key] for key in courses}
+
+    @staticmethod
+    @cached('student_courses')
+    def get_student_courses(student_id):
+        """The student's per-course analysis columns in every course, ordered by course."""
+        with Database.get_connection() as conn:
+            rows = get_analysis_storage().student_courses(conn.cursor(), student_id)
+            with span('rows.convert'):
+                return [dict(zip(('course_id',) + SUMMARY_COLUMNS, row)) for row in rows]
+
+    @staticmethod
+    def report_filename(course_id, fmt='csv'):
+        """Download file name of the course's report: the course name, a timestamp and fmt's extension."""
+        course_name = CourseService.get_course_name(course_id)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        sanitized_course_name = "".join(x for x in str(course_name) if x.isalnum() or x in [' ', '_']).strip()
+        return f"{sanitized_course_name}_activity_report_{timestamp}.{report_export.REPORT_FORMATS[fmt][1]}"
+
+    @staticmethod
+    def stream_report(course_id, fmt='csv'):
+        """Export of the course's analysis table as a generator of byte chunks.
+
+        fmt is one of report_export.REPORT_FORMATS. Returns None if the table has no
+        rows. Rows are fetched REPORT_BATCH_SIZE at a time and encoded as they arrive,
+        keeping the database's native types for parquet and arrow; the pooled
+        connection is held until the generator is exhausted or closed.
+        """
+        conn = Database.get_connection()
+        try:
+            cursor = conn.cursor()
+            get_analysis_storage().execute_report(cursor, course_id)
+            keep = [i for i, column in enumerate(cursor.description)
+                    if column[0] not in REPORT_EXCLUDED_COLUMNS]
+            description = [cursor.description[i] for i in keep]
+            rows = cursor.fetchmany(REPORT_BATCH_SIZE)
+        except Exception:
+            conn.close()
+            raise
+
+        if not rows:
+            conn.close()
+            return None
+        try:
+            chunks = report_export.encode(fmt, description, _report_batches(cursor, keep, rows))
+        except Exception:
+            conn.close()
+            raise
+        return _ReportChunks(chunks, conn)
@@ -1,9 +1,109 @@
+import base64
+import json
+import logging
+import os
+import numpy as np
 from app.database.connection import Database
+from app.cache.result_cache import cached, result_cache
+from app.analyzer.aggregates import CourseAggregates, DayActivity
 from app.analyzer.course_analyzer import CourseSummaryAnalyzer 
-from datetime import datetime
+from app.instrumentation.spans import span
+from app.rollups.store import get_rollup_store
+from app.serialization.json_provider import to_columns
+from app.storage.analysis import get_analysis_storage
+from datetime import date, datetime, timedelta
+
+SUMMARY_MODES = ('incremental', 'rollup', 'aggregate', 'raw')
+# Modes whose distinct-user counts are always exact, whatever exact= says.
+EXACT_MODES = ('aggregate', 'raw')
+
+FETCH_BATCH_SIZE = int(os.getenv('DB_FETCH_BATCH_SIZE', '50000'))
+
+# Days this close to today are always re-queried rather than cached as partials.
+SUMMARY_SETTLE_DAYS = int(os.getenv('SUMMARY_SETTLE_DAYS', '2'))
+
+# Threads with the most replies in the discussion stats.
+DISCUSSION_TOP_N = int(os.getenv('DISCUSSION_TOP_N', '5'))
+
+# Top videos by plays in the video stats, and the page size of the full video list.
+VIDEO_TOP_N = int(os.getenv('VIDEO_TOP_N', '5'))
+VIDEO_PAGE_SIZE = int(os.getenv('VIDEO_PAGE_SIZE', '50'))
+VIDEO_PAGE_SIZE_MAX = 500
+
+EPOCH = datetime(1970, 1, 1)
+
+logger = logging.getLogger(__name__)
+
+
+def _to_datetime64(values):
+    # Several times faster than np.array(values, dtype='datetime64[ns]') on datetime
+    # objects. Microseconds stay exact: they are well inside float64's 53-bit mantissa.
+    seconds = np.fromiter(((value - EPOCH).total_seconds() for value in values), np.float64, len(values))
+    return np.rint(seconds * 1e6).astype(np.int64).view('datetime64[us]').astype('datetime64[ns]')
+
+
+def _concat(chunks, dtype):
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+
+
+def _day_start(day):
+    return datetime.combine(day, datetime.min.time())
+
+
+def columnar_summary(data):
+    """Summary data with its hourly rows as columns, for ?shape=columns."""
+    hourly = data['hourly']
+    return dict(data, hourly={'hours': to_columns(hourly['hours']), 'periods': to_columns(hourly['periods'])})
+
+
+def encode_video_cursor(views, object_id):
+    """Opaque cursor for the video list page that starts after this video."""
+    return base64.urlsafe_b64encode(json.dumps([views, object_id]).encode()).decode().rstrip('=')
+
+
+def decode_video_cursor(cursor):
+    """(views, object_id) from encode_video_cursor; ValueError if it is not one."""
+    try:
+        views, object_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor {cursor!r}") from e
+    if not isinstance(views, int):
+        raise ValueError(f"Invalid cursor {cursor!r}")
+    return views, object_id
+
+
+def _video(row):
+    return {
+        'title': row.entry_name,
+        'views': row.views,
+        'unique_viewers': row.unique_viewers,
+        'completion_rate': round(row.avg_completion_rate, 2),
+        'duration_mins': round(row.duration_mins, 2),
+        'drop_off_rate': round(row.avg_view_drop_off, 2)
+    }
+
+
+def discussion_title(message):
+    return message[:100] + '...' if len(message) > 100 else message
+
+
+def _day_key(course_id, day):
+    return repr((str(course_id), day.isoformat()))
+
+
+def _contiguous_runs(days):
+    """Collapse sorted dates into (first, last) runs of consecutive days."""
+    runs = []
+    for day in days:
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
 
 class CourseService:
     @staticmethod
+    @cached('courses')
     def get_all_courses():
         with Database.get_connection() as conn:
             cursor = conn.cursor()
@@ -13,6 +113,7 @@ class CourseService:
             return [{"course_id": row.course_id, "name": row.name} for row in rows]
     
     @staticmethod
+    @cached('course_name')
     def get_course_name(course_id):
         with Database.get_connection() as conn:
             cursor = conn.cursor()
@@ -21,86 +122,245 @@ class CourseService:
             return result[0] if result else f"course_{course_id}"
         
     @staticmethod
+    @cached('students')
     def get_students_in_course(course_id):
         with Database.get_connection() as conn:
-            cursor = conn.cursor()
-            query = f"""
-            SELECT student_id 
-            FROM page_view_analysis_course_{course_id}
-            GROUP BY student_id
-            ORDER BY student_id
-            """
-            cursor.execute(query)
-            rows = cursor.fetchall()
-         
+            student_ids = get_analysis_storage().student_ids(conn.cursor(), course_id)
             return [
                 {
-                    "student_id": str(row[0]), 
-                    "name": f"Student {idx + 1}" 
-                } for idx, row in enumerate(rows)
+                    "student_id": str(student_id),
+                    "name": f"Student {idx + 1}"
+                } for idx, student_id in enumerate(student_ids)
             ]
             
     @staticmethod
-    def get_course_summary(course_id, start_date, end_date):
-        try:
-            conn = Database.get_connection()
-            cursor = conn.cursor()
+    def get_course_summary(course_id, start_date, end_date, mode=None, exact=True):
+        """Course summary for a date range.
+
+        mode "incremental" (default, or COURSE_SUMMARY_MODE) assembles the summary from
+        per-day partials kept in the result cache and only queries the days that are
+        missing, so an extended or narrowed range reuses the days already seen.
+        "rollup" reads the precomputed rollup store (see app/rollups) without touching
+        page_views, falling back to "incremental" for courses that have no rollups yet.
+        "aggregate" lets SQL Server do the per-day/per-hour GROUP BYs and ships only
+        those rows; "raw" fetches every page_views row into arrays and aggregates in
+        pandas. The finished summary is cached per course, range and mode.
 
+        Distinct-user counts are exact. With exact=False the "incremental" and "rollup"
+        modes merge the counts over hours, weeks, months and the whole range from
+        HyperLogLog sketches instead (about 1% error); "aggregate" and "raw" always
+        count exactly.
+        """
+        mode = mode or os.getenv('COURSE_SUMMARY_MODE', 'incremental')
+        if mode not in SUMMARY_MODES:
+            raise ValueError(f"Invalid summary mode '{mode}', expected one of {', '.join(SUMMARY_MODES)}")
+
+        # aggregate and raw always count exactly, so exact=False shares their entry.
+        exact = bool(exact) or mode in EXACT_MODES
+        return result_cache.get_or_compute(
+            'course_summary',
+            repr((str(course_id), start_date, end_date, mode, exact)),
+            lambda: CourseService._generate_course_summary(course_id, start_date, end_date, mode, exact)
+        )
+
+    @staticmethod
+    def _generate_course_summary(course_id, start_date, end_date, mode, exact=True):
+        try:
             start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
             end_datetime = datetime.strptime(end_date, "%Y-%m-%d")
+            logger.debug("Course summary for course %s, %s to %s (mode=%s, exact=%s)",
+                         course_id, start_datetime, end_datetime, mode, exact)
+
+            first_day, last_day = start_datetime.date(), end_datetime.date()
+            if mode == 'rollup':
+                store = get_rollup_store()
+                if store.has_course(course_id):
+                    analyzer = CourseSummaryAnalyzer.from_rollups(store, course_id, first_day, last_day, exact)
+                    return analyzer.generate_response()
+                logger.info("No rollups for course %s, using incremental mode", course_id)
+                mode = 'incremental'
+
+            if mode == 'incremental':
+                days = CourseService._load_day_activity(course_id, first_day, last_day)
+                with span('analyze.aggregate'):
+                    aggregates = CourseAggregates.from_days(first_day, last_day, days, exact=exact)
+                analyzer = CourseSummaryAnalyzer.from_aggregates(aggregates)
+                return analyzer.generate_response()
+
+            # The connection goes back to the pool before the analysis runs.
+            with Database.get_connection() as conn:
+                cursor = conn.cursor()
+                if mode == 'aggregate':
+                    aggregates = CourseService._fetch_summary_aggregates(
+                        cursor, course_id, start_datetime, end_datetime
+                    )
+                else:
+                    columns = CourseService._fetch_page_view_columns(
+                        cursor, course_id, start_datetime, end_datetime
+                    )
+
+            if mode == 'aggregate':
+                analyzer = CourseSummaryAnalyzer.from_aggregates(aggregates)
+            else:
+                analyzer = CourseSummaryAnalyzer(columns, start_date, end_date)
+            return analyzer.generate_response()
+
+        except Exception as e:
+            logger.exception("Error generating course summary for course %s", course_id)
+            raise Exception(f"Error generating course summary: {str(e)}")
+
+    @staticmethod
+    def _load_day_activity(course_id, first_day, last_day):
+        """{date: DayActivity} for the range, querying only the days not already cached.
 
-            print(f"\nInput dates:")
-            print(f"start_date: {start_date}, type: {type(start_date)}")
-            print(f"end_date: {end_date}, type: {type(end_date)}")
-            print(f"Formatted datetime objects for SQL:")
-            print(f"start_datetime: {start_datetime}")
-            print(f"end_datetime: {end_datetime}")
+        Days that a concurrent summary of the same course is already querying are
+        waited for instead of queried again.
+        """
+        settled_before = date.today() - timedelta(days=SUMMARY_SETTLE_DAYS)
+        keys = {}
+        for offset in range((last_day - first_day).days + 1):
+            day = first_day + timedelta(days=offset)
+            keys[_day_key(course_id, day)] = day
 
-            query = """
-            SELECT user_id, date, views 
+        def fetch(missing):
+            fetched = {}
+            with Database.get_connection() as conn:
+                cursor = conn.cursor()
+                for run_start, run_end in _contiguous_runs(sorted(keys[key] for key in missing)):
+                    days = CourseService._fetch_day_activity(cursor, course_id, run_start, run_end)
+                    fetched.update((_day_key(course_id, day), activity) for day, activity in days.items())
+            return fetched
+
+        # Recent days may still receive rows from the next import, so only settled days are kept.
+        found = result_cache.get_or_compute_many('summary_days', list(keys), fetch,
+                                                 cacheable=lambda key: keys[key] < settled_before)
+        return {keys[key]: activity for key, activity in found.items()}
+
+    @staticmethod
+    def _fetch_page_view_columns(cursor, course_id, start_datetime, end_datetime):
+        """Fetch page_views rows in batches straight into typed arrays (id, datetime, views)."""
+        cursor.execute("""
+            SELECT user_id, date, views
             FROM page_views
-            WHERE course_id = ? AND date BETWEEN ? AND ?
-            ORDER BY user_id, date
-            """
+            WHERE course_id = ? AND date >= ? AND date < ?
+        """, (course_id, start_datetime, end_datetime + timedelta(days=1)))
 
-            cursor.execute(query, (course_id, start_datetime, end_datetime))
-            rows = cursor.fetchall()
+        ids, datetimes, views = [], [], []
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            with span('rows.convert'):
+                batch_ids, batch_datetimes, batch_views = zip(*rows)
+                ids.append(np.array(batch_ids, dtype=np.int64))
+                datetimes.append(_to_datetime64(batch_datetimes))
+                views.append(np.array(batch_views, dtype=np.int32))
 
-            all_student_data = []
-            current_user = None
-            current_user_data = []
+        return {
+            'id': _concat(ids, np.int64),
+            'datetime': _concat(datetimes, 'datetime64[ns]'),
+            'views': _concat(views, np.int32)
+        }
 
-            for row in rows:
-                user_id = row[0]
+    @staticmethod
+    def _fetch_day_activity(cursor, course_id, first_day, last_day):
+        cursor.execute("""
+            SELECT CAST(date AS date) AS day,
+                   DATEPART(hour, date) AS hour,
+                   user_id,
+                   SUM(views) AS views,
+                   COUNT(*) AS activity_count
+            FROM page_views
+            WHERE course_id = ? AND date >= ? AND date < ?
+            GROUP BY CAST(date AS date), DATEPART(hour, date), user_id
+        """, (course_id, _day_start(first_day), _day_start(last_day + timedelta(days=1))))
 
-                if current_user != user_id and current_user is not None:
-                    if current_user_data:
-                        all_student_data.append(current_user_data)
-                    current_user_data = []
+        days, hours, users, views, activity = [], [], [], [], []
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            with span('rows.convert'):
+                batch_days, batch_hours, batch_users, batch_views, batch_activity = zip(*rows)
+                days.append(np.array(batch_days, dtype='datetime64[D]'))
+                hours.append(np.array(batch_hours, dtype=np.int64))
+                users.append(np.array(batch_users, dtype=np.int64))
+                views.append(np.array(batch_views, dtype=np.int64))
+                activity.append(np.array(batch_activity, dtype=np.int64))
 
-                current_user = user_id
-                student_data = {
-                    'id': user_id,
-                    'date': row[1].strftime("%Y-%m-%d %H:%M:%S"),
-                    'views': row[2]
-                }
-                current_user_data.append(student_data)
+        with span('analyze.split_days'):
+            return DayActivity.split_by_day(
+                first_day, last_day,
+                _concat(days, 'datetime64[D]'),
+                _concat(hours, np.int64),
+                _concat(users, np.int64),
+                _concat(views, np.int64),
+                _concat(activity, np.int64)
+            )
 
-            if current_user_data:
-                all_student_data.append(current_user_data)
+    @staticmethod
+    def _fetch_summary_aggregates(cursor, course_id, start_datetime, end_datetime):
+        # Same row filter as the other modes (whole days up to and including
+        # end_datetime's date), so every mode summarises identical data.
+        params = (course_id, start_datetime, end_datetime + timedelta(days=1))
 
-            conn.close()
+        cursor.execute("""
+            SELECT CAST(date AS date) AS day,
+                   SUM(views) AS views,
+                   COUNT(*) AS activity_count,
+                   COUNT(DISTINCT user_id) AS unique_users
+            FROM page_views
+            WHERE course_id = ? AND date >= ? AND date < ?
+            GROUP BY CAST(date AS date)
+        """, params)
+        daily_rows = cursor.fetchall()
 
-            analyzer = CourseSummaryAnalyzer(all_student_data, start_date, end_date)
-            return analyzer.generate_response()
+        cursor.execute("""
+            SELECT DATEPART(hour, date) AS hour,
+                   SUM(views) AS views,
+                   COUNT(*) AS activity_count,
+                   COUNT(DISTINCT user_id) AS unique_users,
+                   COUNT(DISTINCT CAST(date AS date)) AS unique_days
+            FROM page_views
+            WHERE course_id = ? AND date >= ? AND date < ?
+            GROUP BY DATEPART(hour, date)
+        """, params)
+        hourly_rows = cursor.fetchall()
 
-        except Exception as e:
-            print(f"\nError details:")
-            print(f"Error type: {type(e)}")
-            print(f"Error message: {str(e)}")
-            raise Exception(f"Error generating course summary: {str(e)}")
+        cursor.execute("""
+            SELECT COUNT(DISTINCT user_id)
+            FROM page_views
+            WHERE course_id = ? AND date >= ? AND date < ?
+        """, params)
+        total_users = cursor.fetchone()[0]
+
+        # Week 0 starts on the Monday of start_datetime's week, as in the analyzer.
+        first_monday = start_datetime - timedelta(days=start_datetime.weekday())
+        cursor.execute("""
+            SELECT DATEDIFF(day, ?, date) / 7 AS week,
+                   COUNT(DISTINCT user_id) AS unique_users
+            FROM page_views
+            WHERE course_id = ? AND date >= ? AND date < ?
+            GROUP BY DATEDIFF(day, ?, date) / 7
+        """, (first_monday, *params, first_monday))
+        weekly_rows = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT DATEPART(month, date) AS month,
+                   COUNT(DISTINCT user_id) AS unique_users
+            FROM page_views
+            WHERE course_id = ? AND date >= ? AND date < ?
+            GROUP BY DATEPART(month, date)
+        """, params)
+        monthly_rows = cursor.fetchall()
+
+        return CourseAggregates.from_totals(
+            start_datetime.date(), end_datetime.date(), daily_rows, hourly_rows, total_users,
+            weekly_rows, monthly_rows
+        )
         
     @staticmethod
+    @cached('participations')
     def get_course_participations(course_id):
         with Database.get_connection() as conn:
             cursor = conn.cursor()
@@ -109,57 +369,127 @@ class CourseService:
             return [{"module_id": row.module_id,"module_name":row.module_name, "assignment_id": row.assignment_id,"title":row.title, "status": row.status} for row in rows]
         
     @staticmethod
-    def get_course_device_stats(course_id):
-        
-        try:
-            conn = Database.get_connection()
-            cursor = conn.cursor()
-            cursor = conn.cursor()
+    @cached('device_stats')
+    def get_course_device_stats(course_id, start_date=None, end_date=None):
+        """Page views per device type for a course, optionally within [start_date, end_date].
 
-            cursor.execute('''
-                SELECT 
-                    device_type,
-                    COUNT(*) as count,
-                    COUNT(*) * 100.0 / SUM(COUNT(*)) OVER() as percentage
-                FROM detailed_page_views
-                GROUP BY device_type
-                ORDER BY count DESC
-            ''')
-            
-            rows = cursor.fetchall()
-            
-            device_stats = [{
-                'device_type': row[0],
-                'count': row[1],
-                'percentage': round(row[2], 2)
-            } for row in rows]
-            
-            return device_stats
-        finally:
-            conn.close()
+        Read from the per-day device counts of the rollup store once the course has
+        been refreshed (see app/rollups), so the cost does not grow with
+        detailed_page_views. Until then SQL Server groups the course's rows.
+        """
+        first_day = datetime.strptime(start_date, "%Y-%m-%d").date() if start_date else None
+        last_day = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else None
+
+        store = get_rollup_store()
+        if store.has_devices(course_id):
+            counts = store.load_devices(course_id, first_day, last_day)
+        else:
+            conditions, params = '', [course_id]
+            if first_day is not None:
+                conditions += " AND date >= ?"
+                params.append(_day_start(first_day))
+            if last_day is not None:
+                conditions += " AND date < ?"
+                params.append(_day_start(last_day + timedelta(days=1)))
+            with Database.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    SELECT device_type, COUNT(*) AS count
+                    FROM detailed_page_views
+                    WHERE course_id = ?{conditions}
+                    GROUP BY device_type
+                ''', params)
+                counts = [(row[0], row[1]) for row in cursor.fetchall()]
+
+        total = sum(count for _, count in counts)
+        return [{
+            'device_type': device_type,
+            'count': count,
+            'percentage': round(count * 100.0 / total, 2)
+        } for device_type, count in sorted(counts, key=lambda row: (-row[1], row[0] or ''))]
             
     @staticmethod
-    def get_course_video_stats(course_id):
-        try:
-            conn = Database.get_connection()
-            cursor = conn.cursor()
+    @cached('video_stats')
+    def get_course_video_stats(course_id, top_n=VIDEO_TOP_N):
+        """Overview of a course's videos and its top_n most played, in one query.
 
+        The overview is computed by window aggregates over the course's rows and the
+        ranking by ROW_NUMBER(), so video_analytics (one row per video) is read once.
+        The overview rides on the ranked rows, so top_n must be at least 1.
+        """
+        if top_n < 1:
+            raise ValueError(f"Invalid top_n {top_n}, expected at least 1")
+        with Database.get_connection() as conn:
+            cursor = conn.cursor()
             cursor.execute('''
-                SELECT 
-                    COUNT(DISTINCT v.object_id) as total_videos,
-                    SUM(v.count_plays) as total_plays,
-                    SUM(v.unique_viewers) as total_viewers,
-                    AVG(v.avg_completion_rate) as avg_completion_rate,
-                    AVG(v.engagement_ranking) as avg_engagement,
-                    SUM(v.sum_time_viewed) / 3600 as total_hours_viewed,
-                    AVG(v.avg_view_drop_off) as avg_drop_off
-                FROM video_analytics v
-               
-            ''')
-            overview = cursor.fetchone()
+                SELECT *
+                FROM (
+                    SELECT
+                        v.entry_name,
+                        v.count_plays as views,
+                        v.unique_viewers,
+                        v.avg_completion_rate,
+                        v.duration_secs / 60.0 as duration_mins,
+                        v.avg_view_drop_off,
+                        COUNT(*) OVER () as total_videos,
+                        SUM(v.count_plays) OVER () as total_plays,
+                        SUM(v.unique_viewers) OVER () as total_viewers,
+                        AVG(v.avg_completion_rate) OVER () as overall_completion_rate,
+                        AVG(v.engagement_ranking) OVER () as avg_engagement,
+                        SUM(v.sum_time_viewed) OVER () / 3600 as total_hours_viewed,
+                        AVG(v.avg_view_drop_off) OVER () as avg_drop_off,
+                        ROW_NUMBER() OVER (ORDER BY v.count_plays DESC, v.object_id) as play_rank
+                    FROM video_analytics v
+                    WHERE v.course_id = ?
+                ) ranked
+                WHERE play_rank <= ?
+                ORDER BY play_rank
+            ''', (course_id, top_n))
+            rows = cursor.fetchall()
 
-            cursor.execute('''
-                SELECT TOP 5
+        if not rows:
+            return {
+                'overview': dict.fromkeys(('total_videos', 'total_plays', 'total_viewers', 'avg_completion_rate',
+                                           'avg_engagement', 'total_hours_viewed', 'avg_drop_off'), 0),
+                'top_videos': []
+            }
+
+        overview = rows[0]
+        return {
+            'overview': {
+                'total_videos': overview.total_videos,
+                'total_plays': overview.total_plays,
+                'total_viewers': overview.total_viewers,
+                'avg_completion_rate': round(overview.overall_completion_rate, 2),
+                'avg_engagement': round(overview.avg_engagement, 2),
+                'total_hours_viewed': round(overview.total_hours_viewed, 2),
+                'avg_drop_off': round(overview.avg_drop_off, 2)
+            },
+            'top_videos': [_video(row) for row in rows]
+        }
+
+    @staticmethod
+    @cached('video_pages')
+    def get_course_videos(course_id, limit=VIDEO_PAGE_SIZE, after=None):
+        """One page of a course's videos, most played first.
+
+        after is the (views, object_id) of the last video of the previous page. The
+        page is read by seeking to it in (count_plays DESC, object_id) order rather
+        than by skipping rows with OFFSET, so a deep page costs the same as the
+        first. Returns {"videos": [...], "next_after": (views, object_id), or None
+        on the last page}.
+        """
+        conditions, params = '', [course_id]
+        if after is not None:
+            # count_plays <= ? lets the (course_id, count_plays DESC, object_id) index seek.
+            conditions = " AND v.count_plays <= ? AND (v.count_plays < ? OR v.object_id > ?)"
+            params += [after[0], after[0], after[1]]
+
+        with Database.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT
+                    v.object_id,
                     v.entry_name,
                     v.count_plays as views,
                     v.unique_viewers,
@@ -167,114 +497,89 @@ class CourseService:
                     v.duration_secs / 60.0 as duration_mins,
                     v.avg_view_drop_off
                 FROM video_analytics v
-                ORDER BY v.count_plays DESC
-            ''')   
-          
-            top_videos = cursor.fetchall()
+                WHERE v.course_id = ?{conditions}
+                ORDER BY v.count_plays DESC, v.object_id
+                OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY
+            ''', (*params, limit + 1))
+            rows = cursor.fetchall()
+
+        page = rows[:limit]
+        return {
+            'videos': [dict(_video(row), video_id=row.object_id) for row in page],
+            'next_after': (page[-1].views, page[-1].object_id) if len(rows) > limit else None
+        }
 
-            return {
-                'overview': {
-                    'total_videos': overview.total_videos,
-                    'total_plays': overview.total_plays,
-                    'total_viewers': overview.total_viewers,
-                    'avg_completion_rate': round(overview.avg_completion_rate, 2),
-                    'avg_engagement': round(overview.avg_engagement, 2),
-                    'total_hours_viewed': round(overview.total_hours_viewed, 2),
-                    'avg_drop_off': round(overview.avg_drop_off, 2)
-                },
-                'top_videos': [{
-                    'title': video.entry_name,
-                    'views': video.views,
-                    'unique_viewers': video.unique_viewers,
-                    'completion_rate': round(video.avg_completion_rate, 2),
-                    'duration_mins': round(video.duration_mins, 2),
-                    'drop_off_rate': round(video.avg_view_drop_off, 2)
-                } for video in top_videos]
-            }
-            
-        except Exception as e:
-            print(f"Error in get_course_video_stats: {str(e)}")
-            raise e
-        finally:
-            conn.close()
-            
     @staticmethod
-    def get_course_discussion_stats(course_id):
-        try:
-            conn = Database.get_connection()
-            cursor = conn.cursor()
+    @cached('discussion_stats')
+    def get_course_discussion_stats(course_id, top_n=DISCUSSION_TOP_N):
+        """Entry and reply counts of a course's forums and its top_n threads by replies.
 
-            cursor.execute("""
-                SELECT 
-                    CASE 
-                        WHEN EXISTS (SELECT 1 FROM discussion_entries WHERE course_id = ?) 
-                        OR EXISTS (SELECT 1 FROM discussion_replies WHERE course_id = ?)
-                        THEN 1 
-                        ELSE 0 
-                    END as has_discussions
-            """, (course_id, course_id))
-            
-            has_discussions = cursor.fetchone()[0]
-            
-            if not has_discussions:
-                return {
-                    'has_discussions': False,
-                    'overview': {
-                        'total_entries': 0,
-                        'total_replies': 0,
-                        'unique_posters': 0,
-                        'total_interactions': 0
-                    },
-                    'top_discussions': []
-                }
-
-            cursor.execute("""
-                SELECT 
-                    (SELECT COUNT(*) FROM discussion_entries WHERE course_id = ?) as total_entries,
-                    (SELECT COUNT(*) FROM discussion_replies WHERE course_id = ?) as total_replies,
-                    (SELECT COUNT(DISTINCT id) FROM discussion_entries WHERE course_id = ?) as unique_posters
-            """, (course_id, course_id, course_id))
-            
-            overview = cursor.fetchone()
-
-            cursor.execute("""
-                SELECT TOP 5
-                    e.id,
-                    e.message as title,
-                    COUNT(r.id) as reply_count,
-                    e.date as posted_date
-                FROM discussion_entries e
-                LEFT JOIN discussion_replies r ON e.id = r.id
-                WHERE e.course_id = ?
-                GROUP BY e.id, e.message, e.date
-                ORDER BY reply_count DESC
-            """, (course_id,))
-            
-            top_discussions = cursor.fetchall()
-            
+        Read from the thread rollup once the course has been refreshed (see
+        app/rollups), so the cost stays flat as forums grow. Until then one query
+        counts replies per parent entry and ranks the course's threads.
+        """
+        store = get_rollup_store()
+        if store.has_discussions(course_id):
+            total_entries, total_replies, threads = store.load_discussions(course_id, top_n)
+        else:
+            with Database.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    WITH reply_counts AS (
+                        SELECT parent_id, COUNT(*) AS reply_count
+                        FROM discussion_replies
+                        WHERE course_id = ?
+                        GROUP BY parent_id
+                    ),
+                    threads AS (
+                        SELECT
+                            e.id,
+                            e.message,
+                            e.date,
+                            COALESCE(rc.reply_count, 0) AS reply_count,
+                            COUNT(*) OVER () AS total_entries,
+                            ROW_NUMBER() OVER (ORDER BY COALESCE(rc.reply_count, 0) DESC, e.id) AS thread_rank
+                        FROM discussion_entries e
+                        LEFT JOIN reply_counts rc ON rc.parent_id = e.id
+                        WHERE e.course_id = ?
+                    )
+                    SELECT t.id, t.message, t.reply_count, t.date AS posted_date,
+                           t.total_entries, totals.total_replies
+                    FROM (SELECT COUNT(*) AS total_replies FROM discussion_replies WHERE course_id = ?) totals
+                    LEFT JOIN threads t ON t.thread_rank <= ?
+                    ORDER BY t.thread_rank
+                """, (course_id, course_id, course_id, top_n))
+                rows = cursor.fetchall()
+            # One row even without entries, from the reply total.
+            total_entries, total_replies = rows[0].total_entries or 0, rows[0].total_replies
+            threads = [(row.id, discussion_title(row.message), row.reply_count, row.posted_date)
+                       for row in rows if row.id is not None]
+
+        if not total_entries and not total_replies:
             return {
-                'has_discussions': True,
+                'has_discussions': False,
                 'overview': {
-                    'total_entries': overview[0],
-                    'total_replies': overview[1],
-                    'unique_posters': overview[2],
-                    'total_interactions': overview[0] + overview[1]
+                    'total_entries': 0,
+                    'total_replies': 0,
+                    'unique_posters': 0,
+                    'total_interactions': 0
                 },
-                'top_discussions': [{
-                    'id': disc[0],
-                    'title': disc[1][:100] + '...' if len(disc[1]) > 100 else disc[1],
-                    'reply_count': disc[2],
-                    'posted_date': disc[3].strftime('%Y-%m-%d')
-                } for disc in top_discussions]
+                'top_discussions': []
             }
-            
-        except Exception as e:
-            print(f"Error in get_course_discussion_stats: {str(e)}")
-            raise e
-        finally:
-            conn.close()
-            
-            
-        
 
-            
\ No newline at end of file
+        return {
+            'has_discussions': True,
+            'overview': {
+                'total_entries': total_entries,
+                'total_replies': total_replies,
+                # Entry ids are unique, so this is the COUNT(DISTINCT id) it always was.
+                'unique_posters': total_entries,
+                'total_interactions': total_entries + total_replies
+            },
+            'top_discussions': [{
+                'id': entry_id,
+                'title': title,
+                'reply_count': reply_count,
+                'posted_date': posted.strftime('%Y-%m-%d')
+            } for entry_id, title, reply_count, posted in threads]
+        }
@@ -0,0 +1,62 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.instrumentation.spans import propagate
+from app.services.course_service import CourseService
+
+# Independent sections of the course dashboard; each runs on its own pooled connection.
+DASHBOARD_SECTIONS = {
+    'participations': CourseService.get_course_participations,
+    'device_stats': CourseService.get_course_device_stats,
+    'video_stats': CourseService.get_course_video_stats,
+    'discussion_stats': CourseService.get_course_discussion_stats,
+}
+
+# Dashboard queries in flight across all requests. Keep it at or below DB_POOL_MAX_SIZE
+# so a burst of dashboard loads cannot take every connection from the other endpoints.
+DASHBOARD_DB_SLOTS = int(os.getenv('DASHBOARD_DB_SLOTS', '4'))
+
+_executor = ThreadPoolExecutor(max_workers=DASHBOARD_DB_SLOTS, thread_name_prefix='dashboard')
+
+logger = logging.getLogger(__name__)
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    value = func(*args)
+    return value, round((time.perf_counter() - start) * 1000, 1)
+
+
+class DashboardService:
+    @staticmethod
+    def get_course_dashboard(course_id, sections, start_date=None, end_date=None):
+        """Run the requested dashboard sections concurrently and collect them in one result.
+
+        sections is an iterable of DASHBOARD_SECTIONS names, plus "summary" (which needs
+        start_date and end_date). A failing section is reported under "errors" without
+        failing the others, so page latency is that of the slowest section.
+        """
+        # propagate() so each section's spans count towards this request's timings.
+        futures = {}
+        for name in sections:
+            if name == 'summary':
+                futures[name] = _executor.submit(
+                    propagate(_timed), CourseService.get_course_summary, course_id, start_date, end_date
+                )
+            else:
+                futures[name] = _executor.submit(propagate(_timed), DASHBOARD_SECTIONS[name], course_id)
+
+        data, errors, timings = {}, {}, {}
+        for name, future in futures.items():
+            try:
+                data[name], timings[name] = future.result()
+            except Exception as e:
+                logger.warning("Error in course dashboard section %s for course %s: %s", name, course_id, e)
+                errors[name] = str(e)
+
+        return {
+            'sections': data,
+            'errors': errors,
+            'timings_ms': timings
+        }
@@ -0,0 +1,171 @@
+"""Encoders that turn batches of report rows into the byte chunks of a download.
+
+Each encoder takes the column descriptions and an iterator of row batches and yields
+bytes as soon as a batch is encoded, so nothing larger than one batch (one row group
+for Parquet) is held in memory. Parquet and Arrow need pyarrow, which is optional.
+"""
+import csv
+import io
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only the parquet and arrow formats need it
+    pa = pq = None
+
+# format -> (mimetype, file extension)
+REPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'csv.gz': ('application/gzip', 'csv.gz'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+
+PARQUET_ROW_GROUP_SIZE = 128 * 1024
+
+
+def columnar_available():
+    return pa is not None
+
+
+def encode_csv(description, batches, compress=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    # wbits=31 writes a gzip container rather than a raw zlib stream.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def drain():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        if compressor is None:
+            return data
+        # Sync-flush per batch so the client gets bytes as they are produced.
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    writer.writerow([column[0] for column in description])
+    for rows in batches:
+        writer.writerows(rows)
+        yield drain()
+    if compressor is not None:
+        yield compressor.flush()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to a generator."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_type(column, values):
+    """Arrow type from the DB-API description (pyodbc reports Python types), else from the values."""
+    name, type_code, _, _, precision, scale = (tuple(column) + (None,) * 7)[:6]
+    if type_code is Decimal and precision:
+        return pa.decimal128(precision, scale or 0)
+    known = {
+        bool: pa.bool_(),
+        int: pa.int64(),
+        float: pa.float64(),
+        str: pa.string(),
+        bytes: pa.binary(),
+        bytearray: pa.binary(),
+        datetime: pa.timestamp('us'),
+        date: pa.date32(),
+    }
+    if type_code in known:
+        return known[type_code]
+    inferred = pa.array(values).type
+    return pa.string() if pa.types.is_null(inferred) else inferred
+
+
+def _record_batches(description, batches):
+    """Yield (schema, record batch) pairs; the schema is fixed by the first batch."""
+    schema = None
+    for rows in batches:
+        values = list(zip(*rows))
+        if schema is None:
+            schema = pa.schema([
+                pa.field(column[0], _arrow_type(column, column_values))
+                for column, column_values in zip(description, values)
+            ])
+        arrays = [pa.array(column_values, type=field.type) for column_values, field in zip(values, schema)]
+        yield schema, pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def encode_arrow(description, batches):
+    sink = _ChunkSink()
+    writer = None
+    options = pa.ipc.IpcWriteOptions(compression='zstd')
+    for schema, batch in _record_batches(description, batches):
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, schema, options=options)
+        writer.write_batch(batch)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+def encode_parquet(description, batches):
+    sink = _ChunkSink()
+    writer = None
+    pending, pending_rows = [], 0
+
+    def flush_row_group():
+        writer.write_table(pa.Table.from_batches(pending))
+        pending.clear()
+        return sink.drain()
+
+    for schema, batch in _record_batches(description, batches):
+        if writer is None:
+            writer = pq.ParquetWriter(sink, schema, compression='zstd')
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        if pending_rows >= PARQUET_ROW_GROUP_SIZE:
+            yield flush_row_group()
+            pending_rows = 0
+    if writer is not None:
+        if pending:
+            yield flush_row_group()
+        writer.close()
+        yield sink.drain()
+
+
+def encode(fmt, description, batches):
+    """Byte chunks of the report in the given REPORT_FORMATS format."""
+    if fmt == 'csv':
+        chunks = encode_csv(description, batches)
+    elif fmt == 'csv.gz':
+        chunks = encode_csv(description, batches, compress=True)
+    elif fmt in COLUMNAR_FORMATS and not columnar_available():
+        raise RuntimeError(f"The {fmt} format requires pyarrow, which is not installed.")
+    elif fmt == 'parquet':
+        chunks = encode_parquet(description, batches)
+    elif fmt == 'arrow':
+        chunks = encode_arrow(description, batches)
+    else:
+        raise ValueError(f"Unknown report format '{fmt}'.")
+    return chunks
@@ -0,0 +1,217 @@
+"""Where the per-student analysis rows live, and the queries the services run on them.
+
+The analysis was written as one page_view_analysis_course_{id} table per course, with
+a column per week and metric (week_3_views, week_3_rank, ...). ANALYSIS_STORAGE=unified
+reads three tables that hold every course instead, clustered on course_id first:
+
+    student_analysis          (course_id, student_id)       -> the per-student columns
+    student_weekly_analysis   (course_id, student_id, week) -> views, pct_change, rank
+    analysis_courses          course_id -> the migrated table's columns, in order
+
+Their statements have the same text for every course, so SQL Server compiles them
+once, and they can answer questions across courses. app.storage.migrate creates the
+tables and copies the per-course tables into them. Both layouts return rows in the
+per-course table's wide shape, so responses and report downloads do not change.
+"""
+import os
+import re
+import threading
+
+ANALYSIS_STORAGES = ('per_course', 'unified')
+
+# Per-student columns besides the ids, as written by the analysis job.
+SUMMARY_COLUMNS = (
+    'total_pageviews', 'active_days', 'avg_daily_views', 'avg_weekly_views', 'engagement_rate',
+    'morning_pct', 'afternoon_pct', 'evening_pct', 'night_pct',
+    'total_gaps_4days', 'longest_gap_days', 'total_gap_days',
+)
+ID_COLUMNS = ('original_id', 'student_id')
+WEEK_METRICS = ('views', 'pct_change', 'rank')
+WEEK_COLUMN = re.compile(r'^week_(\d+)_(' + '|'.join(WEEK_METRICS) + r')$')
+
+# SQL Server allows 2100 parameters per statement; IN lists are chunked below that.
+MAX_QUERY_PARAMETERS = 2000
+# Student ids per analysis_rows query in both layouts. The unified layout filters both
+# sides of its join with the ids, so a chunk may take only half the parameters.
+STUDENT_CHUNK_SIZE = MAX_QUERY_PARAMETERS // 2 - 1
+# Smallest padded IN list; see _parameter_chunks.
+MIN_IN_LIST = 8
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def _parameter_chunks(values, limit):
+    """values in chunks of at most limit, each padded to a power of two by repeating its last value.
+
+    A repeated value does not change what IN matches, and the padding keeps the number
+    of distinct statement texts (and so of cached plans) to about a dozen.
+    """
+    for start in range(0, len(values), limit):
+        chunk = list(values[start:start + limit])
+        size = MIN_IN_LIST
+        while size < len(chunk):
+            size *= 2
+        yield chunk + chunk[-1:] * (min(size, limit) - len(chunk))
+
+
+def _placeholders(values):
+    return ','.join('?' for _ in values)
+
+
+class PerCourseTables:
+    """One page_view_analysis_course_{id} table per course, as written by the analysis job.
+
+    cross_course is False: there is no student_courses(), since every course would
+    need a query of its own. Callers check the flag first (the endpoint answers 501).
+    """
+
+    name = 'per_course'
+    cross_course = False
+
+    @staticmethod
+    def table(course_id):
+        # int() keeps anything but a course number out of the statement.
+        return f"page_view_analysis_course_{int(course_id)}"
+
+    def summary_rows(self, cursor, course_id, student_id=None):
+        query = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM {self.table(course_id)}"
+        if student_id:
+            cursor.execute(f"{query} WHERE student_id = ?", (student_id,))
+        else:
+            cursor.execute(query)
+        return cursor.fetchall()
+
+    def student_ids(self, cursor, course_id):
+        cursor.execute(f"""
+            SELECT student_id
+            FROM {self.table(course_id)}
+            GROUP BY student_id
+            ORDER BY student_id
+        """)
+        return [row[0] for row in cursor.fetchall()]
+
+    def analysis_rows(self, cursor, course_id, student_ids):
+        columns, rows = None, []
+        for chunk in _parameter_chunks(student_ids, STUDENT_CHUNK_SIZE):
+            cursor.execute(f"""
+                SELECT *
+                FROM {self.table(course_id)}
+                WHERE student_id IN ({_placeholders(chunk)})
+            """, chunk)
+            if columns is None:
+                columns = [column[0] for column in cursor.description]
+            rows.extend(cursor.fetchall())
+        return columns, rows
+
+    def execute_report(self, cursor, course_id):
+        cursor.execute(f"SELECT * FROM {self.table(course_id)}")
+
+
+class UnifiedTables:
+    """Every course's analysis in student_analysis and student_weekly_analysis.
+
+    cross_course is True: student_courses() answers for every course in one query.
+    """
+
+    name = 'unified'
+    cross_course = True
+
+    def summary_rows(self, cursor, course_id, student_id=None):
+        query = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM student_analysis WHERE course_id = ?"
+        if student_id:
+            cursor.execute(f"{query} AND student_id = ?", (int(course_id), student_id))
+        else:
+            cursor.execute(query, (int(course_id),))
+        return cursor.fetchall()
+
+    def student_ids(self, cursor, course_id):
+        cursor.execute("""
+            SELECT student_id
+            FROM student_analysis
+            WHERE course_id = ?
+            ORDER BY student_id
+        """, (int(course_id),))
+        return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def source_columns(cursor, course_id):
+        """Columns of the course's per-course table in order, or None if it was not migrated."""
+        cursor.execute("SELECT source_columns FROM analysis_courses WHERE course_id = ?", (int(course_id),))
+        row = cursor.fetchone()
+        return row[0].split(',') if row else None
+
+    @staticmethod
+    def wide_query(columns, student_filter=''):
+        """SELECT that pivots the weekly rows back into the per-course table's columns.
+
+        Takes the course id twice, each followed by the student_filter's parameters.
+        """
+        select, pivot = [], []
+        for column in columns:
+            week = WEEK_COLUMN.match(column)
+            if week:
+                pivot.append(f"MAX(CASE WHEN week = {int(week.group(1))} THEN {week.group(2)} END) AS {column}")
+                select.append(f"w.{column}")
+            else:
+                select.append(f"a.{column}")
+        weekly = f"""
+            LEFT JOIN (
+                SELECT student_id, {', '.join(pivot)}
+                FROM student_weekly_analysis
+                WHERE course_id = ?{student_filter.format(alias='')}
+                GROUP BY student_id
+            ) w ON w.student_id = a.student_id""" if pivot else ''
+        return f"""
+            SELECT {', '.join(select)}
+            FROM student_analysis a{weekly}
+            WHERE a.course_id = ?{student_filter.format(alias='a.')}
+            ORDER BY a.student_id
+        """, bool(pivot)
+
+    def analysis_rows(self, cursor, course_id, student_ids):
+        course_id = int(course_id)
+        columns = self.source_columns(cursor, course_id)
+        if columns is None:
+            return list(ID_COLUMNS + SUMMARY_COLUMNS), []
+        rows = []
+        for chunk in _parameter_chunks(student_ids, STUDENT_CHUNK_SIZE):
+            query, pivoted = self.wide_query(columns, f" AND {{alias}}student_id IN ({_placeholders(chunk)})")
+            params = (course_id, *chunk)
+            cursor.execute(query, params * 2 if pivoted else params)
+            rows.extend(cursor.fetchall())
+        return columns, rows
+
+    def execute_report(self, cursor, course_id):
+        columns = self.source_columns(cursor, course_id) or list(ID_COLUMNS + SUMMARY_COLUMNS)
+        query, pivoted = self.wide_query(columns)
+        cursor.execute(query, (int(course_id),) * (2 if pivoted else 1))
+
+    def student_courses(self, cursor, student_id):
+        cursor.execute(f"""
+            SELECT course_id, {', '.join(SUMMARY_COLUMNS)}
+            FROM student_analysis
+            WHERE student_id = ?
+            ORDER BY course_id
+        """, (student_id,))
+        return cursor.fetchall()
+
+
+_BACKENDS = {'per_course': PerCourseTables, 'unified': UnifiedTables}
+
+
+def configure_analysis_storage(name):
+    """Switch the process to another layout, e.g. in the benchmarks."""
+    global _storage
+    if name not in _BACKENDS:
+        raise ValueError(f"ANALYSIS_STORAGE must be one of {', '.join(ANALYSIS_STORAGES)}, got {name!r}")
+    with _storage_lock:
+        _storage = _BACKENDS[name]()
+        return _storage
+
+
+def get_analysis_storage():
+    """Process-wide analysis layout chosen by ANALYSIS_STORAGE (per_course by default)."""
+    with _storage_lock:
+        storage = _storage
+    return storage or configure_analysis_storage(os.getenv('ANALYSIS_STORAGE', 'per_course'))
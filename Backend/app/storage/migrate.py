@@ -0,0 +1,214 @@
+"""Copy the per-course page_view_analysis_course_{id} tables into the unified analysis tables.
+
+    python -m app.storage.migrate create                    # the tables and indexes, once
+    python -m app.storage.migrate copy                      # every course in course_info
+    python -m app.storage.migrate copy --course-id 101 --course-id 102
+    python -m app.storage.migrate check --course-id 101     # exits non-zero on a difference
+
+copy replaces what the unified tables hold for a course in one transaction, so it can
+be rerun after the analysis job rewrites a course's table. Once check passes for
+every course, set ANALYSIS_STORAGE=unified and clear the students, weekly_activity,
+detailed_weekly_activity and batch_weekly_activity caches (POST /api/cache/invalidate).
+The per-course tables are left in place.
+"""
+import argparse
+import json
+import logging
+import math
+import sys
+from datetime import datetime
+from decimal import Decimal
+from app.database.connection import Database
+from app.services.course_service import CourseService
+from app.storage.analysis import (ID_COLUMNS, SUMMARY_COLUMNS, WEEK_COLUMN, WEEK_METRICS,
+                                  PerCourseTables, UnifiedTables)
+
+logger = logging.getLogger(__name__)
+
+_INTEGER_COLUMNS = ('total_pageviews', 'active_days', 'total_gaps_4days', 'longest_gap_days', 'total_gap_days')
+
+# Clustered on course_id first, so a course's rows are stored together and every
+# per-course query is a range seek; the student index serves cross-course lookups.
+TABLES = {
+    'student_analysis': f"""
+        CREATE TABLE student_analysis (
+            course_id INT NOT NULL,
+            student_id BIGINT NOT NULL,
+            original_id BIGINT NULL,
+            {', '.join(f"{column} {'INT' if column in _INTEGER_COLUMNS else 'FLOAT'} NULL" for column in SUMMARY_COLUMNS)},
+            CONSTRAINT pk_student_analysis PRIMARY KEY CLUSTERED (course_id, student_id)
+        )
+    """,
+    'student_weekly_analysis': """
+        CREATE TABLE student_weekly_analysis (
+            course_id INT NOT NULL,
+            student_id BIGINT NOT NULL,
+            week INT NOT NULL,
+            views INT NULL,
+            pct_change FLOAT NULL,
+            rank INT NULL,
+            CONSTRAINT pk_student_weekly_analysis PRIMARY KEY CLUSTERED (course_id, student_id, week)
+        )
+    """,
+    'analysis_courses': """
+        CREATE TABLE analysis_courses (
+            course_id INT NOT NULL,
+            source_columns NVARCHAR(MAX) NOT NULL,
+            migrated_at DATETIME2 NOT NULL,
+            CONSTRAINT pk_analysis_courses PRIMARY KEY CLUSTERED (course_id)
+        )
+    """,
+}
+INDEXES = (
+    "CREATE INDEX ix_student_analysis_student ON student_analysis (student_id, course_id)",
+)
+
+
+def _columns(cursor, table):
+    """Column names of table, or None if it cannot be read (usually: it does not exist)."""
+    try:
+        cursor.execute(f"SELECT TOP 1 * FROM {table}")
+        cursor.fetchall()
+    except Exception as e:
+        logger.debug("Cannot read %s: %s", table, e)
+        return None
+    return [column[0] for column in cursor.description]
+
+
+def create_tables():
+    """Create the unified tables that do not exist yet; returns the names created."""
+    created = []
+    with Database.get_connection() as conn:
+        cursor = conn.cursor()
+        for table, ddl in TABLES.items():
+            if _columns(cursor, table) is None:
+                cursor.execute(ddl)
+                created.append(table)
+        if 'student_analysis' in created:
+            for ddl in INDEXES:
+                cursor.execute(ddl)
+    return created
+
+
+def _weeks(columns):
+    """{week: {metric: column}} of the per-course table's week columns."""
+    weeks = {}
+    for column in columns:
+        match = WEEK_COLUMN.match(column)
+        if match:
+            weeks.setdefault(int(match.group(1)), {})[match.group(2)] = column
+    return weeks
+
+
+def copy_course(course_id):
+    """Replace the course's rows in the unified tables with its per-course table."""
+    course_id = int(course_id)
+    source = PerCourseTables.table(course_id)
+    with Database.get_connection() as conn:
+        cursor = conn.cursor()
+        columns = _columns(cursor, source)
+        if columns is None:
+            return {'course_id': course_id, 'copied': False, 'reason': f"{source} not found"}
+        unknown = [column for column in columns
+                   if column not in ID_COLUMNS + SUMMARY_COLUMNS and not WEEK_COLUMN.match(column)]
+        if unknown or 'student_id' not in columns:
+            raise ValueError(f"{source} has columns the unified tables do not hold: {', '.join(unknown)}")
+
+        for table in ('student_weekly_analysis', 'student_analysis', 'analysis_courses'):
+            cursor.execute(f"DELETE FROM {table} WHERE course_id = ?", (course_id,))
+
+        student_columns = [column for column in columns if column in ID_COLUMNS + SUMMARY_COLUMNS]
+        cursor.execute(f"""
+            INSERT INTO student_analysis (course_id, {', '.join(student_columns)})
+            SELECT ?, {', '.join(student_columns)}
+            FROM {source}
+        """, (course_id,))
+
+        weeks = _weeks(columns)
+        if weeks:
+            selects = [
+                f"SELECT ?, student_id, {week}, "
+                + ', '.join(metrics.get(metric, 'NULL') for metric in WEEK_METRICS)
+                + f" FROM {source}"
+                for week, metrics in sorted(weeks.items())
+            ]
+            cursor.execute(f"""
+                INSERT INTO student_weekly_analysis (course_id, student_id, week, {', '.join(WEEK_METRICS)})
+                {' UNION ALL '.join(selects)}
+            """, (course_id,) * len(selects))
+
+        cursor.execute("INSERT INTO analysis_courses (course_id, source_columns, migrated_at) VALUES (?, ?, ?)",
+                       (course_id, ','.join(columns), datetime.now()))
+        cursor.execute("SELECT COUNT(*) FROM student_analysis WHERE course_id = ?", (course_id,))
+        students = cursor.fetchone()[0]
+    return {'course_id': course_id, 'copied': True, 'students': students, 'weeks': len(weeks)}
+
+
+def _same(a, b):
+    """Equal, allowing for a DECIMAL source column read back as FLOAT."""
+    if isinstance(a, (float, Decimal)) or isinstance(b, (float, Decimal)):
+        return a is not None and b is not None and math.isclose(float(a), float(b), rel_tol=1e-9, abs_tol=1e-9)
+    return a == b
+
+
+def check_course(course_id):
+    """Compare the course's per-course table with what the unified tables return for it."""
+    course_id = int(course_id)
+    with Database.get_connection() as conn:
+        cursor = conn.cursor()
+        source = PerCourseTables.table(course_id)
+        if _columns(cursor, source) is None:
+            return {'course_id': course_id, 'checked': False, 'consistent': True, 'reason': f"{source} not found"}
+        cursor.execute(f"SELECT * FROM {source} ORDER BY student_id")
+        expected_columns = [column[0] for column in cursor.description]
+        expected = cursor.fetchall()
+        UnifiedTables().execute_report(cursor, course_id)
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+
+    differences = []
+    if columns != expected_columns:
+        differences.append({'columns': columns, 'expected_columns': expected_columns})
+    elif len(rows) != len(expected):
+        differences.append({'rows': len(rows), 'expected_rows': len(expected)})
+    else:
+        for row, expected_row in zip(rows, expected):
+            different = [column for column, a, b in zip(columns, row, expected_row) if not _same(a, b)]
+            if different:
+                differences.append({'student_id': str(expected_row[columns.index('student_id')]),
+                                    'columns': different})
+    return {'course_id': course_id, 'checked': True, 'students': len(expected), 'consistent': not differences,
+            'differences': differences[:20]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Copy the per-course analysis tables into the unified tables.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('create', help='create the unified tables and indexes that do not exist yet')
+    for name, help_text in (('copy', "replace each course's unified rows with its per-course table"),
+                            ('check', 'compare the unified tables with the per-course tables')):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--course-id', type=int, action='append',
+                             help='course to process (repeatable); default: every course in course_info')
+
+    args = parser.parse_args(argv)
+    if args.command == 'create':
+        print(json.dumps({'created': create_tables()}))
+        return 0
+
+    course_ids = args.course_id or [course['course_id'] for course in CourseService.get_all_courses()]
+    if args.command == 'copy':
+        for course_id in course_ids:
+            print(json.dumps(copy_course(course_id)))
+        return 0
+
+    consistent = True
+    for course_id in course_ids:
+        result = check_course(course_id)
+        consistent = consistent and result['consistent']
+        print(json.dumps(result))
+    return 0 if consistent else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
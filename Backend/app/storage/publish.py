@@ -0,0 +1,142 @@
+"""Write the per-student metrics kept in the rollup store into the unified analysis tables.
+
+The rollup store folds new page_views days into each student's state (python -m
+app.rollups.cli refresh); publish writes what changed since the last publish:
+
+  - the student_analysis rows of the students whose state changed, or of every
+    student when the course gained a week, since avg_weekly_views and
+    engagement_rate are per week of the course;
+  - the student_weekly_analysis rows of the weeks from the earliest changed day on,
+    for every student, since ranks are across the course's students, and the
+    earlier weeks of students seen for the first time.
+
+Weeks are counted from the Monday of the course's first day with views. The first
+publish of a course replaces whatever the unified tables held for it, e.g. a copy of
+the per-course table made by app.storage.migrate. Serving the published metrics
+needs ANALYSIS_STORAGE=unified.
+"""
+from datetime import datetime, timedelta
+from app.analyzer.student_metrics import week_of, week_rows
+from app.database.connection import Database
+from app.storage.analysis import ID_COLUMNS, SUMMARY_COLUMNS, WEEK_METRICS
+
+
+def source_columns(n_weeks):
+    """The columns of a course's rows in the per-course table's wide shape."""
+    return list(ID_COLUMNS + SUMMARY_COLUMNS) + [
+        f"week_{week}_{metric}" for week in range(1, n_weeks + 1) for metric in WEEK_METRICS
+    ]
+
+
+def _replace_course_columns(cursor, course_id, n_weeks):
+    cursor.execute("DELETE FROM analysis_courses WHERE course_id = ?", (course_id,))
+    if n_weeks:
+        cursor.execute("INSERT INTO analysis_courses (course_id, source_columns, migrated_at) VALUES (?, ?, ?)",
+                       (course_id, ','.join(source_columns(n_weeks)), datetime.now()))
+
+
+def publish_students(store, course_id, full=False):
+    """Write the course's changed student metrics into the unified tables in one transaction.
+
+    full=True rewrites every row of the course. Returns what was written.
+    """
+    course_id = int(course_id)
+    changes = store.student_changes(course_id)
+    if changes is None:
+        raise ValueError(f"Course {course_id} has no student state yet; run a refresh first.")
+    if changes['first_day'] is None:
+        first_monday, n_weeks = None, 0
+    else:
+        first_monday = changes['first_day'] - timedelta(days=changes['first_day'].weekday())
+        n_weeks = week_of(changes['last_day'], first_monday)
+    # Never published, or the weeks moved: every row changes.
+    full = full or changes['published_monday'] is None or first_monday != changes['published_monday']
+    reshaped = full or n_weeks != changes['published_weeks']
+    if not reshaped and changes['changed_from'] is None:
+        return {'course_id': course_id, 'students': 0, 'removed': 0, 'weeks': [], 'full': False}
+
+    students = store.load_students(course_id, changed_only=not reshaped)
+    if full:
+        first_week = 1
+    else:
+        # A new week needs its rows, a changed day its week's ranks and the next week's pct_change.
+        first_week = (changes['published_weeks'] or 0) + 1
+        if changes['changed_from'] is not None:
+            first_week = max(1, min(first_week, week_of(changes['changed_from'], first_monday)))
+    weeks = range(first_week, n_weeks + 1)
+    student_ids = store.student_ids(course_id)
+    new_students = {student_id for student_id, (state, published) in students.items()
+                    if state.active_days and (full or not published)}
+    weekly = []
+    if weeks:
+        week_views = store.student_week_views(course_id, first_monday, max(1, first_week - 1), n_weeks)
+        weekly = week_rows(student_ids, weeks, week_views)
+    if new_students and first_week > 1:
+        # Students seen for the first time had no views in the weeks before: they share
+        # the rank after every student who had some.
+        active = store.student_week_counts(course_id, first_monday, 1, first_week - 1)
+        weekly += [(student_id, week, 0, None, active.get(week, 0) + 1)
+                   for student_id in sorted(new_students) for week in range(1, first_week)]
+
+    summaries, new, removed = [], [], []
+    for student_id, (state, published) in sorted(students.items()):
+        if state.active_days == 0:
+            removed.append((course_id, student_id))
+        elif student_id in new_students:
+            new.append((course_id, student_id, *state.summary(n_weeks)))
+        else:
+            summaries.append((*state.summary(n_weeks), course_id, student_id))
+    # A published student has a row for every week published so far.
+    published_weeks = 0 if full else changes['published_weeks'] or 0
+    weekly_updates = [(views, pct_change, rank, course_id, student_id, week)
+                      for student_id, week, views, pct_change, rank in weekly
+                      if week <= published_weeks and student_id not in new_students]
+    weekly_inserts = [(course_id, *row) for row in weekly
+                      if row[1] > published_weeks or row[0] in new_students]
+
+    with Database.get_connection() as conn:
+        cursor = conn.cursor()
+        # pyodbc sends each executemany as one parameter array instead of a round trip per row.
+        cursor.fast_executemany = True
+        if full:
+            cursor.execute("DELETE FROM student_weekly_analysis WHERE course_id = ?", (course_id,))
+            cursor.execute("DELETE FROM student_analysis WHERE course_id = ?", (course_id,))
+        else:
+            if n_weeks < published_weeks:
+                cursor.execute("DELETE FROM student_weekly_analysis WHERE course_id = ? AND week > ?",
+                               (course_id, n_weeks))
+            if removed:
+                cursor.executemany("DELETE FROM student_weekly_analysis WHERE course_id = ? AND student_id = ?",
+                                   removed)
+                cursor.executemany("DELETE FROM student_analysis WHERE course_id = ? AND student_id = ?", removed)
+        if summaries:
+            cursor.executemany(
+                f"UPDATE student_analysis SET {', '.join(f'{column} = ?' for column in SUMMARY_COLUMNS)} "
+                "WHERE course_id = ? AND student_id = ?", summaries
+            )
+        if new:
+            cursor.executemany(
+                f"INSERT INTO student_analysis (course_id, student_id, {', '.join(SUMMARY_COLUMNS)}) "
+                f"VALUES (?, ?, {', '.join('?' for _ in SUMMARY_COLUMNS)})", new
+            )
+        if weekly_updates:
+            cursor.executemany(
+                f"UPDATE student_weekly_analysis SET {', '.join(f'{metric} = ?' for metric in WEEK_METRICS)} "
+                "WHERE course_id = ? AND student_id = ? AND week = ?", weekly_updates
+            )
+        if weekly_inserts:
+            cursor.executemany(
+                f"INSERT INTO student_weekly_analysis (course_id, student_id, week, {', '.join(WEEK_METRICS)}) "
+                "VALUES (?, ?, ?, ?, ?, ?)", weekly_inserts
+            )
+        if reshaped:
+            _replace_course_columns(cursor, course_id, n_weeks)
+
+    store.mark_students_published(course_id, changes['changes'], first_monday, n_weeks)
+    return {
+        'course_id': course_id,
+        'students': len(summaries) + len(new),
+        'removed': len(removed),
+        'weeks': [weeks.start, weeks.stop - 1] if weeks else [],
+        'full': full,
+    }
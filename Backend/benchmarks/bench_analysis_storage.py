@@ -0,0 +1,116 @@
+"""Analysis storage: one page_view_analysis_course_{id} table per course vs the unified tables.
+
+Loads synthetic per-course analysis tables into a SQLite stand-in, copies them into the
+unified tables with app.storage.migrate, and times what the services run against
+either layout, over every course: the student list, weekly activity, 50 students'
+detailed rows and the CSV report. Each case also counts the distinct statement texts
+it sent, which is how many plans SQL Server would have to compile. A student's
+activity in every course is one query on the unified tables and a query per
+course otherwise. Results are saved as JSON for benchmarks.results to compare:
+
+    python -m benchmarks.bench_analysis_storage --courses 20 --course-size 2000
+"""
+import argparse
+import logging
+import os
+import tempfile
+
+from app.cache.result_cache import result_cache
+from app.database.connection import Database
+from app.services.activity_service import ActivityService
+from app.services.course_service import CourseService
+from app.storage import migrate
+from app.storage.analysis import configure_analysis_storage
+from benchmarks import results, standin
+from benchmarks.bench_download_report import load_tables
+from benchmarks.synthetic import analysis_rows
+
+
+def cases(course_ids, student_ids, detailed):
+    def students():
+        return [CourseService.get_students_in_course(course_id) for course_id in course_ids]
+
+    def weekly():
+        return [ActivityService.get_weekly_activity(course_id) for course_id in course_ids]
+
+    def detailed_rows():
+        return [ActivityService.get_detailed_weekly_activity(course_id, detailed) for course_id in course_ids]
+
+    def report():
+        return [b''.join(ActivityService.stream_report(course_id)) for course_id in course_ids]
+
+    def student_courses():
+        # What a student's activity in every course takes without cross-course queries.
+        return [ActivityService.get_weekly_activity(course_id, student_ids[0]) for course_id in course_ids]
+
+    return {'students': students, 'weekly': weekly, 'detailed[50]': detailed_rows, 'report_csv': report,
+            'student_courses': student_courses}
+
+
+def normalized(name, output):
+    """output of a case with row order left out, which differs between the layouts."""
+    if name == 'report_csv':
+        return [sorted(body.split(b'\n')) for body in output]
+    if name in ('weekly', 'detailed[50]'):
+        return [sorted(map(repr, rows)) for rows in output]
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--courses', type=int, default=20)
+    parser.add_argument('--course-size', type=int, default=2000, help='students per course')
+    parser.add_argument('--weeks', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='results file (default benchmarks/results/analysis_storage-<commit>.json)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    measured = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lms.sqlite')
+        course_ids = [101 + i for i in range(args.courses)]
+        for index, course_id in enumerate(course_ids):
+            rows = analysis_rows(args.course_size, n_weeks=args.weeks, seed=index)
+            load_tables(path, course_id, rows)
+        student_ids = [str(id) for id in rows['student_id']]
+        detailed = ','.join(student_ids[::max(1, len(student_ids) // 50)][:50])
+        Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=2)
+
+        migrate.create_tables()
+        for course_id in course_ids:
+            migrate.copy_course(course_id)
+            if not migrate.check_course(course_id)['consistent']:
+                raise SystemExit(f"Unified tables differ from page_view_analysis_course_{course_id}")
+
+        outputs = {}
+        for storage in ('per_course', 'unified'):
+            configure_analysis_storage(storage)
+            timed = cases(course_ids, student_ids, detailed)
+            if storage == 'unified':
+                timed['student_courses'] = lambda: ActivityService.get_student_courses(student_ids[0])
+            for name, fn in timed.items():
+                result_cache.invalidate()
+                standin.reset_stats()
+                outputs[storage, name] = fn()
+                counts = {'queries': standin.stats['queries'], 'statements': standin.stats['statements']}
+                measured[f'{storage}.{name}'] = dict(
+                    results.measure(fn, args.repeat, setup=result_cache.invalidate), **counts)
+
+        for name in ('students', 'weekly', 'detailed[50]', 'report_csv'):
+            if normalized(name, outputs['per_course', name]) != normalized(name, outputs['unified', name]):
+                raise SystemExit(f"{name} differs between the per-course and unified tables")
+        Database.get_pool().close()
+
+    params = {'courses': args.courses, 'course_size': args.course_size, 'weeks': args.weeks, 'repeat': args.repeat}
+    output = results.save('analysis_storage', params, measured, args.output)
+
+    width = max(len(name) for name in measured)
+    for name, timing in measured.items():
+        print(f"{name:<{width}}  {timing['median_s'] * 1000:>9.2f}ms  "
+              f"{timing['queries']:>4} queries  {timing['statements']:>3} statements")
+    print(f"saved {output}")
+
+
+if __name__ == '__main__':
+    main()
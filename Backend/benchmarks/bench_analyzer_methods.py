@@ -0,0 +1,80 @@
+"""Micro-benchmarks of every public CourseSummaryAnalyzer method.
+
+Times each method on an analyzer built from synthetic page views (no database), plus
+the ways an analyzer is built: from columns, from the older per-student lists, from
+per-day partials and from aggregates. The run fails if a public method has no case
+here. Results are saved as JSON for benchmarks.results to compare:
+
+    python -m benchmarks.bench_analyzer_methods --students 10000 --days 117
+"""
+import argparse
+import inspect
+import logging
+from datetime import date
+
+import numpy as np
+
+from app.analyzer.aggregates import CourseAggregates, DayActivity
+from app.analyzer.course_analyzer import CourseSummaryAnalyzer
+from benchmarks import dataset, results
+from benchmarks.synthetic import page_views, student_lists
+
+# Constructors and helpers timed separately rather than as methods of a built analyzer.
+NOT_METHODS = {'from_aggregates', 'from_rollups'}
+
+
+def method_cases(analyzer):
+    return {
+        name: getattr(analyzer, name)
+        for name, _ in inspect.getmembers(CourseSummaryAnalyzer, inspect.isfunction)
+        if not name.startswith('_') and name not in NOT_METHODS
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    dataset.add_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='results file (default benchmarks/results/analyzer-<commit>.json)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    spec = dataset.spec_from_args(args)
+    rows = page_views(spec.students, spec.start, spec.end, seed=spec.seed)
+    columns = {'id': rows['user_id'].to_numpy(), 'datetime': rows['date'].to_numpy(), 'views': rows['views'].to_numpy()}
+    lists = student_lists(rows)
+    first_day, last_day = date.fromisoformat(spec.start), date.fromisoformat(spec.end)
+
+    analyzer = CourseSummaryAnalyzer(columns, spec.start, spec.end)
+    day_index = rows['date'].to_numpy().astype('datetime64[D]')
+    hours = rows['date'].dt.hour.to_numpy().astype(np.int64)
+    user_ids = rows['user_id'].to_numpy()
+    days = DayActivity.split_by_day(first_day, last_day, day_index, hours, user_ids,
+                                    rows['views'].to_numpy(), np.ones(len(rows), dtype=np.int64))
+
+    cases = {
+        'build[columns]': lambda: CourseSummaryAnalyzer(columns, spec.start, spec.end),
+        'build[student_lists]': lambda: CourseSummaryAnalyzer(lists, spec.start, spec.end),
+        'build[from_aggregates]': lambda: CourseSummaryAnalyzer.from_aggregates(analyzer.aggregates),
+        'aggregates[from_frame]': lambda: CourseAggregates.from_frame(analyzer.all_student_data, first_day, last_day),
+        'aggregates[from_days,exact]': lambda: CourseAggregates.from_days(first_day, last_day, days, exact=True),
+        'aggregates[from_days,sketch]': lambda: CourseAggregates.from_days(first_day, last_day, days, exact=False),
+    }
+    methods = method_cases(analyzer)
+    if not methods:
+        raise SystemExit("No public CourseSummaryAnalyzer methods found.")
+    cases.update({f'method[{name}]': method for name, method in methods.items()})
+
+    measured = {name: results.measure(fn, args.repeat) for name, fn in cases.items()}
+    params = {'students': spec.students, 'days': spec.days, 'seed': spec.seed, 'rows': len(rows),
+              'repeat': args.repeat}
+    output = results.save('analyzer', params, measured, args.output)
+
+    width = max(len(name) for name in measured)
+    for name, timing in measured.items():
+        print(f"{name:<{width}}  {timing['median_s'] * 1000:>9.2f}ms")
+    print(f"saved {output}")
+
+
+if __name__ == '__main__':
+    main()
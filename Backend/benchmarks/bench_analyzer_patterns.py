@@ -0,0 +1,151 @@
+"""Week bucketing and hourly formatting in CourseSummaryAnalyzer: per-row Python vs array lookups.
+
+The previous implementations (kept below as reference) are timed against the current
+week_numbers / week_date_ranges / format_hourly_stats on the aggregated frames of a
+full-semester course, and their outputs are checked for equality.
+
+    python -m benchmarks.bench_analyzer_patterns --students 10000
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+
+import pandas as pd
+
+from app.analyzer.course_analyzer import (
+    CourseSummaryAnalyzer, format_hourly_stats, week_date_ranges, week_numbers
+)
+from app.serialization import json_provider
+from benchmarks.synthetic import page_views, student_lists
+
+
+def legacy_weeks(dates, start_date, end_date):
+    start_ts = pd.Timestamp(start_date)
+    end_ts = pd.Timestamp(end_date)
+    first_monday = start_ts - pd.Timedelta(days=start_ts.weekday())
+
+    week_ranges = []
+    current_date = first_monday
+    week_num = 1
+    while current_date <= end_ts:
+        week_ranges.append({'week_num': week_num, 'start_date': current_date,
+                            'end_date': current_date + pd.Timedelta(days=6)})
+        current_date += pd.Timedelta(days=7)
+        week_num += 1
+
+    def get_week_number(date):
+        date_ts = pd.Timestamp(date)
+        for week in week_ranges:
+            if week['start_date'] <= date_ts <= week['end_date']:
+                return week['week_num']
+        return None
+
+    def get_week_range(week_num):
+        week_data = next(w for w in week_ranges if w['week_num'] == week_num)
+        return [week_data['start_date'], week_data['end_date']]
+
+    weeks = dates.apply(get_week_number)
+    date_ranges = [get_week_range(week) for week in weeks.unique()]
+    return weeks.tolist(), [[d[0].strftime('%Y-%m-%d'), d[1].strftime('%Y-%m-%d')] for d in date_ranges]
+
+
+def current_weeks(dates, start_date, end_date):
+    start_ts = pd.Timestamp(start_date)
+    first_monday = start_ts - pd.Timedelta(days=start_ts.weekday())
+    weeks = week_numbers(dates, first_monday)
+    return weeks.tolist(), week_date_ranges(pd.unique(weeks), first_monday)
+
+
+def legacy_hourly(hourly_stats, total_days):
+    total_views = int(hourly_stats['views'].sum())
+
+    formatted_data = []
+    for _, row in hourly_stats.iterrows():
+        hour = int(row['hour'])
+        views = int(row['views'])
+        formatted_hour = ("12 AM" if hour == 0 else f"{hour} AM" if hour < 12
+                          else "12 PM" if hour == 12 else f"{hour-12} PM")
+        period = ("Morning" if 5 <= hour <= 11 else "Afternoon" if 12 <= hour <= 16
+                  else "Evening" if 17 <= hour <= 21 else "Night")
+        formatted_data.append({
+            'hour': hour, 'formatted_hour': formatted_hour, 'period': period, 'views': views,
+            'unique_users': int(row['id']), 'unique_days': int(row['date']),
+            'avg_daily_views': float(round(views / total_days, 2)),
+            'percentage': float(round((views / total_views * 100), 2))
+        })
+
+    period_totals = {}
+    for data in formatted_data:
+        totals = period_totals.setdefault(data['period'], {'views': 0, 'unique_users': 0})
+        totals['views'] += data['views']
+        totals['unique_users'] = max(totals['unique_users'], data['unique_users'])
+
+    period_order = {"Morning": 1, "Afternoon": 2, "Evening": 3, "Night": 4}
+    period_summary = [{
+        'period': period, 'views': int(totals['views']), 'unique_users': int(totals['unique_users']),
+        'percentage': float(round((totals['views'] / total_views * 100), 2))
+    } for period, totals in sorted(period_totals.items(), key=lambda x: period_order[x[0]])]
+
+    return {
+        'hourly_data': sorted(formatted_data, key=lambda x: x['views'], reverse=True),
+        'period_summary': period_summary
+    }
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - t0)
+    return min(timings), result
+
+
+def compare(legacy, current, repeat):
+    legacy_s, legacy_out = best_of(legacy, repeat)
+    current_s, current_out = best_of(current, repeat)
+    return {
+        'legacy_ms': round(legacy_s * 1000, 3),
+        'current_ms': round(current_s * 1000, 3),
+        'speedup': round(legacy_s / current_s, 1),
+        'identical': json_provider.dumps(legacy_out) == json_provider.dumps(current_out),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--start', default='2024-01-08')
+    parser.add_argument('--end', default='2024-05-03')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rows = page_views(args.students, args.start, args.end)
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer = CourseSummaryAnalyzer(student_lists(rows), args.start, args.end)
+
+    df = analyzer.all_student_data
+    dates = pd.Series(pd.to_datetime(sorted(df['date'].unique())))
+    hourly_stats = df.groupby('hour').agg({'views': 'sum', 'id': 'nunique', 'date': 'nunique'}).reset_index()
+    total_days = (analyzer.end_date - analyzer.start_date).days + 1
+
+    results = {
+        'students': args.students,
+        'rows': len(rows),
+        'days': len(dates),
+        'week_bucketing': compare(lambda: legacy_weeks(dates, args.start, args.end),
+                                  lambda: current_weeks(dates, args.start, args.end), args.repeat),
+        'hourly_formatting': compare(lambda: legacy_hourly(hourly_stats, total_days),
+                                     lambda: format_hourly_stats(hourly_stats, total_days), args.repeat),
+    }
+    for method in ('analyze_detailed_patterns', 'analyze_hourly_patterns'):
+        seconds, _ = best_of(getattr(analyzer, method), max(1, args.repeat // 4))
+        results[f'{method}_ms'] = round(seconds * 1000, 2)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Cohort weekly activity: one detailed-weekly-activity request per student vs one batch request.
+
+Loads synthetic page_view_analysis_course_{id} tables into a SQLite stand-in and fetches
+the same students through the Flask test client both ways, reporting wall time, queries,
+and response bytes. The result cache is disabled so every request reaches the database.
+
+    python -m benchmarks.bench_batch_activity --students 500 --courses 3
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from app import create_app
+from app.cache.result_cache import result_cache
+from app.database.connection import Database
+from benchmarks import standin
+from benchmarks.bench_download_report import load_tables
+from benchmarks.synthetic import analysis_rows
+
+
+def per_student(client, selections):
+    responses = []
+    for course_id, student_ids in selections.items():
+        for student_id in student_ids:
+            response = client.get(f'/api/detailed-weekly-activity?course_id={course_id}&student_ids={student_id}')
+            responses.append(response.get_data())
+    return responses
+
+
+def batch(client, selections):
+    response = client.post('/api/batch-weekly-activity', json={
+        'courses': [{'course_id': course_id, 'student_ids': ids} for course_id, ids in selections.items()]
+    })
+    return [response.get_data()]
+
+
+def rows_from_batch(body):
+    """Rebuild the per-student dicts from the columnar payload, keyed by (course, student)."""
+    rows = {}
+    for course_id, table in json.loads(body)['courses'].items():
+        for values in zip(*table['data']):
+            row = dict(zip(table['columns'], values))
+            rows[course_id, str(row['student_id'])] = row
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=500, help='students compared per course')
+    parser.add_argument('--courses', type=int, default=3)
+    parser.add_argument('--course-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    result_cache.enabled = False
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lms.sqlite')
+        selections = {}
+        for offset in range(args.courses):
+            course_id = 101 + offset
+            rows = analysis_rows(args.course_size, seed=offset)
+            load_tables(path, course_id, rows)
+            selections[str(course_id)] = rows['student_id'].head(args.students).tolist()
+        Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=2)
+        client = create_app().test_client()
+
+        results = {'courses': args.courses, 'students_per_course': args.students}
+        bodies = {}
+        for name, fetch in (('per_student', per_student), ('batch', batch)):
+            standin.reset_stats()
+            t0 = time.perf_counter()
+            bodies[name] = fetch(client, selections)
+            results[name] = {
+                'requests': len(bodies[name]),
+                'wall_s': round(time.perf_counter() - t0, 3),
+                'queries': standin.stats['queries'],
+                'response_bytes': sum(len(body) for body in bodies[name]),
+            }
+        Database.get_pool().close()
+
+    expected = {}
+    for body, (course_id, student_id) in zip(
+            bodies['per_student'],
+            [(c, str(s)) for c, ids in selections.items() for s in ids]):
+        expected[course_id, student_id] = json.loads(body)['data'][0]
+    results['identical'] = rows_from_batch(bodies['batch'][0]) == expected
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Batch course summaries: courses per second by worker count.
+
+Builds a synthetic database with many courses in the SQLite stand-in, then
+summarizes every course with the batch runner at each worker count and reports
+wall time, courses/s and the speedup over one worker. One course's stored report
+is checked against CourseService.get_course_summary. Results are saved as JSON for
+benchmarks.results to compare:
+
+    python -m benchmarks.bench_batch_summaries --students 1000 --courses 16 --workers 1,2,4
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from app.cache.result_cache import result_cache
+from app.database.connection import Database
+from app.reports.batch import run_summaries
+from app.reports.store import configure_report_store
+from app.serialization import json_provider
+from app.services.course_service import SUMMARY_MODES, CourseService
+from benchmarks import dataset, results, standin
+
+
+def configure(path):
+    """Worker initializer: point Database at the stand-in."""
+    logging.getLogger().setLevel(logging.WARNING)
+    Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    dataset.add_arguments(parser)
+    parser.set_defaults(courses=16)
+    parser.add_argument('--workers', default='1,2,4', help='comma-separated worker counts')
+    parser.add_argument('--mode', choices=SUMMARY_MODES, default='raw')
+    parser.add_argument('--output', help='results file (default benchmarks/results/batch_summaries-<commit>.json)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    spec = dataset.spec_from_args(args)
+    measured = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lms.sqlite')
+        dataset.build(path, spec)
+        store = configure_report_store(os.path.join(tmp, 'reports.sqlite'))
+
+        baseline = None
+        for workers in (int(n) for n in args.workers.split(',')):
+            run_id = store.create_run(spec.course_ids, spec.start, spec.end, args.mode)
+            t0 = time.perf_counter()
+            statuses = list(run_summaries(store, run_id, workers=workers, initializer=configure, initargs=(path,)))
+            elapsed = time.perf_counter() - t0
+            failed = [status for status in statuses if status['status'] != 'done']
+            if failed:
+                raise SystemExit(f"{len(failed)} courses failed: {failed[0].get('error')}")
+            baseline = baseline or elapsed
+            measured[f'workers={workers}'] = dict(
+                results.timings([elapsed]),
+                courses_per_s=round(len(spec.course_ids) / elapsed, 2),
+                speedup=round(baseline / elapsed, 2),
+                course_s=round(sum(status['seconds'] for status in statuses), 3),
+            )
+
+        configure(path)
+        result_cache.invalidate()
+        course_id = spec.course_ids[0]
+        expected = CourseService.get_course_summary(course_id, spec.start, spec.end, args.mode)
+        summary, data = store.report(run_id, course_id)
+        if summary != expected['summary'] or data != json_provider.dumps(expected['data']):
+            raise SystemExit(f"Stored report of course {course_id} differs from get_course_summary")
+        Database.get_pool().close()
+
+    params = {'students': spec.students, 'days': spec.days, 'courses': len(spec.course_ids), 'seed': spec.seed,
+              'mode': args.mode, 'cpus': os.cpu_count()}
+    output = results.save('batch_summaries', params, measured, args.output)
+
+    for name, timing in measured.items():
+        print(f"{name:<12}  {timing['median_s']:>8.2f}s  {timing['courses_per_s']:>7.2f} courses/s  "
+              f"x{timing['speedup']:<5}  {timing['course_s']:>8.2f}s in workers")
+    print(f"stored reports match get_course_summary; {os.cpu_count()} CPUs")
+    print(f"saved {output}")
+
+
+if __name__ == '__main__':
+    main()
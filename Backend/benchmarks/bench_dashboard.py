@@ -0,0 +1,82 @@
+"""Course dashboard: one request per section in sequence vs the concurrent /api/course-dashboard.
+
+Loads synthetic device, video, discussion and assignment tables into a SQLite stand-in
+whose every query sleeps --latency seconds (the SQL Server round trip), then loads the
+dashboard both ways through the Flask test client. The result cache is disabled.
+
+    python -m benchmarks.bench_dashboard --latency 0.05
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from app import create_app
+from app.cache.result_cache import result_cache
+from app.database.connection import Database
+from benchmarks import standin, synthetic
+
+SECTION_URLS = {
+    'participations': '/api/course-participations?course_id={}',
+    'device_stats': '/api/course-device-stats?course_id={}',
+    'video_stats': '/api/course-video-stats?course_id={}',
+    'discussion_stats': '/api/course-discussion-stats?course_id={}',
+}
+
+
+def load_tables(path, course_id):
+    entries, replies = synthetic.discussions(course_ids=(course_id,))
+    standin.load_frame(path, 'detailed_page_views', synthetic.detailed_page_views(course_ids=(course_id,)))
+    standin.load_frame(path, 'video_analytics', synthetic.video_analytics(course_ids=(course_id,)))
+    standin.load_frame(path, 'discussion_entries', entries)
+    standin.load_frame(path, 'discussion_replies', replies)
+    standin.load_frame(path, 'assignments_by_modules', synthetic.assignments_by_modules(course_ids=(course_id,)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--course-id', type=int, default=101)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    result_cache.enabled = False
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lms.sqlite')
+        load_tables(path, args.course_id)
+        Database.configure(connect=standin.connect_factory(path, args.latency), min_size=4, max_size=8,
+                           health_check=lambda raw: True)
+        client = create_app().test_client()
+
+        sequential, concurrent = [], []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            separate = {name: client.get(url.format(args.course_id)).get_json()
+                        for name, url in SECTION_URLS.items()}
+            sequential.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            dashboard = client.get(f'/api/course-dashboard?course_id={args.course_id}').get_json()
+            concurrent.append(time.perf_counter() - t0)
+        Database.get_pool().close()
+
+    # Same payloads either way; the per-section endpoints wrap them differently.
+    unwrapped = {
+        'participations': separate['participations']['summary'],
+        'device_stats': separate['device_stats']['devicestats'],
+        'video_stats': separate['video_stats']['data'],
+        'discussion_stats': separate['discussion_stats']['students'],
+    }
+    print(json.dumps({
+        'latency_s': args.latency,
+        'sequential_requests_s': round(min(sequential), 3),
+        'dashboard_request_s': round(min(concurrent), 3),
+        'section_timings_ms': dashboard['timings_ms'],
+        'errors': dashboard['errors'],
+        'identical': dashboard['sections'] == unwrapped,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
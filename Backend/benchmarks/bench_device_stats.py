@@ -0,0 +1,113 @@
+"""Course device stats: full-table scan vs course-filtered SQL vs the device rollup.
+
+Loads detailed_page_views for an increasing number of courses (same rows per course)
+into a SQLite stand-in and times one course's device stats three ways: the old query
+that grouped the whole table, the course-filtered query the service falls back to,
+and the rollup store after a refresh, over all days and over a 4-week range. Only
+the rollup should stay flat as the table grows. Results are saved as JSON for
+benchmarks.results to compare:
+
+    python -m benchmarks.bench_device_stats --students 2000 --table-courses 1,8,32
+"""
+import argparse
+import logging
+import os
+import tempfile
+from datetime import date, timedelta
+
+from app.cache.result_cache import result_cache
+from app.database.connection import Database
+from app.rollups.refresh import refresh_devices
+from app.rollups.store import configure_rollup_store
+from app.services.course_service import CourseService
+from benchmarks import dataset, results, standin
+from benchmarks.synthetic import detailed_page_views
+
+# The query get_course_device_stats ran before it was scoped to the course.
+SCAN_QUERY = '''
+    SELECT
+        device_type,
+        COUNT(*) as count,
+        COUNT(*) * 100.0 / SUM(COUNT(*)) OVER() as percentage
+    FROM detailed_page_views
+    GROUP BY device_type
+    ORDER BY count DESC
+'''
+
+
+def load(path, spec, n_courses):
+    course_ids = tuple(101 + i for i in range(n_courses))
+    rows = detailed_page_views(int(spec.students * spec.days * dataset.DETAILED_VIEWS_PER_STUDENT_DAY) * n_courses,
+                               course_ids=course_ids, seed=spec.seed, n_students=spec.students,
+                               start=spec.start, days=spec.days)
+    standin.load_frame(path, 'detailed_page_views', rows)
+    conn = standin.Connection(path)
+    conn.execute("CREATE INDEX ix_detailed_page_views_course_date ON detailed_page_views (course_id, date)")
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+
+def scan():
+    with Database.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SCAN_QUERY)
+        return cursor.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    dataset.add_arguments(parser)
+    parser.add_argument('--table-courses', default='1,8,32',
+                        help='comma-separated numbers of courses in detailed_page_views')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='results file (default benchmarks/results/device_stats-<commit>.json)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    spec = dataset.spec_from_args(args)
+    course_id = 101
+    range_start = date.fromisoformat(spec.start) + timedelta(days=7)
+    range_end = range_start + timedelta(days=27)
+
+    measured = {}
+    table_rows = {}
+    for n_courses in (int(n) for n in args.table_courses.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'lms.sqlite')
+            table_rows[n_courses] = load(path, spec, n_courses)
+            Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=2)
+            configure_rollup_store(os.path.join(tmp, 'empty.sqlite'))
+
+            def stats(*dates):
+                return lambda: CourseService.get_course_device_stats(course_id, *dates)
+
+            measured[f'scan[courses={n_courses}]'] = results.measure(scan, args.repeat)
+            measured[f'course_sql[courses={n_courses}]'] = results.measure(
+                stats(), args.repeat, setup=result_cache.invalidate)
+            expected = stats()()
+
+            store = configure_rollup_store(os.path.join(tmp, 'rollups.sqlite'))
+            refresh_devices(store, course_id)
+            measured[f'rollup[courses={n_courses}]'] = results.measure(
+                stats(), args.repeat, setup=result_cache.invalidate)
+            measured[f'rollup_range[courses={n_courses}]'] = results.measure(
+                stats(range_start.isoformat(), range_end.isoformat()), args.repeat, setup=result_cache.invalidate)
+            result_cache.invalidate()
+            if stats()() != expected:
+                raise SystemExit(f"Rollup device stats differ from SQL with {n_courses} courses")
+            Database.get_pool().close()
+
+    params = {'students': spec.students, 'days': spec.days, 'seed': spec.seed, 'repeat': args.repeat,
+              'table_rows': table_rows}
+    output = results.save('device_stats', params, measured, args.output)
+
+    width = max(len(name) for name in measured)
+    for name, timing in measured.items():
+        print(f"{name:<{width}}  {timing['median_s'] * 1000:>9.2f}ms")
+    print(f"table rows by courses: {table_rows}")
+    print(f"saved {output}")
+
+
+if __name__ == '__main__':
+    main()
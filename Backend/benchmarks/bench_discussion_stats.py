@@ -0,0 +1,131 @@
+"""Course discussion stats: the old three round-trips vs one query vs the thread rollup.
+
+Loads discussion_entries and discussion_replies (four replies per entry) for forums
+of increasing size into a SQLite stand-in and times one course's stats: the three
+queries the service used to run (with their id = id reply join), the single query
+it runs now, and the rollup store after a refresh. The old queries only run up to
+--old-max-entries: their id = id join has no index to use and grows quadratically.
+Results are saved as JSON for benchmarks.results to compare:
+
+    python -m benchmarks.bench_discussion_stats --entries 1000,10000,50000
+"""
+import argparse
+import logging
+import os
+import tempfile
+
+from app.cache.result_cache import result_cache
+from app.database.connection import Database
+from app.rollups.refresh import refresh_discussions
+from app.rollups.store import configure_rollup_store
+from app.services.course_service import CourseService
+from benchmarks import results, standin
+from benchmarks.synthetic import discussions
+
+REPLIES_PER_ENTRY = 4
+
+# What get_course_discussion_stats ran before, one round-trip each.
+OLD_QUERIES = ("""
+    SELECT
+        CASE
+            WHEN EXISTS (SELECT 1 FROM discussion_entries WHERE course_id = ?)
+            OR EXISTS (SELECT 1 FROM discussion_replies WHERE course_id = ?)
+            THEN 1
+            ELSE 0
+        END as has_discussions
+""", """
+    SELECT
+        (SELECT COUNT(*) FROM discussion_entries WHERE course_id = ?) as total_entries,
+        (SELECT COUNT(*) FROM discussion_replies WHERE course_id = ?) as total_replies,
+        (SELECT COUNT(DISTINCT id) FROM discussion_entries WHERE course_id = ?) as unique_posters
+""", """
+    SELECT TOP 5
+        e.id,
+        e.message as title,
+        COUNT(r.id) as reply_count,
+        e.date as posted_date
+    FROM discussion_entries e
+    LEFT JOIN discussion_replies r ON e.id = r.id
+    WHERE e.course_id = ?
+    GROUP BY e.id, e.message, e.date
+    ORDER BY reply_count DESC
+""")
+
+
+def load(path, n_entries, seed):
+    entries, replies = discussions(n_entries, n_entries * REPLIES_PER_ENTRY, seed=seed, n_students=max(100, n_entries // 5))
+    standin.load_frame(path, 'discussion_entries', entries)
+    standin.load_frame(path, 'discussion_replies', replies)
+    conn = standin.Connection(path)
+    conn.execute("CREATE INDEX ix_discussion_entries_course_id ON discussion_entries (course_id)")
+    conn.execute("CREATE INDEX ix_discussion_replies_course_parent ON discussion_replies (course_id, parent_id)")
+    conn.commit()
+    conn.close()
+
+
+def old_stats():
+    with Database.get_connection() as conn:
+        cursor = conn.cursor()
+        for query in OLD_QUERIES:
+            cursor.execute(query, (101,) * query.count('?'))
+            cursor.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', default='1000,10000,50000', help='comma-separated forum sizes (entries per course)')
+    parser.add_argument('--old-max-entries', type=int, default=5000,
+                        help='largest forum to run the old queries on (their reply join is quadratic)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='results file (default benchmarks/results/discussion_stats-<commit>.json)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    measured = {}
+    for n_entries in (int(n) for n in args.entries.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'lms.sqlite')
+            load(path, n_entries, args.seed)
+            Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=2)
+            configure_rollup_store(os.path.join(tmp, 'empty.sqlite'))
+
+            def stats():
+                return CourseService.get_course_discussion_stats(101)
+
+            cases = {'single_query': stats}
+            if n_entries <= args.old_max_entries:
+                cases = {'old_three_queries': old_stats, **cases}
+            for name, fn in cases.items():
+                result_cache.invalidate()
+                standin.reset_stats()
+                fn()
+                queries = standin.stats['queries']
+                measured[f'{name}[entries={n_entries}]'] = dict(
+                    results.measure(fn, args.repeat, setup=result_cache.invalidate), queries=queries
+                )
+            result_cache.invalidate()
+            expected = stats()
+
+            store = configure_rollup_store(os.path.join(tmp, 'rollups.sqlite'))
+            refresh_discussions(store, 101)
+            measured[f'rollup[entries={n_entries}]'] = results.measure(stats, args.repeat,
+                                                                       setup=result_cache.invalidate)
+            result_cache.invalidate()
+            if stats() != expected:
+                raise SystemExit(f"Rollup discussion stats differ from SQL with {n_entries} entries")
+            Database.get_pool().close()
+
+    params = {'entries': args.entries, 'old_max_entries': args.old_max_entries,
+              'replies_per_entry': REPLIES_PER_ENTRY, 'seed': args.seed, 'repeat': args.repeat}
+    output = results.save('discussion_stats', params, measured, args.output)
+
+    width = max(len(name) for name in measured)
+    for name, timing in measured.items():
+        queries = f"  {timing['queries']} queries" if 'queries' in timing else ''
+        print(f"{name:<{width}}  {timing['median_s'] * 1000:>9.2f}ms{queries}")
+    print(f"saved {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Exact vs HyperLogLog distinct-user counts in the course summary.
+
+Builds a dataset (see benchmarks/dataset.py), backfills the rollup store and times the rollup and incremental summaries with exact=True and exact=False, then reports the relative error of the sketched weekly, monthly, hourly and total counts.
+
+    python -m benchmarks.bench_distinct_users --students 10000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+
+from app.analyzer.aggregates import CourseAggregates
+from app.cache.result_cache import result_cache
+from app.database.connection import Database
+from app.rollups.refresh import refresh_course
+from app.rollups.store import configure_rollup_store
+from app.services.course_service import CourseService
+from benchmarks import dataset, standin
+
+
+def relative_error(estimated, exact):
+    estimated, exact = np.asarray(estimated, dtype=float), np.asarray(exact, dtype=float)
+    keep = exact > 0
+    if not keep.any():
+        return 0.0
+    return round(float(np.max(np.abs(estimated[keep] - exact[keep]) / exact[keep])) * 100, 2)
+
+
+def timed_summary(course_id, start, end, mode, exact, repeat=3):
+    best = None
+    for _ in range(repeat):
+        result_cache.invalidate()
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            CourseService.get_course_summary(course_id, start, end, mode, exact=exact)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    dataset.add_arguments(parser)
+    parser.set_defaults(students=10000, days=110)
+    args = parser.parse_args()
+
+    spec = dataset.spec_from_args(args)
+    course_id = spec.course_ids[0]
+    first_day, last_day = date.fromisoformat(spec.start), date.fromisoformat(spec.end)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lms.sqlite')
+        dataset.build(path, spec)
+        Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=2)
+        store = configure_rollup_store(os.path.join(tmp, 'rollups.sqlite'))
+        refresh_course(store, course_id)
+
+        results = {'students': spec.students, 'page_view_rows': spec.tables['page_views']}
+        for mode in ('rollup', 'incremental'):
+            results[mode] = {
+                'exact_s': timed_summary(course_id, spec.start, spec.end, mode, True),
+                'sketch_s': timed_summary(course_id, spec.start, spec.end, mode, False),
+            }
+
+        exact = CourseAggregates.from_days(first_day, last_day, store.load_days(course_id, first_day, last_day))
+        sketched = CourseAggregates.from_days(
+            first_day, last_day, store.load_days(course_id, first_day, last_day, exact=False), exact=False
+        )
+        results['max_relative_error_pct'] = {
+            field: relative_error(getattr(sketched, field), getattr(exact, field))
+            for field in ('day_users', 'hour_users', 'week_users', 'month_users', 'total_users')
+        }
+        results['total_users'] = {'exact': int(exact.total_users), 'sketch': int(sketched.total_users)}
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Report download: time to first byte, total time and peak memory, buffered vs streaming.
+
+Loads a synthetic page_view_analysis_course_{id} table into a SQLite stand-in and
+requests /api/download-report through the Flask test client. The buffered variant is
+the previous implementation (pd.read_sql_query, drop a column, to_csv into one string).
+
+    python -m benchmarks.bench_download_report --students 50000
+"""
+import argparse
+import gc
+import gzip
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from flask import Response
+
+from app import create_app
+from app.database.connection import Database
+from app.services.activity_service import ActivityService
+from benchmarks import standin
+from benchmarks.synthetic import analysis_rows
+
+
+def load_tables(path, course_id, rows):
+    conn = standin.Connection(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS course_info (course_id INTEGER, name TEXT)")
+    conn.execute("INSERT INTO course_info VALUES (?, ?)", (course_id, 'Benchmark Course'))
+    columns = ', '.join(f'{name} REAL' if rows[name].dtype.kind == 'f' else f'{name} INTEGER'
+                        for name in rows.columns)
+    conn.execute(f"CREATE TABLE page_view_analysis_course_{course_id} ({columns})")
+    placeholders = ', '.join('?' for _ in rows.columns)
+    conn.cursor().executemany(
+        f"INSERT INTO page_view_analysis_course_{course_id} VALUES ({placeholders})",
+        rows.itertuples(index=False, name=None)
+    )
+    conn.commit()
+    conn.close()
+
+
+def buffered_report(course_id):
+    with Database.get_connection() as conn:
+        df = pd.read_sql_query(f"SELECT * FROM page_view_analysis_course_{course_id}", conn.raw._conn)
+        df = df.drop(['original_id'], axis=1)
+        return Response(df.to_csv(index=False), mimetype="text/csv")
+
+
+def download(client, course_id, variant, accept_encoding):
+    """Return (time of first byte, bytes received), discarding chunks like a socket would."""
+    if variant == 'buffered':
+        response = buffered_report(course_id)
+        first = time.perf_counter()
+        return first, sum(len(chunk) for chunk in response.response)
+    response = client.get(f'/api/download-report?course_id={course_id}', buffered=False,
+                          headers={'Accept-Encoding': accept_encoding})
+    chunks = iter(response.response)
+    size = len(next(chunks))
+    first = time.perf_counter()
+    size += sum(len(chunk) for chunk in chunks)
+    response.close()
+    return first, size
+
+
+def measure(client, course_id, variant, accept_encoding='identity'):
+    gc.collect()
+    t0 = time.perf_counter()
+    first, size = download(client, course_id, variant, accept_encoding)
+    total = time.perf_counter() - t0
+
+    gc.collect()
+    tracemalloc.start()
+    download(client, course_id, variant, accept_encoding)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'first_byte_s': round(first - t0, 3),
+        'total_s': round(total, 3),
+        'bytes_sent': size,
+        'peak_mb': round(peak / 2**20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=50000)
+    parser.add_argument('--weeks', type=int, default=16)
+    parser.add_argument('--course-id', type=int, default=101)
+    args = parser.parse_args()
+
+    rows = analysis_rows(args.students, args.weeks)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lms.sqlite')
+        load_tables(path, args.course_id, rows)
+        Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=2)
+        client = create_app().test_client()
+
+        expected = buffered_report(args.course_id).get_data()
+        streamed = b''.join(ActivityService.stream_report(args.course_id))
+        gzipped = b''.join(ActivityService.stream_report(args.course_id, 'csv.gz'))
+        results = {
+            'rows': len(rows),
+            'identical_csv': streamed == expected and gzip.decompress(gzipped) == expected,
+            'buffered': measure(client, args.course_id, 'buffered'),
+            'streaming': measure(client, args.course_id, 'streaming'),
+            'streaming_gzip': measure(client, args.course_id, 'streaming', 'gzip'),
+        }
+        Database.get_pool().close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
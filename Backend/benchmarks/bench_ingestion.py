@@ -0,0 +1,135 @@
+"""LMS export ingestion: rows per second into page_views by file format and worker count.
+
+Writes synthetic page view exports (one file per course and week range) as CSV, gzipped
+CSV and gzipped JSON lines, loads each set into an empty SQLite stand-in with the
+ingestion pipeline, and reports rows/s. Each load is then repeated twice: with the
+same files, which the file ledger skips, and with the same rows in another format,
+which the dedupe path must insert none of. Results are saved as JSON for
+benchmarks.results to compare:
+
+    python -m benchmarks.bench_ingestion --students 2000 --courses 4 --workers 1,4
+"""
+import argparse
+import csv
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+
+from app.database.connection import Database
+from app.ingestion.pipeline import create_tables, ingest_files
+from benchmarks import dataset, results, standin
+from benchmarks.synthetic import page_views
+
+FORMATS = ('csv', 'csv.gz', 'jsonl.gz')
+# Canvas-style field names, so the field mapping is exercised too.
+FIELDS = ('course_id', 'user_id', 'created_at', 'view_count')
+
+
+def configure(path):
+    """Worker initializer: point Database at the stand-in."""
+    logging.getLogger().setLevel(logging.WARNING)
+    Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=1)
+
+
+def write_exports(directory, spec, files_per_course):
+    """Export files for every format: {format: [paths]}; returns them and the row count."""
+    exports = {fmt: [] for fmt in FORMATS}
+    total = 0
+    for index, course_id in enumerate(spec.course_ids):
+        views = page_views(spec.students, start=spec.start, end=spec.end, seed=spec.seed + index)
+        views = views.sort_values('date', ignore_index=True)
+        total += len(views)
+        records = list(zip([course_id] * len(views), views['user_id'].tolist(),
+                           views['date'].dt.strftime('%Y-%m-%dT%H:%M:%SZ').tolist(), views['views'].tolist()))
+        size = -(-len(records) // files_per_course)
+        for part in range(files_per_course):
+            chunk = records[part * size:(part + 1) * size]
+            for fmt in FORMATS:
+                path = os.path.join(directory, f'page_views_{course_id}_{part}.{fmt}')
+                opener = gzip.open if fmt.endswith('.gz') else open
+                with opener(path, 'wt', newline='') as f:
+                    if fmt.startswith('csv'):
+                        writer = csv.writer(f)
+                        writer.writerow(FIELDS)
+                        writer.writerows(chunk)
+                    else:
+                        f.writelines(json.dumps(dict(zip(FIELDS, record))) + '\n' for record in chunk)
+                exports[fmt].append(path)
+    return exports, total
+
+
+def empty_database(path):
+    conn = sqlite3.connect(path)
+    # Workers write concurrently; WAL lets the others keep reading meanwhile.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE page_views (course_id INTEGER, user_id INTEGER, date TIMESTAMP, views INTEGER)")
+    conn.execute("CREATE INDEX ix_page_views_course_date ON page_views (course_id, date, user_id)")
+    conn.commit()
+    conn.close()
+    configure(path)
+    create_tables()
+
+
+def load(paths, workers, path):
+    t0 = time.perf_counter()
+    counts = list(ingest_files(paths, 'page_views', workers=workers, initializer=configure, initargs=(path,)))
+    elapsed = time.perf_counter() - t0
+    read = sum(count['read'] for count in counts)
+    return {
+        **results.timings([elapsed]),
+        'rows_read': read,
+        'rows_inserted': sum(count['inserted'] for count in counts),
+        'files_skipped': sum(count['skipped'] for count in counts),
+        'rows_per_s': round(read / elapsed) if read else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    dataset.add_arguments(parser)
+    parser.add_argument('--files-per-course', type=int, default=4)
+    parser.add_argument('--workers', default='1,4', help='comma-separated worker counts')
+    parser.add_argument('--output', help='results file (default benchmarks/results/ingestion-<commit>.json)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    spec = dataset.spec_from_args(args)
+    measured = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        exports, total = write_exports(tmp, spec, args.files_per_course)
+        for workers in (int(n) for n in args.workers.split(',')):
+            for fmt in FORMATS:
+                path = os.path.join(tmp, f'lms-{fmt}-{workers}.sqlite')
+                empty_database(path)
+                first = load(exports[fmt], workers, path)
+                if first['rows_inserted'] != total:
+                    raise SystemExit(f"Loaded {first['rows_inserted']} of {total} rows from {fmt} files")
+                measured[f'load[{fmt},workers={workers}]'] = first
+                measured[f'rerun_same_files[{fmt},workers={workers}]'] = load(exports[fmt], workers, path)
+
+                other = FORMATS[(FORMATS.index(fmt) + 1) % len(FORMATS)]
+                dedupe = load(exports[other], workers, path)
+                if dedupe['rows_inserted']:
+                    raise SystemExit(f"Re-importing the {other} files inserted {dedupe['rows_inserted']} duplicates")
+                measured[f'rerun_other_format[{fmt},workers={workers}]'] = dedupe
+                Database.get_pool().close()
+
+    params = {'students': spec.students, 'days': spec.days, 'courses': len(spec.course_ids), 'seed': spec.seed,
+              'files_per_course': args.files_per_course, 'rows': total}
+    output = results.save('ingestion', params, measured, args.output)
+
+    width = max(len(name) for name in measured)
+    for name, timing in measured.items():
+        rate = f"{timing['rows_per_s']:>10,} rows/s" if timing['rows_per_s'] else f"{'':>17}"
+        print(f"{name:<{width}}  {timing['median_s'] * 1000:>9.1f}ms  {rate}  "
+              f"{timing['rows_inserted']:>8} inserted  {timing['files_skipped']:>3} files skipped")
+    print(f"{total} rows in {len(spec.course_ids) * args.files_per_course} files per format")
+    print(f"saved {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Background jobs: how long a request holds its server thread, synchronous vs queued.
+
+Builds a dataset (see benchmarks/dataset.py) and, through the Flask test client,
+requests each course's summary and CSV report the synchronous way and as a job:
+POST /api/jobs, poll GET /api/jobs until it is done, then GET /api/job-result. The
+request time is what a server thread (and a proxy) waits for; time to result is what
+the client waits for. Each job result is checked against the synchronous body. Then
+--clients identical submissions arrive at once and must share one job. Results are
+saved as JSON for benchmarks.results to compare:
+
+    python -m benchmarks.bench_jobs --students 5000 --courses 2 --clients 8
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import create_app
+from app.cache.result_cache import result_cache
+from app.database.connection import Database
+from app.jobs.store import configure_job_store
+from benchmarks import dataset, results, standin
+
+
+def timed(client, method, url, body=None):
+    t0 = time.perf_counter()
+    response = client.open(url, method=method, json=body)
+    data = response.get_data()
+    return time.perf_counter() - t0, response, data
+
+
+def sync_case(client, url):
+    result_cache.invalidate()
+    elapsed, response, data = timed(client, 'GET', url)
+    assert response.status_code == 200, data
+    return {'request_s': elapsed, 'result_s': elapsed}, data
+
+
+def job_case(client, body):
+    result_cache.invalidate()
+    t0 = time.perf_counter()
+    elapsed, response, _ = timed(client, 'POST', '/api/jobs', body)
+    assert response.status_code == 202, response.get_json()
+    job_id = response.get_json()['job_id']
+    request_s, polls = elapsed, 0
+    while True:
+        elapsed, response, _ = timed(client, 'GET', f'/api/jobs?job_id={job_id}')
+        request_s = max(request_s, elapsed)
+        polls += 1
+        status = response.get_json()['status']
+        if status in ('done', 'failed'):
+            break
+        time.sleep(0.01)
+    assert status == 'done', response.get_json()
+    elapsed, response, data = timed(client, 'GET', f'/api/job-result?job_id={job_id}')
+    assert response.status_code == 200, data
+    return {'request_s': max(request_s, elapsed), 'result_s': time.perf_counter() - t0, 'polls': polls}, data
+
+
+def dedup_case(client, body, clients):
+    result_cache.invalidate()
+    with ThreadPoolExecutor(clients) as pool:
+        responses = list(pool.map(lambda _: client.post('/api/jobs', json=body).get_json(), range(clients)))
+    job_ids = {response['job_id'] for response in responses}
+    return {'submissions': clients, 'jobs': len(job_ids),
+            'deduplicated': sum(response['deduplicated'] for response in responses)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    dataset.add_arguments(parser)
+    parser.add_argument('--clients', type=int, default=8, help='identical submissions sent at once')
+    parser.add_argument('--output', help='results file (default benchmarks/results/jobs-<commit>.json)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    spec = dataset.spec_from_args(args)
+    samples = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lms.sqlite')
+        dataset.build(path, spec)
+        Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=8)
+        configure_job_store(os.path.join(tmp, 'jobs.sqlite'), os.path.join(tmp, 'job_results'))
+        client = create_app().test_client()
+
+        for course_id in spec.course_ids:
+            summary = {'course_id': course_id, 'start_date': spec.start, 'end_date': spec.end, 'mode': 'raw'}
+            cases = {
+                'course_summary': (f'/api/course-summary?course_id={course_id}&start_date={spec.start}'
+                                   f'&end_date={spec.end}&mode=raw', dict(summary, type='course-summary')),
+                'download_report': (f'/api/download-report?course_id={course_id}',
+                                    {'type': 'activity-report', 'course_id': course_id, 'format': 'csv'}),
+            }
+            for name, (url, body) in cases.items():
+                sync, expected = sync_case(client, url)
+                job, data = job_case(client, body)
+                if data != expected:
+                    raise SystemExit(f"Job result of {name} for course {course_id} differs from the synchronous body")
+                samples.setdefault(f'{name}[sync]', []).append(sync)
+                samples.setdefault(f'{name}[job]', []).append(job)
+
+        dedup = dedup_case(client, dict(summary, type='course-summary', mode='incremental'), args.clients)
+        if dedup['jobs'] != 1:
+            raise SystemExit(f"{args.clients} identical submissions made {dedup['jobs']} jobs")
+        Database.get_pool().close()
+
+    measured = {}
+    for name, cases in samples.items():
+        measured[name] = dict(
+            results.timings([case['request_s'] for case in cases]),
+            result_median_s=results.timings([case['result_s'] for case in cases])['median_s'],
+        )
+    measured['dedup'] = dedup
+    params = {'students': spec.students, 'days': spec.days, 'courses': len(spec.course_ids), 'seed': spec.seed,
+              'clients': args.clients}
+    output = results.save('jobs', params, measured, args.output)
+
+    for name, timing in measured.items():
+        if name != 'dedup':
+            print(f"{name:<24}  request {timing['median_s'] * 1000:>9.1f}ms  "
+                  f"result {timing['result_median_s'] * 1000:>9.1f}ms")
+    print(f"{dedup['submissions']} identical submissions -> {dedup['jobs']} job")
+    print(f"job results match the synchronous bodies; saved {output}")
+
+
+if __name__ == '__main__':
+    main()
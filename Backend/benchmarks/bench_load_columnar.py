@@ -0,0 +1,121 @@
+"""Peak memory and time to load raw page_views rows into CourseSummaryAnalyzer.
+
+Compares the per-row dict path (fetchall, strftime every datetime, per-student lists,
+DataFrame from dicts, parse strings back) with the columnar path
+(CourseService._fetch_page_view_columns: fetchmany batches into typed arrays).
+The cursor is an in-memory fake that produces pyodbc-like row tuples on demand,
+so only the conversion work is measured.
+
+    python -m benchmarks.bench_load_columnar --rows 5000000
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+from app.analyzer.course_analyzer import CourseSummaryAnalyzer
+from app.serialization import json_provider
+from app.services.course_service import CourseService
+from benchmarks.synthetic import page_views
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self._ids = rows['user_id'].to_numpy()
+        self._dates = rows['date'].to_numpy().astype('datetime64[us]')
+        self._views = rows['views'].to_numpy()
+        self._pos = 0
+
+    def execute(self, sql, params=()):
+        self._pos = 0
+        return self
+
+    def fetchmany(self, size):
+        start, stop = self._pos, min(self._pos + size, len(self._ids))
+        self._pos = stop
+        return list(zip(self._ids[start:stop].tolist(),
+                        self._dates[start:stop].astype(object).tolist(),
+                        self._views[start:stop].tolist()))
+
+    def fetchall(self):
+        return self.fetchmany(len(self._ids))
+
+
+def load_row_dicts(cursor, start, end):
+    cursor.execute("SELECT user_id, date, views FROM page_views")
+    all_student_data = []
+    current_user = None
+    current_user_data = []
+    for row in cursor.fetchall():
+        user_id = row[0]
+        if current_user != user_id and current_user is not None:
+            all_student_data.append(current_user_data)
+            current_user_data = []
+        current_user = user_id
+        current_user_data.append({
+            'id': user_id,
+            'date': row[1].strftime("%Y-%m-%d %H:%M:%S"),
+            'views': row[2]
+        })
+    if current_user_data:
+        all_student_data.append(current_user_data)
+    return CourseSummaryAnalyzer(all_student_data, start, end)
+
+
+def load_columnar(cursor, start, end):
+    columns = CourseService._fetch_page_view_columns(cursor, None, datetime.fromisoformat(start),
+                                                     datetime.fromisoformat(end))
+    return CourseSummaryAnalyzer(columns, start, end)
+
+
+def measure(loader, cursor, start, end):
+    # Timed and memory-traced separately: tracemalloc slows allocation-heavy code a lot.
+    gc.collect()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer = loader(cursor, start, end)
+    elapsed = time.perf_counter() - t0
+    del analyzer
+
+    gc.collect()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        analyzer = loader(cursor, start, end)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'load_s': round(elapsed, 2),
+        'peak_mb': round(peak / 2**20, 1),
+        'frame_mb': round(analyzer.all_student_data.memory_usage(deep=True).sum() / 2**20, 1),
+    }, analyzer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5_000_000, help='approximate number of page_views rows')
+    parser.add_argument('--start', default='2024-01-08')
+    parser.add_argument('--end', default='2024-05-03')
+    args = parser.parse_args()
+
+    # ~68 rows per student over a semester with the default generator settings.
+    rows = page_views(max(1, args.rows // 68), args.start, args.end)
+    cursor = FakeCursor(rows)
+
+    results = {'rows': len(rows)}
+    summaries = {}
+    for name, loader in (('row_dicts', load_row_dicts), ('columnar', load_columnar)):
+        results[name], analyzer = measure(loader, cursor, args.start, args.end)
+        summaries[name] = json_provider.dumps(analyzer.generate_response())
+        del analyzer
+    results['identical'] = summaries['row_dicts'] == summaries['columnar']
+    results['peak_memory_ratio'] = round(results['row_dicts']['peak_mb'] / results['columnar']['peak_mb'], 1)
+    results['load_time_ratio'] = round(results['row_dicts']['load_s'] / results['columnar']['load_s'], 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
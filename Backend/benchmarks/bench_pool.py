@@ -0,0 +1,105 @@
+"""Connection pool behaviour under concurrent load, against a SQLite stand-in.
+
+Each simulated request borrows a connection, runs a few queries and returns it,
+like a dashboard page load does through Database.get_connection(). The stand-in
+sleeps on connect to mimic the TLS handshake + login of SQL Server.
+
+    python -m benchmarks.bench_pool --clients 64 --requests 20 --handshake-ms 40
+"""
+import argparse
+import json
+import sqlite3
+import statistics
+import threading
+import time
+
+from app.database.pool import ConnectionPool
+
+
+def sqlite_connect(handshake_s):
+    def connect():
+        time.sleep(handshake_s)
+        conn = sqlite3.connect(':memory:', check_same_thread=False)
+        conn.execute("CREATE TABLE course_info (course_id INTEGER, name TEXT)")
+        conn.executemany("INSERT INTO course_info VALUES (?, ?)",
+                         [(i, f"Course {i}") for i in range(50)])
+        return conn
+    return connect
+
+
+class UnpooledConnection:
+    """What Database.get_connection() used to do: a fresh connection per call."""
+
+    def __init__(self, connect):
+        self._connect = connect
+
+    def acquire(self):
+        return self._connect()
+
+    def stats(self):
+        return None
+
+
+def run(source, clients, requests_per_client, queries_per_request):
+    latencies = []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(clients)
+
+    def client():
+        start_barrier.wait()
+        local = []
+        for _ in range(requests_per_client):
+            t0 = time.perf_counter()
+            conn = source.acquire()
+            try:
+                cursor = conn.cursor()
+                for _ in range(queries_per_request):
+                    cursor.execute("SELECT course_id, name FROM course_info WHERE course_id = ?", (7,))
+                    cursor.fetchall()
+            finally:
+                conn.close()
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        'wall_s': round(wall, 3),
+        'requests_per_s': round(len(latencies) / wall, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        'pool': source.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=6)
+    parser.add_argument('--handshake-ms', type=float, default=40.0)
+    parser.add_argument('--min-size', type=int, default=2)
+    parser.add_argument('--max-size', type=int, default=16)
+    args = parser.parse_args()
+
+    connect = sqlite_connect(args.handshake_ms / 1000)
+    pool = ConnectionPool(connect, min_size=args.min_size, max_size=args.max_size, acquire_timeout=60)
+
+    results = {
+        'unpooled': run(UnpooledConnection(connect), args.clients, args.requests, args.queries),
+        'pooled': run(pool, args.clients, args.requests, args.queries),
+    }
+    pool.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
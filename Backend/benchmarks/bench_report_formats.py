@@ -0,0 +1,79 @@
+"""Report export size, export time and downstream load time per download format.
+
+Loads a synthetic page_view_analysis_course_{id} table into a SQLite stand-in, exports
+it with ActivityService.stream_report in every format and reads each file back into
+pandas the way an analyst's notebook would. Parquet and Arrow need pyarrow.
+
+    python -m benchmarks.bench_report_formats --students 50000
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from app.database.connection import Database
+from app.services.activity_service import ActivityService
+from app.services.report_export import REPORT_FORMATS, COLUMNAR_FORMATS, columnar_available
+from benchmarks import standin
+from benchmarks.bench_download_report import load_tables
+from benchmarks.synthetic import analysis_rows
+
+
+def read_back(fmt, data):
+    if fmt == 'csv':
+        return pd.read_csv(io.BytesIO(data))
+    if fmt == 'csv.gz':
+        return pd.read_csv(io.BytesIO(gzip.decompress(data)))
+    if fmt == 'parquet':
+        return pd.read_parquet(io.BytesIO(data))
+    import pyarrow as pa
+    return pa.ipc.open_stream(data).read_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=50000)
+    parser.add_argument('--weeks', type=int, default=16)
+    parser.add_argument('--course-id', type=int, default=101)
+    args = parser.parse_args()
+
+    rows = analysis_rows(args.students, args.weeks)
+    expected = rows.drop(columns='original_id')
+    formats = [fmt for fmt in REPORT_FORMATS if fmt not in COLUMNAR_FORMATS or columnar_available()]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lms.sqlite')
+        load_tables(path, args.course_id, rows)
+        Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=2)
+
+        results = {'rows': len(rows), 'formats': {}}
+        for fmt in formats:
+            t0 = time.perf_counter()
+            data = b''.join(ActivityService.stream_report(args.course_id, fmt))
+            export_s = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            df = read_back(fmt, data)
+            load_s = time.perf_counter() - t0
+
+            results['formats'][fmt] = {
+                'bytes': len(data),
+                'export_s': round(export_s, 3),
+                'load_s': round(load_s, 3),
+                'round_trips': df.equals(expected),
+            }
+        Database.get_pool().close()
+
+    csv_size = results['formats']['csv']['bytes']
+    for fmt, result in results['formats'].items():
+        result['size_vs_csv'] = round(csv_size / result['bytes'], 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
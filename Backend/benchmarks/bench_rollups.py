@@ -0,0 +1,95 @@
+"""Course summary from the rollup store vs querying page_views, plus incremental refresh cost.
+
+Builds a dataset (see benchmarks/dataset.py), backfills the rollups, times the summary
+in rollup, aggregate and raw modes, then appends a week of new page_views rows and
+times the incremental refresh. Finishes with the consistency checker.
+
+    python -m benchmarks.bench_rollups --students 10000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app.cache.result_cache import result_cache
+from app.database.connection import Database
+from app.rollups.refresh import check_course, refresh_course
+from app.rollups.store import configure_rollup_store
+from app.serialization import json_provider
+from app.services.course_service import CourseService
+from benchmarks import dataset, standin
+from benchmarks.synthetic import page_views
+
+
+def append_page_views(path, course_id, rows):
+    conn = standin.Connection(path)
+    conn.cursor().executemany(
+        "INSERT INTO page_views VALUES (?, ?, ?, ?)",
+        zip([course_id] * len(rows), rows['user_id'].tolist(),
+            rows['date'].dt.strftime('%Y-%m-%d %H:%M:%S'), rows['views'].tolist())
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed_summary(course_id, start, end, mode):
+    result_cache.invalidate()
+    standin.reset_stats()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = CourseService.get_course_summary(course_id, start, end, mode, exact=True)
+    return response, {
+        'wall_s': round(time.perf_counter() - t0, 3),
+        'rows_transferred': standin.stats['rows_fetched'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    dataset.add_arguments(parser)
+    parser.set_defaults(students=10000, days=110)
+    args = parser.parse_args()
+
+    spec = dataset.spec_from_args(args)
+    course_id = spec.course_ids[0]
+    # The week after the dataset's last day arrives between the backfill and the incremental refresh.
+    new_start = date.fromisoformat(spec.end) + timedelta(days=1)
+    new_end = new_start + timedelta(days=6)
+    new_rows = page_views(spec.students, new_start.isoformat(), new_end.isoformat(), seed=spec.seed + 1000)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lms.sqlite')
+        dataset.build(path, spec)
+        Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=2)
+        store = configure_rollup_store(os.path.join(tmp, 'rollups.sqlite'))
+
+        results = {'students': spec.students, 'page_view_rows': spec.tables['page_views']}
+        t0 = time.perf_counter()
+        results['backfill'] = dict(refresh_course(store, course_id), wall_s=round(time.perf_counter() - t0, 3))
+
+        responses = {}
+        for mode in ('rollup', 'aggregate', 'raw'):
+            responses[mode], results[mode] = timed_summary(course_id, spec.start, spec.end, mode)
+        reference = json_provider.dumps(responses['raw'])
+        results['identical'] = all(json_provider.dumps(response) == reference for response in responses.values())
+
+        append_page_views(path, course_id, new_rows)
+        standin.reset_stats()
+        t0 = time.perf_counter()
+        results['incremental_refresh'] = dict(refresh_course(store, course_id),
+                                              new_page_view_rows=len(new_rows),
+                                              wall_s=round(time.perf_counter() - t0, 3))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            check = check_course(store, course_id, date.fromisoformat(spec.start), new_end)
+        results['check'] = {'consistent': check['consistent'], 'mismatches': check['mismatches']}
+        Database.get_pool().close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
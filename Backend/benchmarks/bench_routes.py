@@ -0,0 +1,160 @@
+"""Every route in course_routes.py and activity_routes.py against a synthetic database.
+
+Builds a dataset (see benchmarks/dataset.py) or reuses one given with --db, then calls
+each route through the Flask test client: cold (result cache flushed before every
+call) and warm (served from the cache). The course summary runs in every mode, rollup
+included. The cross-course route reads the unified tables, which the course's table
+is copied into. The run fails if a route has no case here, so new routes get benchmarked.
+Results are saved as JSON for benchmarks.results to compare:
+
+    python -m benchmarks.bench_routes --students 10000 --days 120
+    python -m benchmarks.results benchmarks/results/routes-<old>.json benchmarks/results/routes-<new>.json
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+
+from app import create_app
+from app.cache.result_cache import result_cache
+from app.database.connection import Database
+from app.rollups.refresh import refresh_course
+from app.rollups.store import configure_rollup_store
+from app.services.course_service import SUMMARY_MODES
+from app.services.report_export import columnar_available
+from app.storage import migrate
+from app.storage.analysis import configure_analysis_storage
+from benchmarks import dataset, results, standin
+
+BLUEPRINTS = ('courses', 'activity')
+# Cases that need ANALYSIS_STORAGE=unified (they answer 501 on per-course tables); the rest use per_course.
+UNIFIED_CASES = ('student_courses',)
+
+
+def route_cases(course_id, student_ids, start, end):
+    """endpoint -> {case name: (method, url, json body)}."""
+    summary = f'/api/course-summary?course_id={course_id}&start_date={start}&end_date={end}'
+    return {
+        'courses.get_courses': {'courses': ('GET', '/api/courses', None)},
+        'courses.get_students': {'students': ('GET', f'/api/students?course_id={course_id}', None)},
+        'courses.get_course_summary': {
+            f'course_summary[{mode}]': ('GET', f'{summary}&mode={mode}', None) for mode in SUMMARY_MODES
+        } | {'course_summary[incremental,exact]': ('GET', f'{summary}&mode=incremental&exact=true', None)},
+        'courses.get_course_participations': {
+            'course_participations': ('GET', f'/api/course-participations?course_id={course_id}', None),
+        },
+        'courses.get_course_device_stats': {
+            'course_device_stats': ('GET', f'/api/course-device-stats?course_id={course_id}', None),
+        },
+        'courses.get_course_video_stats': {
+            'course_video_stats': ('GET', f'/api/course-video-stats?course_id={course_id}', None),
+        },
+        'courses.get_course_videos': {
+            'course_videos': ('GET', f'/api/course-videos?course_id={course_id}', None),
+        },
+        'courses.get_course_discussion_stats': {
+            'course_discussion_stats': ('GET', f'/api/course-discussion-stats?course_id={course_id}', None),
+        },
+        'courses.get_course_dashboard': {
+            'course_dashboard': ('GET', f'/api/course-dashboard?course_id={course_id}'
+                                        f'&start_date={start}&end_date={end}', None),
+        },
+        'activity.get_detailed_weekly_activity': {
+            'detailed_weekly_activity': ('GET', f'/api/detailed-weekly-activity?course_id={course_id}'
+                                                f'&student_ids={",".join(student_ids)}', None),
+        },
+        'activity.batch_weekly_activity': {
+            'batch_weekly_activity': ('POST', '/api/batch-weekly-activity',
+                                      {'courses': [{'course_id': course_id, 'student_ids': student_ids}]}),
+        },
+        'activity.weekly_activity': {
+            'weekly_activity': ('GET', f'/api/weekly-activity?course_id={course_id}', None),
+            'weekly_activity[student]': ('GET', f'/api/weekly-activity?course_id={course_id}'
+                                                f'&student_id={student_ids[0]}', None),
+        },
+        'activity.student_courses': {
+            'student_courses': ('GET', f'/api/student-courses?student_id={student_ids[0]}', None),
+        },
+        'activity.download_report': {
+            f'download_report[{fmt}]': ('GET', f'/api/download-report?course_id={course_id}&format={fmt}', None)
+            # Without pyarrow parquet only measures the 501 answer.
+            for fmt in ('csv', 'csv.gz') + (('parquet',) if columnar_available() else ())
+        },
+    }
+
+
+def check_coverage(app, cases):
+    endpoints = {rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint.split('.')[0] in BLUEPRINTS}
+    missing = sorted(endpoints - set(cases))
+    if missing:
+        raise SystemExit(f"No benchmark case for: {', '.join(missing)}")
+
+
+def call(client, method, url, body):
+    response = client.open(url, method=method, json=body)
+    size = len(response.get_data())  # drains streamed bodies too
+    return response.status_code, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    dataset.add_arguments(parser)
+    parser.add_argument('--db', help='existing dataset file from benchmarks.dataset (skips the build)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--batch-students', type=int, default=200,
+                        help='students requested by the detailed and batch weekly activity routes')
+    parser.add_argument('--output', help='results file (default benchmarks/results/routes-<commit>.json)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    spec = dataset.spec_from_args(args)
+    course_id = spec.course_ids[0]
+    student_ids = [str(1000 + i) for i in range(min(args.batch_students, spec.students))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, 'lms.sqlite')
+        if not args.db:
+            dataset.build(path, spec)
+        Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=8)
+        store = configure_rollup_store(os.path.join(tmp, 'rollups.sqlite'))
+        refresh_course(store, course_id)
+        migrate.create_tables()
+        migrate.copy_course(course_id)
+
+        app = create_app()
+        client = app.test_client()
+        cases = route_cases(course_id, student_ids, spec.start, spec.end)
+        check_coverage(app, cases)
+
+        measured = {}
+        for endpoint, endpoint_cases in cases.items():
+            for name, (method, url, body) in endpoint_cases.items():
+                configure_analysis_storage('unified' if name in UNIFIED_CASES else 'per_course')
+                status, size = call(client, method, url, body)
+                measured[name] = {
+                    'endpoint': endpoint,
+                    'status': status,
+                    'bytes': size,
+                    'cold': results.measure(lambda: call(client, method, url, body), args.repeat,
+                                            setup=result_cache.invalidate),
+                    'warm': results.measure(lambda: call(client, method, url, body), args.repeat),
+                }
+
+    flat = {}
+    for name, case in measured.items():
+        flat[f'{name}:cold'] = dict(case['cold'], status=case['status'], bytes=case['bytes'])
+        flat[f'{name}:warm'] = case['warm']
+    params = {'students': spec.students, 'days': spec.days, 'courses': len(spec.course_ids),
+              'seed': spec.seed, 'repeat': args.repeat, 'batch_students': len(student_ids)}
+    output = results.save('routes', params, flat, args.output)
+
+    width = max(len(name) for name in flat)
+    for name, timing in flat.items():
+        status = f"  {timing['status']}  {timing['bytes']:>10} B" if 'status' in timing else ''
+        print(f"{name:<{width}}  {timing['median_s'] * 1000:>9.2f}ms{status}")
+    print(json.dumps({'output': output, 'tables': spec.tables or 'reused'}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Encode time and size of the largest JSON responses, per encoder, shape and compression.
+
+Builds the /api/course-summary and /api/detailed-weekly-activity payloads from
+synthetic data (no database) and encodes each with the standard library encoder
+(what jsonify() used before), with orjson when it is installed, in the row and
+columnar (shape=columns) shapes, then gzip- and brotli-compresses the result. Results
+are saved as JSON for benchmarks.results to compare:
+
+    python -m benchmarks.bench_serialization --students 10000 --days 117
+"""
+import argparse
+import json
+import logging
+from functools import partial
+
+from app.analyzer.course_analyzer import CourseSummaryAnalyzer
+from app.serialization import compression, json_provider
+from benchmarks import dataset, results
+from benchmarks.synthetic import analysis_rows, page_views
+
+
+def stdlib_dumps(obj):
+    """Flask's default provider: sorted keys, compact separators, NumPy values via tolist()."""
+    return json.dumps(obj, default=json_provider._default, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def payloads(spec):
+    views = page_views(spec.students, spec.start, spec.end, seed=spec.seed)
+    columns = {'id': views['user_id'].to_numpy(), 'datetime': views['date'].to_numpy(), 'views': views['views'].to_numpy()}
+    summary = CourseSummaryAnalyzer(columns, spec.start, spec.end).generate_response()
+    hourly = summary['data']['hourly']
+    summary_columns = dict(summary['data'], hourly={'hours': json_provider.to_columns(hourly['hours']),
+                                                    'periods': json_provider.to_columns(hourly['periods'])})
+
+    rows = analysis_rows(spec.students, n_weeks=max(1, spec.days // 7), seed=spec.seed)
+    records = rows.to_dict('records')  # Python scalars, as pyodbc returns them
+
+    def wrap(data, **extra):
+        return {'success': True, 'course_id': str(spec.course_ids[0]), **extra, 'data': data}
+
+    return {
+        'course_summary[rows]': wrap(summary['data'], summary=summary['summary']),
+        'course_summary[columns]': wrap(summary_columns, summary=summary['summary']),
+        'detailed_weekly_activity[rows]': wrap(records),
+        'detailed_weekly_activity[columns]': wrap(json_provider.to_columns(records)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    dataset.add_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='results file (default benchmarks/results/serialization-<commit>.json)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    spec = dataset.spec_from_args(args)
+    encoders = {'stdlib': stdlib_dumps}
+    if json_provider.orjson_available():
+        encoders['orjson'] = partial(json_provider.dumps, sort_keys=True)
+
+    measured = {}
+    for name, payload in payloads(spec).items():
+        for encoder_name, encode in encoders.items():
+            body = encode(payload)
+            measured[f'{name}:{encoder_name}'] = dict(results.measure(lambda: encode(payload), args.repeat),
+                                                      bytes=len(body))
+        if json.loads(body) != json.loads(stdlib_dumps(payload)):
+            raise SystemExit(f"{name}: encoders disagree")
+        for encoding in compression.encodings():
+            measured[f'{name}:{encoder_name}+{encoding}'] = dict(
+                results.measure(lambda: compression.compress(body, encoding), args.repeat),
+                bytes=len(compression.compress(body, encoding))
+            )
+
+    params = {'students': spec.students, 'days': spec.days, 'seed': spec.seed, 'repeat': args.repeat,
+              'encoders': list(encoders), 'encodings': list(compression.encodings())}
+    output = results.save('serialization', params, measured, args.output)
+
+    width = max(len(name) for name in measured)
+    for name, timing in measured.items():
+        print(f"{name:<{width}}  {timing['median_s'] * 1000:>9.2f}ms  {timing['bytes']:>10} B")
+    print(f"saved {output}")
+
+
+if __name__ == '__main__':
+    main()
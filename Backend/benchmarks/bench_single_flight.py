@@ -0,0 +1,110 @@
+"""Concurrent identical requests: database queries and wall time with and without single-flight.
+
+Builds a dataset (see benchmarks/dataset.py), then for each concurrency level sends
+that many identical requests at once to /api/courses, /api/students and
+/api/course-summary through the Flask test client, starting from an empty result
+cache. Without single-flight every request that misses the cache runs its own
+queries; with it they wait for one computation, so the query count should stay flat
+as concurrency grows. Results are saved as JSON for benchmarks.results to compare:
+
+    python -m benchmarks.bench_single_flight --students 5000 --clients 1,4,16,32
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from app import create_app
+from app.cache.result_cache import result_cache
+from app.cache.single_flight import SingleFlight
+from app.database.connection import Database
+from benchmarks import dataset, results, standin
+
+
+def burst(app, url, clients):
+    """Send clients identical GETs at once; returns (wall time, database queries)."""
+    barrier = threading.Barrier(clients + 1)
+    statuses = []
+
+    def request():
+        client = app.test_client()
+        barrier.wait()
+        response = client.get(url)
+        response.get_data()
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=request) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    result_cache.invalidate()
+    standin.reset_stats()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - t0
+    if statuses != [200] * clients:
+        raise SystemExit(f"{url} answered {sorted(set(statuses))}")
+    return elapsed, standin.stats['queries']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    dataset.add_arguments(parser)
+    parser.add_argument('--clients', default='1,4,16,32', help='comma-separated concurrency levels')
+    parser.add_argument('--mode', default='raw', help='course summary mode')
+    parser.add_argument('--output', help='results file (default benchmarks/results/single_flight-<commit>.json)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    spec = dataset.spec_from_args(args)
+    course_id = spec.course_ids[0]
+    levels = [int(n) for n in args.clients.split(',')]
+    urls = {
+        'courses': '/api/courses',
+        'students': f'/api/students?course_id={course_id}',
+        'course_summary': f'/api/course-summary?course_id={course_id}&start_date={spec.start}'
+                          f'&end_date={spec.end}&mode={args.mode}',
+    }
+
+    measured = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lms.sqlite')
+        dataset.build(path, spec)
+        # Enough connections that no request waits for one; only coalescing keeps queries down.
+        Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=max(levels) + 1)
+        app = create_app()
+        flights = result_cache.flights
+
+        for variant, single_flight in (('off', None), ('on', flights)):
+            result_cache.flights = single_flight
+            for name, url in urls.items():
+                for clients in levels:
+                    elapsed, queries = burst(app, url, clients)
+                    measured[f'{name}[single_flight={variant},clients={clients}]'] = dict(
+                        results.timings([elapsed]), queries=queries,
+                    )
+        result_cache.flights = flights or SingleFlight()
+        coalesced = result_cache.stats()['coalesced']
+        Database.get_pool().close()
+
+    for name in urls:
+        flat = {measured[f'{name}[single_flight=on,clients={clients}]']['queries'] for clients in levels}
+        if len(flat) != 1:
+            raise SystemExit(f"{name}: queries with single-flight vary with concurrency: {sorted(flat)}")
+
+    params = {'students': spec.students, 'days': spec.days, 'seed': spec.seed, 'clients': args.clients,
+              'mode': args.mode}
+    output = results.save('single_flight', params, measured, args.output)
+
+    width = max(len(name) for name in measured)
+    for name, timing in measured.items():
+        print(f"{name:<{width}}  {timing['median_s'] * 1000:>9.1f}ms  {timing['queries']:>5} queries")
+    print(f"{coalesced} calls coalesced; queries stay flat with single-flight")
+    print(f"saved {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Per-student analysis metrics: full recompute vs the incremental refresh after each daily import.
+
+For each history length, loads synthetic page_views into a SQLite stand-in, then
+times computing and publishing every student's metrics from scratch (what a batch
+that rewrites the tables does) and, after appending one day of page views at a time,
+the incremental refresh and publish. The published rows are then checked against a
+recompute from scratch. Results are saved as JSON for benchmarks.results to compare:
+
+    python -m benchmarks.bench_student_metrics --students 2000 --history-days 28,112
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app.database.connection import Database
+from app.rollups.refresh import _check_students, refresh_students
+from app.rollups.store import configure_rollup_store
+from app.storage.analysis import UnifiedTables
+from app.storage.migrate import create_tables
+from app.storage.publish import publish_students
+from benchmarks import results, standin
+from benchmarks.bench_rollups import append_page_views
+from benchmarks.bench_summary_sql import load_page_views
+from benchmarks.synthetic import page_views
+
+LATE_STUDENTS = 20
+
+
+def refresh_and_publish(store, course_id, full=False):
+    standin.reset_stats()
+    t0 = time.perf_counter()
+    refreshed = refresh_students(store, course_id)
+    published = publish_students(store, course_id, full=full)
+    return time.perf_counter() - t0, refreshed, published, standin.stats['rows_fetched']
+
+
+def published_rows(course_id):
+    with Database.get_connection() as conn:
+        cursor = conn.cursor()
+        UnifiedTables().execute_report(cursor, course_id)
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def run(tmp, args, history_days):
+    course_id = 101
+    start = date.fromisoformat(args.start)
+    path = os.path.join(tmp, f'lms-{history_days}.sqlite')
+    history = page_views(args.students, start.isoformat(), (start + timedelta(days=history_days - 1)).isoformat(),
+                         seed=args.seed)
+    load_page_views(path, course_id, history)
+    Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=1)
+    create_tables()
+
+    store = configure_rollup_store(os.path.join(tmp, f'rollups-{history_days}.sqlite'))
+    elapsed, refreshed, published, rows = refresh_and_publish(store, course_id)
+    measured = {f'full[history={history_days}]': dict(
+        results.timings([elapsed]), page_view_rows=len(history), rows_fetched=rows,
+        students_written=published['students'],
+    )}
+
+    samples, fetched, written = [], 0, 0
+    for offset in range(args.new_days):
+        day = start + timedelta(days=history_days + offset)
+        # A few more students than in the history, so some join late.
+        append_page_views(path, course_id, page_views(args.students + LATE_STUDENTS, day.isoformat(),
+                                                      day.isoformat(), seed=args.seed + 1 + offset))
+        elapsed, refreshed, published, rows = refresh_and_publish(store, course_id)
+        samples.append(elapsed)
+        fetched += rows
+        written += published['students']
+    measured[f'daily[history={history_days}]'] = dict(
+        results.timings(samples), rows_fetched_per_day=round(fetched / args.new_days),
+        students_written_per_day=round(written / args.new_days),
+    )
+
+    incremental = published_rows(course_id)
+    if _check_students(store, course_id, store.student_watermark(course_id)[0]):
+        raise SystemExit(f"Incremental student state differs from page_views after {history_days} days")
+    scratch = configure_rollup_store(os.path.join(tmp, f'scratch-{history_days}.sqlite'))
+    elapsed, _, published, rows = refresh_and_publish(scratch, course_id, full=True)
+    measured[f'full_after[history={history_days}]'] = dict(
+        results.timings([elapsed]), rows_fetched=rows, students_written=published['students'],
+    )
+    if published_rows(course_id) != incremental:
+        raise SystemExit(f"Incrementally published rows differ from a full recompute after {history_days} days")
+    Database.get_pool().close()
+    return measured
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--history-days', default='28,112', help='comma-separated days of history')
+    parser.add_argument('--new-days', type=int, default=7, help='daily imports after the history')
+    parser.add_argument('--start', default='2024-01-08')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='results file (default benchmarks/results/student_metrics-<commit>.json)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    measured = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for history_days in (int(days) for days in args.history_days.split(',')):
+            measured.update(run(tmp, args, history_days))
+
+    params = {'students': args.students, 'history_days': args.history_days, 'new_days': args.new_days,
+              'seed': args.seed}
+    output = results.save('student_metrics', params, measured, args.output)
+
+    width = max(len(name) for name in measured)
+    for name, timing in measured.items():
+        rows = timing.get('rows_fetched', timing.get('rows_fetched_per_day'))
+        students = timing.get('students_written', timing.get('students_written_per_day'))
+        print(f"{name:<{width}}  {timing['median_s'] * 1000:>9.1f}ms  {rows:>9} rows read  "
+              f"{students:>6} students written")
+    print("incremental results match a full recompute")
+    print(f"saved {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Per-request CPU cost of the course summary pipeline, broken down by stage.
+
+    python -m benchmarks.bench_summary --students 10000
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+
+from app.analyzer.aggregates import CourseAggregates
+from app.analyzer.course_analyzer import CourseSummaryAnalyzer
+from benchmarks.synthetic import page_views, student_lists
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.process_time()
+        result = fn()
+        timings.append(time.process_time() - t0)
+    return round(min(timings) * 1000, 2), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--start', default='2024-01-08')
+    parser.add_argument('--end', default='2024-05-03')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = page_views(args.students, args.start, args.end)
+    student_data = student_lists(rows)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_ms, analyzer = timed(
+            lambda: CourseSummaryAnalyzer(student_data, args.start, args.end), args.repeat)
+    aggregate_ms, _ = timed(lambda: CourseAggregates.from_frame(
+        analyzer.all_student_data, analyzer.start_date, analyzer.end_date), args.repeat)
+    response_ms, _ = timed(analyzer.generate_response, args.repeat)
+
+    print(json.dumps({
+        'students': args.students,
+        'rows': len(rows),
+        'cpu_ms': {
+            'load_and_aggregate': load_ms,
+            'aggregate_only': aggregate_ms,
+            'generate_response': response_ms,
+            'total': round(load_ms + response_ms, 2),
+        },
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
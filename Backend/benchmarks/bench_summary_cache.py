@@ -0,0 +1,79 @@
+"""Course summary cost when ranges repeat, shrink or grow, with the day-level cache.
+
+Loads a synthetic course into a SQLite stand-in and requests a sequence of date ranges
+through CourseService.get_course_summary in incremental mode, reporting wall time and
+page_views rows fetched per request. Each response is checked against an uncached
+aggregate-mode run of the same range.
+
+    python -m benchmarks.bench_summary_cache --students 10000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from app.cache.result_cache import result_cache
+from app.database.connection import Database
+from app.serialization import json_provider
+from app.services.course_service import CourseService
+from benchmarks import standin
+from benchmarks.bench_summary_sql import load_page_views
+from benchmarks.synthetic import page_views
+
+SCENARIOS = [
+    ('cold', '2024-01-08', '2024-03-29'),
+    ('exact repeat', '2024-01-08', '2024-03-29'),
+    ('sub-range', '2024-02-05', '2024-03-01'),
+    ('extended range', '2024-01-08', '2024-05-03'),
+    ('shifted range', '2024-02-05', '2024-05-03'),
+]
+
+
+def summary(course_id, start, end, mode):
+    with contextlib.redirect_stdout(io.StringIO()):
+        # exact=True: the sketch-based user counts of incremental mode are approximate.
+        return CourseService.get_course_summary(course_id, start, end, mode, exact=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--course-id', type=int, default=101)
+    args = parser.parse_args()
+
+    rows = page_views(args.students, '2024-01-08', '2024-05-03')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lms.sqlite')
+        load_page_views(path, args.course_id, rows)
+        Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=2)
+
+        expected = {}
+        for _, start, end in SCENARIOS:
+            result_cache.invalidate()
+            expected[start, end] = json_provider.dumps(summary(args.course_id, start, end, 'aggregate'))
+        result_cache.invalidate()
+
+        results = {'students': args.students, 'page_view_rows': len(rows), 'requests': []}
+        for name, start, end in SCENARIOS:
+            standin.reset_stats()
+            t0 = time.perf_counter()
+            response = summary(args.course_id, start, end, 'incremental')
+            results['requests'].append({
+                'scenario': name,
+                'range': f'{start}..{end}',
+                'wall_s': round(time.perf_counter() - t0, 3),
+                'queries': standin.stats['queries'],
+                'rows_transferred': standin.stats['rows_fetched'],
+                'matches_aggregate': json_provider.dumps(response) == expected[start, end],
+            })
+        results['cache'] = result_cache.stats()['namespaces']
+        Database.get_pool().close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Course summary with SQL-side aggregation vs shipping raw page_views rows to Python.
+
+Loads a synthetic course into a SQLite stand-in, runs CourseService.get_course_summary
+cold in each mode and reports wall time, rows transferred and whether the responses match.
+
+    python -m benchmarks.bench_summary_sql --students 10000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from app.cache.result_cache import result_cache
+from app.database.connection import Database
+from app.serialization import json_provider
+from app.services.course_service import CourseService
+from benchmarks import standin
+from benchmarks.synthetic import page_views
+
+
+def load_page_views(path, course_id, rows):
+    conn = standin.Connection(path)
+    conn.execute("CREATE TABLE page_views (course_id INTEGER, user_id INTEGER, date TIMESTAMP, views INTEGER)")
+    conn.execute("CREATE INDEX ix_page_views_course_date ON page_views (course_id, date)")
+    conn.cursor().executemany(
+        "INSERT INTO page_views VALUES (?, ?, ?, ?)",
+        zip([course_id] * len(rows), rows['user_id'].tolist(),
+            rows['date'].dt.strftime('%Y-%m-%d %H:%M:%S'), rows['views'].tolist())
+    )
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--start', default='2024-01-08')
+    parser.add_argument('--end', default='2024-05-03')
+    parser.add_argument('--course-id', type=int, default=101)
+    args = parser.parse_args()
+
+    rows = page_views(args.students, args.start, args.end)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'lms.sqlite')
+        load_page_views(path, args.course_id, rows)
+        Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=2)
+
+        results = {'students': args.students, 'page_view_rows': len(rows)}
+        responses = {}
+        for mode in ('raw', 'aggregate', 'incremental'):
+            result_cache.invalidate()
+            standin.reset_stats()
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                responses[mode] = CourseService.get_course_summary(args.course_id, args.start, args.end, mode, exact=True)
+            results[mode] = {
+                'wall_s': round(time.perf_counter() - t0, 3),
+                'queries': standin.stats['queries'],
+                'rows_transferred': standin.stats['rows_fetched'],
+            }
+        reference = json_provider.dumps(responses['raw'])
+        results['identical'] = all(json_provider.dumps(response) == reference for response in responses.values())
+        Database.get_pool().close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Course video stats: the old two full-table queries vs one course-filtered window query,
+and keyset vs OFFSET pagination of the video list.
+
+Loads video_analytics for an increasing number of courses (same videos per course)
+into a SQLite stand-in and times one course's stats both ways, then the first and
+last page of its video list through the service (keyset), and the last page as
+plain SQL by keyset and by OFFSET. Results are saved as JSON for benchmarks.results
+to compare:
+
+    python -m benchmarks.bench_video_stats --videos 500 --table-courses 1,16,128
+    python -m benchmarks.bench_video_stats --videos 20000 --table-courses 1   # deep pages
+"""
+import argparse
+import logging
+import os
+import tempfile
+
+from app.cache.result_cache import result_cache
+from app.database.connection import Database
+from app.services.course_service import CourseService
+from benchmarks import results, standin
+from benchmarks.synthetic import video_analytics
+
+# What get_course_video_stats ran before: two scans that ignored the course.
+OLD_QUERIES = ('''
+    SELECT
+        COUNT(DISTINCT v.object_id) as total_videos,
+        SUM(v.count_plays) as total_plays,
+        SUM(v.unique_viewers) as total_viewers,
+        AVG(v.avg_completion_rate) as avg_completion_rate,
+        AVG(v.engagement_ranking) as avg_engagement,
+        SUM(v.sum_time_viewed) / 3600 as total_hours_viewed,
+        AVG(v.avg_view_drop_off) as avg_drop_off
+    FROM video_analytics v
+''', '''
+    SELECT TOP 5
+        v.entry_name,
+        v.count_plays as views,
+        v.unique_viewers,
+        v.avg_completion_rate,
+        v.duration_secs / 60.0 as duration_mins,
+        v.avg_view_drop_off
+    FROM video_analytics v
+    ORDER BY v.count_plays DESC
+''')
+
+PAGE = '''
+    SELECT v.object_id, v.entry_name, v.count_plays as views
+    FROM video_analytics v
+    WHERE v.course_id = ?{conditions}
+    ORDER BY v.count_plays DESC, v.object_id
+    OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+'''
+KEYSET = " AND v.count_plays <= ? AND (v.count_plays < ? OR v.object_id > ?)"
+
+
+def load(path, videos, n_courses, seed):
+    rows = video_analytics(videos * n_courses, course_ids=tuple(101 + i for i in range(n_courses)), seed=seed)
+    standin.load_frame(path, 'video_analytics', rows)
+    conn = standin.Connection(path)
+    conn.execute("CREATE INDEX ix_video_analytics_course_plays ON video_analytics (course_id, count_plays DESC, object_id)")
+    conn.commit()
+    conn.close()
+    return len(rows), int((rows['course_id'] == 101).sum())
+
+
+def old_stats():
+    with Database.get_connection() as conn:
+        cursor = conn.cursor()
+        for query in OLD_QUERIES:
+            cursor.execute(query)
+            cursor.fetchall()
+
+
+def page(limit, offset=0, after=None):
+    """One page of the list by plain SQL: skipping offset rows, or seeking past after."""
+    with Database.get_connection() as conn:
+        cursor = conn.cursor()
+        if after is None:
+            cursor.execute(PAGE.format(conditions=''), (101, offset, limit))
+        else:
+            cursor.execute(PAGE.format(conditions=KEYSET), (101, after[0], after[0], after[1], 0, limit))
+        return cursor.fetchall()
+
+
+def last_cursor(limit):
+    """(after, offset) of the course's last page."""
+    after, offset, page = None, 0, CourseService.get_course_videos(101, limit)
+    while page['next_after'] is not None:
+        after, offset = page['next_after'], offset + limit
+        page = CourseService.get_course_videos(101, limit, after)
+    return after, offset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--videos', type=int, default=500, help='videos per course')
+    parser.add_argument('--table-courses', default='1,16,128',
+                        help='comma-separated numbers of courses in video_analytics')
+    parser.add_argument('--limit', type=int, default=50, help='video list page size')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='results file (default benchmarks/results/video_stats-<commit>.json)')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    measured = {}
+    table_rows = {}
+    for n_courses in (int(n) for n in args.table_courses.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'lms.sqlite')
+            table_rows[n_courses], course_videos = load(path, args.videos, n_courses, args.seed)
+            Database.configure(connect=standin.connect_factory(path), min_size=1, max_size=2)
+            result_cache.invalidate()
+            after, offset = last_cursor(args.limit)
+
+            cases = {
+                'old_two_scans': old_stats,
+                'single_query': lambda: CourseService.get_course_video_stats(101),
+                'list_page[first]': lambda: CourseService.get_course_videos(101, args.limit),
+                'list_page[last]': lambda: CourseService.get_course_videos(101, args.limit, after),
+                'sql_keyset[last]': lambda: page(args.limit, after=after),
+                'sql_offset[first]': lambda: page(args.limit),
+                'sql_offset[last]': lambda: page(args.limit, offset=offset),
+            }
+            for name, fn in cases.items():
+                measured[f'{name}[courses={n_courses}]'] = dict(
+                    results.measure(fn, args.repeat, setup=result_cache.invalidate), course_videos=course_videos
+                )
+            Database.get_pool().close()
+
+    params = {'videos': args.videos, 'limit': args.limit, 'seed': args.seed, 'repeat': args.repeat,
+              'table_rows': table_rows}
+    output = results.save('video_stats', params, measured, args.output)
+
+    width = max(len(name) for name in measured)
+    for name, timing in measured.items():
+        print(f"{name:<{width}}  {timing['median_s'] * 1000:>9.2f}ms")
+    print(f"table rows by courses: {table_rows}")
+    print(f"saved {output}")
+
+
+if __name__ == '__main__':
+    main()
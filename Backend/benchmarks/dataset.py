@@ -0,0 +1,151 @@
+"""Build a complete synthetic LMS database in the SQLite stand-in.
+
+Creates every table the services read (course_info, page_views,
+page_view_analysis_course_{id}, detailed_page_views, video_analytics,
+discussion_entries, discussion_replies and assignments_by_modules) for a number of
+courses, scaled by students and days. The same arguments always produce the same data,
+so a file built once can be reused across runs and commits:
+
+    python -m benchmarks.dataset --students 10000 --days 120 --path /tmp/lms.sqlite
+"""
+import argparse
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+
+from benchmarks import standin, synthetic
+
+# Per-student volumes of the smaller tables, per course.
+DETAILED_VIEWS_PER_STUDENT_DAY = 0.2
+DISCUSSION_ENTRIES_PER_STUDENT = 2
+DISCUSSION_REPLIES_PER_STUDENT = 8
+
+
+@dataclass
+class DatasetSpec:
+    students: int = 1000
+    days: int = 117
+    course_ids: tuple = (101,)
+    start: str = '2024-01-08'
+    seed: int = 0
+    tables: dict = field(default_factory=dict)  # table -> rows loaded
+
+    @property
+    def end(self):
+        return (date.fromisoformat(self.start) + timedelta(days=self.days - 1)).isoformat()
+
+
+def _append_frame(path, table, df):
+    """load_frame for the first course, plain inserts into the existing table after that."""
+    conn = standin.Connection(path)
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    conn.close()
+    if not exists:
+        standin.load_frame(path, table, df)
+        return
+    conn = standin.Connection(path)
+    values = [
+        df[name].dt.strftime('%Y-%m-%d %H:%M:%S') if df[name].dtype.kind == 'M' else df[name]
+        for name in df.columns
+    ]
+    placeholders = ', '.join('?' for _ in df.columns)
+    conn.cursor().executemany(f"INSERT INTO {table} VALUES ({placeholders})",
+                              zip(*(column.tolist() for column in values)))
+    conn.commit()
+    conn.close()
+
+
+def build(path, spec):
+    """Load spec's synthetic data into the SQLite file at path; returns spec with row counts."""
+    conn = standin.Connection(path)
+    conn.execute("CREATE TABLE course_info (course_id INTEGER, name TEXT)")
+    conn.execute("CREATE TABLE page_views (course_id INTEGER, user_id INTEGER, date TIMESTAMP, views INTEGER)")
+    conn.execute("CREATE INDEX ix_page_views_course_date ON page_views (course_id, date)")
+    conn.commit()
+    conn.close()
+
+    tables = dict.fromkeys(['course_info', 'page_views', 'detailed_page_views', 'video_analytics',
+                            'discussion_entries', 'discussion_replies', 'assignments_by_modules'], 0)
+    for index, course_id in enumerate(spec.course_ids):
+        seed = spec.seed + index
+        views = synthetic.page_views(spec.students, spec.start, spec.end, seed=seed)
+        analysis = synthetic.analysis_rows(spec.students, n_weeks=max(1, spec.days // 7), seed=seed)
+        entries, replies = synthetic.discussions(
+            spec.students * DISCUSSION_ENTRIES_PER_STUDENT, spec.students * DISCUSSION_REPLIES_PER_STUDENT,
+            course_ids=(course_id,), seed=seed, n_students=spec.students, start=spec.start, days=spec.days
+        )
+        # Entry and reply ids stay unique across courses.
+        entries['id'] += index * len(entries)
+        replies['id'] += index * len(replies)
+        replies['parent_id'] += index * len(entries)
+
+        conn = standin.Connection(path)
+        conn.execute("INSERT INTO course_info VALUES (?, ?)", (course_id, f'Benchmark Course {course_id}'))
+        conn.cursor().executemany(
+            "INSERT INTO page_views VALUES (?, ?, ?, ?)",
+            zip([course_id] * len(views), views['user_id'].tolist(),
+                views['date'].dt.strftime('%Y-%m-%d %H:%M:%S'), views['views'].tolist())
+        )
+        conn.commit()
+        conn.close()
+
+        standin.load_frame(path, f'page_view_analysis_course_{course_id}', analysis)
+        frames = {
+            'detailed_page_views': synthetic.detailed_page_views(
+                int(spec.students * spec.days * DETAILED_VIEWS_PER_STUDENT_DAY), course_ids=(course_id,),
+                seed=seed, n_students=spec.students, start=spec.start, days=spec.days
+            ),
+            'video_analytics': synthetic.video_analytics(course_ids=(course_id,), seed=seed),
+            'discussion_entries': entries,
+            'discussion_replies': replies,
+            'assignments_by_modules': synthetic.assignments_by_modules(course_ids=(course_id,), seed=seed),
+        }
+        frames['video_analytics']['object_id'] += index * len(frames['video_analytics'])
+        for table, df in frames.items():
+            _append_frame(path, table, df)
+            tables[table] += len(df)
+        tables['course_info'] += 1
+        tables['page_views'] += len(views)
+        tables[f'page_view_analysis_course_{course_id}'] = len(analysis)
+
+    conn = standin.Connection(path)
+    for table, column in (('detailed_page_views', 'course_id'), ('video_analytics', 'course_id'),
+                          ('discussion_entries', 'course_id'), ('discussion_replies', 'course_id'),
+                          ('assignments_by_modules', 'course_id')):
+        conn.execute(f"CREATE INDEX ix_{table}_{column} ON {table} ({column})")
+    conn.commit()
+    conn.close()
+
+    spec.tables = tables
+    return spec
+
+
+def add_arguments(parser):
+    """The dataset options shared by the benchmarks that build one."""
+    parser.add_argument('--students', type=int, default=1000, help='students per course (1k-100k)')
+    parser.add_argument('--days', type=int, default=117, help='days of activity (1-365)')
+    parser.add_argument('--courses', type=int, default=1, help='courses, with ids 101, 102, ...')
+    parser.add_argument('--start', default='2024-01-08')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def spec_from_args(args):
+    return DatasetSpec(students=args.students, days=args.days,
+                       course_ids=tuple(101 + i for i in range(args.courses)),
+                       start=args.start, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument('--path', required=True, help='SQLite file to create')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    spec = build(args.path, spec_from_args(args))
+    print(json.dumps(dict(asdict(spec), build_s=round(time.perf_counter() - t0, 1)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
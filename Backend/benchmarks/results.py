@@ -0,0 +1,120 @@
+"""Benchmark results as JSON files that can be compared between commits.
+
+Each file holds the benchmark name, the commit and environment it ran on, its
+parameters and a {case: timings} mapping. Two files of the same benchmark compare by
+median time per case:
+
+    python -m benchmarks.results benchmarks/results/routes-1a2b3c4.json benchmarks/results/routes-5d6e7f8.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def timings(samples):
+    """Summary of repeated wall-clock samples, in seconds."""
+    samples = np.asarray(samples, dtype=float)
+    return {
+        'runs': int(samples.size),
+        'min_s': round(float(samples.min()), 6),
+        'median_s': round(float(np.median(samples)), 6),
+        'p95_s': round(float(np.percentile(samples, 95)), 6),
+        'max_s': round(float(samples.max()), 6),
+    }
+
+
+def measure(fn, repeat, setup=None):
+    """timings() of repeat calls to fn, running setup (e.g. a cache flush) before each."""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return timings(samples)
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata():
+    return {
+        'commit': _git('rev-parse', '--short', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def save(name, params, results, output=None):
+    """Write the results to output (default benchmarks/results/<name>-<commit>.json) and return the path."""
+    meta = metadata()
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{name}-{meta['commit'] or 'nogit'}{'-dirty' if meta['dirty'] else ''}.json")
+    with open(output, 'w') as f:
+        json.dump({'benchmark': name, 'meta': meta, 'params': params, 'results': results}, f, indent=2)
+    return output
+
+
+def compare(old, new, threshold=0.10):
+    """(case, old median, new median, change, regressed) for the cases timed in both runs."""
+    rows = []
+    for case, timing in new['results'].items():
+        before = old['results'].get(case)
+        if not isinstance(timing, dict) or not isinstance(before, dict):
+            continue
+        if 'median_s' not in timing or 'median_s' not in before:
+            continue
+        change = timing['median_s'] / before['median_s'] - 1 if before['median_s'] else 0.0
+        rows.append((case, before['median_s'], timing['median_s'], change, change > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files by median time per case.')
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='relative slowdown reported as a regression (default 0.10)')
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if old['benchmark'] != new['benchmark']:
+        sys.exit(f"Cannot compare {old['benchmark']} results with {new['benchmark']} results.")
+    if old['params'] != new['params']:
+        print(f"warning: parameters differ: {old['params']} vs {new['params']}", file=sys.stderr)
+
+    rows = compare(old, new, args.threshold)
+    width = max([len(case) for case, *_ in rows] + [4])
+    print(f"{'case':<{width}}  {old['meta']['commit'] or '?':>10}  {new['meta']['commit'] or '?':>10}  change")
+    for case, before, after, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{case:<{width}}  {before * 1000:>8.2f}ms  {after * 1000:>8.2f}ms  {change:+7.1%}{flag}")
+    sys.exit(1 if any(row[4] for row in rows) else 0)
+
+
+if __name__ == '__main__':
+    main()
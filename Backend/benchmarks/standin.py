@@ -0,0 +1,180 @@
+"""SQLite stand-in for the SQL Server database used by the services.
+
+Translates the few T-SQL constructs the services use, returns rows that support
+both index and attribute access like pyodbc rows, and counts queries and rows
+fetched so benchmarks can report how much data crossed the wire.
+
+    Database.configure(connect=standin.connect_factory('/tmp/lms.sqlite'))
+"""
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+
+_TRANSLATIONS = [
+    (re.compile(r"CAST\(([\w.]+) AS date\)", re.IGNORECASE), r"date(\1)"),
+    (re.compile(r"DATEPART\(hour,\s*([\w.]+)\)", re.IGNORECASE), r"CAST(strftime('%H', \1) AS INTEGER)"),
+    (re.compile(r"DATEPART\(month,\s*([\w.]+)\)", re.IGNORECASE), r"CAST(strftime('%m', \1) AS INTEGER)"),
+    (re.compile(r"DATEDIFF\(day,\s*([\w.?]+),\s*([\w.?]+)\)", re.IGNORECASE),
+     r"CAST(julianday(date(\2)) - julianday(date(\1)) AS INTEGER)"),
+    (re.compile(r"OFFSET\s+(\?|\d+)\s+ROWS\s+FETCH\s+NEXT\s+(\?|\d+)\s+ROWS\s+ONLY", re.IGNORECASE),
+     r"LIMIT \1, \2"),
+    (re.compile(r"\s+(NON)?CLUSTERED\b", re.IGNORECASE), ""),
+    (re.compile(r"\((MAX)\)", re.IGNORECASE), ""),
+    # SQLite serializes writers, so table hints have nothing to do.
+    (re.compile(r"\s+WITH\s*\((?:UPDLOCK|HOLDLOCK|ROWLOCK|NOLOCK)(?:,\s*\w+)*\)", re.IGNORECASE), ""),
+    # Session temp tables: #name on SQL Server, temp.name on SQLite.
+    (re.compile(r"#(\w+)"), r"temp.\1"),
+]
+_TOP = re.compile(r"SELECT\s+TOP\s+(\d+)", re.IGNORECASE)
+
+_stats_lock = threading.Lock()
+stats = {'queries': 0, 'rows_fetched': 0, 'statements': 0}
+# Distinct statement texts since the last reset: what SQL Server would compile and cache.
+_statements = set()
+
+
+def reset_stats():
+    with _stats_lock:
+        stats.update(queries=0, rows_fetched=0, statements=0)
+        _statements.clear()
+
+
+def _count(queries=0, rows=0, sql=None):
+    with _stats_lock:
+        stats['queries'] += queries
+        stats['rows_fetched'] += rows
+        if sql is not None:
+            _statements.add(sql)
+            stats['statements'] = len(_statements)
+
+
+def translate(sql):
+    for pattern, replacement in _TRANSLATIONS:
+        sql = pattern.sub(replacement, sql)
+    top = _TOP.search(sql)
+    if top:
+        sql = _TOP.sub('SELECT', sql, count=1).rstrip().rstrip(';') + f" LIMIT {top.group(1)}"
+    return sql
+
+
+class Row(tuple):
+    """Tuple with attribute access by column name, like pyodbc.Row."""
+
+    def __new__(cls, values, columns):
+        row = super().__new__(cls, values)
+        row._columns = columns
+        return row
+
+    def __getattr__(self, name):
+        try:
+            return self[self._columns[name]]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class Cursor:
+    def __init__(self, cursor, latency=0.0):
+        self._cursor = cursor
+        self._columns = {}
+        self._latency = latency
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, sql, params=()):
+        if self._latency:
+            time.sleep(self._latency)
+        self._cursor.execute(translate(sql), tuple(params))
+        description = self._cursor.description or ()
+        self._columns = {column[0]: i for i, column in enumerate(description)}
+        _count(queries=1, sql=sql)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._cursor.executemany(translate(sql), seq_of_params)
+        _count(queries=1)
+        return self
+
+    def _wrap(self, rows):
+        _count(rows=len(rows))
+        return [Row(row, self._columns) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is None:
+            return None
+        return self._wrap([row])[0]
+
+    def fetchmany(self, size=None):
+        return self._wrap(self._cursor.fetchmany(size or self._cursor.arraysize))
+
+    def fetchall(self):
+        return self._wrap(self._cursor.fetchall())
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._cursor.close()
+
+
+class Connection:
+    """latency adds a sleep to every execute, standing in for the round trip to SQL Server."""
+
+    def __init__(self, path, latency=0.0):
+        self._conn = sqlite3.connect(path, check_same_thread=False,
+                                     detect_types=sqlite3.PARSE_DECLTYPES)
+        self._latency = latency
+
+    def cursor(self):
+        return Cursor(self._conn.cursor(), self._latency)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def connect_factory(path, latency=0.0):
+    return lambda: Connection(path, latency)
+
+
+def _sql_type(dtype):
+    return {'i': 'INTEGER', 'u': 'INTEGER', 'b': 'INTEGER', 'f': 'REAL', 'M': 'TIMESTAMP'}.get(dtype.kind, 'TEXT')
+
+
+def load_frame(path, table, df):
+    """Create table from a DataFrame's columns and insert its rows."""
+    conn = Connection(path)
+    columns = ', '.join(f'{name} {_sql_type(df[name].dtype)}' for name in df.columns)
+    conn.execute(f"CREATE TABLE {table} ({columns})")
+    values = [
+        df[name].dt.strftime('%Y-%m-%d %H:%M:%S') if df[name].dtype.kind == 'M' else df[name]
+        for name in df.columns
+    ]
+    placeholders = ', '.join('?' for _ in df.columns)
+    conn.cursor().executemany(
+        f"INSERT INTO {table} VALUES ({placeholders})",
+        zip(*(column.tolist() for column in values))
+    )
+    conn.commit()
+    conn.close()
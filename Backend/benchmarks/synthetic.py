@@ -0,0 +1,153 @@
+"""Synthetic LMS activity shaped like the rows CourseService reads from page_views."""
+import numpy as np
+import pandas as pd
+
+# Rough diurnal profile: quiet nights, busy late mornings and evenings.
+HOUR_WEIGHTS = np.array([
+    2, 1, 1, 1, 1, 1, 2, 4, 6, 8, 9, 9,
+    8, 8, 8, 7, 7, 7, 8, 9, 9, 8, 6, 4,
+], dtype=float)
+HOUR_WEIGHTS /= HOUR_WEIGHTS.sum()
+
+
+def page_views(n_students=1000, start='2024-01-08', end='2024-05-03', active_rate=0.3,
+               max_hours_per_day=3, seed=0, first_user_id=1000):
+    """Return a DataFrame with columns user_id, date (hour resolution) and views."""
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(start, end, freq='D')
+
+    active = rng.random((n_students, len(days))) < active_rate
+    student_idx, day_idx = np.nonzero(active)
+    hours_per_day = rng.integers(1, max_hours_per_day + 1, size=len(student_idx))
+
+    student_idx = np.repeat(student_idx, hours_per_day)
+    day_idx = np.repeat(day_idx, hours_per_day)
+    hours = rng.choice(24, size=len(student_idx), p=HOUR_WEIGHTS)
+
+    df = pd.DataFrame({
+        'user_id': (first_user_id + student_idx).astype(np.int64),
+        'date': days.values[day_idx] + hours.astype('timedelta64[h]'),
+        'views': rng.geometric(0.08, size=len(student_idx)).astype(np.int64),
+    })
+    df = df.drop_duplicates(['user_id', 'date'])
+    return df.sort_values(['user_id', 'date'], ignore_index=True)
+
+
+def student_lists(df):
+    """Group rows into the per-student lists of dicts CourseSummaryAnalyzer accepts."""
+    dates = df['date'].dt.strftime('%Y-%m-%d %H:%M:%S').to_numpy()
+    user_ids = df['user_id'].tolist()
+    views = df['views'].tolist()
+
+    all_student_data = []
+    current_user = None
+    for user_id, date, view_count in zip(user_ids, dates, views):
+        if user_id != current_user:
+            all_student_data.append([])
+            current_user = user_id
+        all_student_data[-1].append({'id': user_id, 'date': date, 'views': view_count})
+    return all_student_data
+
+
+def analysis_rows(n_students=1000, n_weeks=16, seed=0, first_user_id=1000):
+    """Rows shaped like page_view_analysis_course_{id}: one per student, with weekly columns."""
+    rng = np.random.default_rng(seed)
+    weekly_views = rng.geometric(0.02, size=(n_students, n_weeks))
+    weekly_ranks = np.argsort(np.argsort(-weekly_views, axis=0), axis=0) + 1
+    pageviews = weekly_views.sum(axis=1)
+    active_days = rng.integers(0, 7 * n_weeks + 1, size=n_students)
+    periods = rng.dirichlet(np.ones(4), size=n_students) * 100
+
+    columns = {
+        'original_id': np.arange(n_students, dtype=np.int64),
+        'student_id': first_user_id + np.arange(n_students),
+        'total_pageviews': pageviews,
+        'active_days': active_days,
+        'avg_daily_views': np.round(pageviews / np.maximum(active_days, 1), 2),
+        'avg_weekly_views': np.round(pageviews / n_weeks, 2),
+        'engagement_rate': np.round(active_days / (7 * n_weeks) * 100, 2),
+        'morning_pct': np.round(periods[:, 0], 2),
+        'afternoon_pct': np.round(periods[:, 1], 2),
+        'evening_pct': np.round(periods[:, 2], 2),
+        'night_pct': np.round(periods[:, 3], 2),
+        'total_gaps_4days': rng.integers(0, 5, size=n_students),
+        'longest_gap_days': rng.integers(0, 30, size=n_students),
+        'total_gap_days': rng.integers(0, 60, size=n_students),
+    }
+    for week in range(n_weeks):
+        columns[f'week_{week + 1}_views'] = weekly_views[:, week]
+        columns[f'week_{week + 1}_rank'] = weekly_ranks[:, week]
+    return pd.DataFrame(columns)
+
+
+DEVICE_TYPES = np.array(['Desktop', 'Mobile', 'Tablet', 'Unknown'])
+
+
+def detailed_page_views(n_rows=100000, course_ids=(101,), seed=0, first_user_id=1000, n_students=1000,
+                        start='2024-01-08', days=117):
+    """Rows shaped like detailed_page_views: course, user, timestamp and device type."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(start, 's')
+    return pd.DataFrame({
+        'course_id': rng.choice(np.asarray(course_ids), size=n_rows),
+        'user_id': first_user_id + rng.integers(0, n_students, size=n_rows),
+        'date': start + rng.integers(0, days * 24 * 3600, size=n_rows).astype('timedelta64[s]'),
+        'device_type': rng.choice(DEVICE_TYPES, size=n_rows, p=[0.55, 0.35, 0.08, 0.02]),
+    })
+
+
+def video_analytics(n_videos=200, course_ids=(101,), seed=0):
+    """Rows shaped like video_analytics: one per video with play and completion metrics."""
+    rng = np.random.default_rng(seed)
+    duration = rng.integers(60, 3600, size=n_videos)
+    plays = rng.geometric(0.005, size=n_videos)
+    return pd.DataFrame({
+        'object_id': np.arange(1, n_videos + 1),
+        'course_id': rng.choice(np.asarray(course_ids), size=n_videos),
+        'entry_name': [f'Lecture video {i}' for i in range(1, n_videos + 1)],
+        'count_plays': plays,
+        'unique_viewers': np.maximum(1, (plays * rng.uniform(0.3, 0.9, size=n_videos)).astype(np.int64)),
+        'avg_completion_rate': np.round(rng.uniform(20, 100, size=n_videos), 2),
+        'engagement_ranking': np.round(rng.uniform(0, 10, size=n_videos), 2),
+        'sum_time_viewed': plays * duration // 2,
+        'avg_view_drop_off': np.round(rng.uniform(0, 80, size=n_videos), 2),
+        'duration_secs': duration,
+    })
+
+
+def discussions(n_entries=2000, n_replies=8000, course_ids=(101,), seed=0, first_user_id=1000, n_students=1000,
+                start='2024-01-08', days=117):
+    """(discussion_entries, discussion_replies) frames; replies point at entries via parent_id."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64(start, 's')
+    entries = pd.DataFrame({
+        'id': np.arange(1, n_entries + 1),
+        'course_id': rng.choice(np.asarray(course_ids), size=n_entries),
+        'user_id': first_user_id + rng.integers(0, n_students, size=n_entries),
+        'message': [f'Question about topic {i % 97}: ' + 'details ' * int(n % 30)
+                    for i, n in enumerate(rng.integers(0, 1000, size=n_entries))],
+        'date': start + rng.integers(0, days * 24 * 3600, size=n_entries).astype('timedelta64[s]'),
+    })
+    parents = rng.zipf(1.6, size=n_replies) % n_entries
+    replies = pd.DataFrame({
+        'id': np.arange(1, n_replies + 1),
+        'parent_id': entries['id'].to_numpy()[parents],
+        'course_id': entries['course_id'].to_numpy()[parents],
+        'user_id': first_user_id + rng.integers(0, n_students, size=n_replies),
+        'message': 'Reply',
+        'date': entries['date'].to_numpy()[parents] + rng.integers(60, 7 * 24 * 3600, size=n_replies).astype('timedelta64[s]'),
+    })
+    return entries, replies
+
+
+def assignments_by_modules(n_modules=12, assignments_per_module=4, course_ids=(101,), seed=0):
+    """Rows shaped like assignments_by_modules for each course."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for course_id in course_ids:
+        for module in range(1, n_modules + 1):
+            for assignment in range(1, assignments_per_module + 1):
+                rows.append((course_id, module, f'Module {module}', module * 100 + assignment,
+                             f'Assignment {module}.{assignment}',
+                             rng.choice(['published', 'unpublished'], p=[0.9, 0.1])))
+    return pd.DataFrame(rows, columns=['course_id', 'module_id', 'module_name', 'assignment_id', 'title', 'status'])
@@ -0,0 +1,12 @@
+# Production serving: gunicorn -c gunicorn.conf.py run:app
+#
+# Requests spend most of their time waiting on SQL Server, so each worker process
+# serves several requests at once on threads (gthread). Keep
+# GUNICORN_THREADS + DASHBOARD_DB_SLOTS at or below DB_POOL_MAX_SIZE.
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
@@ -10,6 +10,12 @@ import {
   ResponsiveContainer,
 } from "recharts";
 
+// The batch endpoint returns { columns, data } with one array of values per column.
+const toRows = ({ columns, data }) =>
+  (data[0] || []).map((_, row) =>
+    Object.fromEntries(columns.map((column, col) => [column, data[col][row]]))
+  );
+
 const CompareWeeklyActivity = () => {
   const [courses, setCourses] = useState([]);
   const [students, setStudents] = useState([]);
@@ -50,15 +56,17 @@ const CompareWeeklyActivity = () => {
     if (selectedCourse && selectedStudents.length === 2) {
       setLoading(true);
       setError(null);
-      fetch(
-        `http://localhost:5001/api/detailed-weekly-activity?course_id=${selectedCourse}&student_ids=${selectedStudents.join(
-          ","
-        )}`
-      )
+      fetch("http://localhost:5001/api/batch-weekly-activity", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          courses: [{ course_id: selectedCourse, student_ids: selectedStudents }],
+        }),
+      })
         .then((res) => res.json())
         .then((data) => {
           if (data.success) {
-            setComparisonData(data.data);
+            setComparisonData(toRows(data.courses[selectedCourse]));
           }
           setLoading(false);
         })
@@ -66,7 +66,7 @@ const Timeline = ({ chartData, startDate, endDate }) => {
       chartData.weekly.weeks.forEach((week, index) => {
         existingWeekData.set(week, {
           views: chartData.weekly.views[index],
-          users: chartData.weekly.avg_users[index],
+          users: (chartData.weekly.unique_users ?? chartData.weekly.avg_users)[index],
           change: chartData.weekly.view_change[index],
           dateRange: chartData.weekly.date_ranges[index],
         });